@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LittleLemon.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once get_asgi_application() has set Django up. The live updates
+# stream (settings.LIVE_PATH) is served first; its long-lived connections
+# hold no admission slot. Everything else goes through admission control
+# before it reaches Django.
+from restaurant.admission import AdmissionControlApplication  # noqa: E402
+from restaurant.live import LiveUpdatesApplication  # noqa: E402
+
+application = LiveUpdatesApplication(AdmissionControlApplication(django_application))
@@ -0,0 +1,117 @@
+"""
+Environment-driven database configuration and the pooled database backends.
+
+settings.DATABASES is built by database_config() from DATABASE_* environment
+variables. With DATABASE_POOL enabled the engine is swapped for
+LittleLemon.db.mysql (or LittleLemon.db.sqlite3 for local testing), which
+hand connections back to a per-process pool instead of closing them. Read
+replicas are added as extra aliases; see LittleLemon.db.routers.
+"""
+import os
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+
+ENGINES = {
+    'mysql': ('django.db.backends.mysql', 'LittleLemon.db.mysql'),
+    'sqlite3': ('django.db.backends.sqlite3', 'LittleLemon.db.sqlite3'),
+}
+
+SQLITE_DEFAULT_NAME = str(Path(__file__).resolve().parent.parent.parent / 'db.sqlite3')
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+FALSE_VALUES = ('0', 'false', 'no', 'off', '')
+
+
+def env_bool(env, name, default):
+    value = env.get(name)
+    if value is None:
+        return default
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ImproperlyConfigured(f'{name} must be a boolean, got {value!r}.')
+
+
+def env_int(env, name, default, minimum=0):
+    value = env.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ImproperlyConfigured(f'{name} must be an integer, got {value!r}.')
+    if number < minimum:
+        raise ImproperlyConfigured(f'{name} must be at least {minimum}, got {number}.')
+    return number
+
+
+def database_config(env=os.environ):
+    """
+    The DATABASES setting described by env.
+
+    The defaults are the project's local MySQL database with connections
+    kept open for a minute and health-checked before reuse. DATABASE_CONN_MAX_AGE
+    takes seconds, or 'none' for connections that are never recycled.
+
+    DATABASE_REPLICAS lists read replicas, comma separated: host or
+    host:port for MySQL, database files for SQLite. Each becomes a
+    replica_<n> alias sharing the primary's other settings.
+    """
+    engine = env.get('DATABASE_ENGINE', 'mysql')
+    if engine not in ENGINES:
+        raise ImproperlyConfigured(
+            f"DATABASE_ENGINE must be one of {', '.join(sorted(ENGINES))}, got {engine!r}."
+        )
+    backend, pooled_backend = ENGINES[engine]
+
+    if env.get('DATABASE_CONN_MAX_AGE', '').lower() == 'none':
+        conn_max_age = None
+    else:
+        conn_max_age = env_int(env, 'DATABASE_CONN_MAX_AGE', 60)
+
+    default = {
+        'ENGINE': backend,
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': env_bool(env, 'DATABASE_CONN_HEALTH_CHECKS', True),
+    }
+    if engine == 'mysql':
+        default.update({
+            'NAME': env.get('DATABASE_NAME', 'LittleLemon'),
+            'USER': env.get('DATABASE_USER', 'root'),
+            'PASSWORD': env.get('DATABASE_PASSWORD', 'password'),
+            'HOST': env.get('DATABASE_HOST', '127.0.0.1'),
+            'PORT': env.get('DATABASE_PORT', '3306'),
+            'OPTIONS': {
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"
+            },
+        })
+    else:
+        default['NAME'] = env.get('DATABASE_NAME', SQLITE_DEFAULT_NAME)
+
+    if env_bool(env, 'DATABASE_POOL', False):
+        default.update({
+            'ENGINE': pooled_backend,
+            # The pool owns connection lifetimes; Django hands each
+            # connection back at the end of the request.
+            'CONN_MAX_AGE': 0,
+            'POOL': {
+                'SIZE': env_int(env, 'DATABASE_POOL_SIZE', 10, minimum=1),
+                'MAX_OVERFLOW': env_int(env, 'DATABASE_POOL_MAX_OVERFLOW', 10),
+                'IDLE_TIMEOUT': env_int(env, 'DATABASE_POOL_IDLE_TIMEOUT', 300),
+                'TIMEOUT': env_int(env, 'DATABASE_POOL_TIMEOUT', 30),
+            },
+        })
+
+    databases = {'default': default}
+    replicas = [replica.strip() for replica in env.get('DATABASE_REPLICAS', '').split(',') if replica.strip()]
+    for number, replica in enumerate(replicas, 1):
+        config = dict(default, TEST={'MIRROR': 'default'})
+        if engine == 'mysql':
+            host, _, port = replica.partition(':')
+            config.update(HOST=host, PORT=port or default['PORT'])
+        else:
+            config['NAME'] = replica
+        databases[f'replica_{number}'] = config
+    return databases
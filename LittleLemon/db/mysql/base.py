@@ -0,0 +1,11 @@
+from django.db.backends.mysql import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+
+    @staticmethod
+    def ping_connection(conn):
+        conn.ping()
+        return True
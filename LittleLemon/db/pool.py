@@ -0,0 +1,230 @@
+"""
+A small thread-safe connection pool shared by the threads of one process.
+
+Connections are handed out most-recently-used first so that idle ones at the
+bottom of the stack age out after IDLE_TIMEOUT. Up to SIZE connections are
+kept; MAX_OVERFLOW more may be opened under load and are closed as soon as
+they are returned. When everything is checked out, acquire() waits up to
+TIMEOUT seconds before raising PoolTimeout.
+"""
+from collections import deque
+import functools
+import threading
+import time
+
+from django.db import DatabaseError
+
+from restaurant.metrics import registry
+
+
+class PoolTimeout(DatabaseError):
+    pass
+
+
+class ConnectionPool:
+
+    def __init__(self, connect, size=10, max_overflow=10, idle_timeout=300, timeout=30,
+                 ping=None, close=None):
+        self.connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ping = ping
+        self._close = close or (lambda conn: conn.close())
+        self._idle = deque()
+        self._open = 0
+        self._condition = threading.Condition()
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                while self._idle:
+                    conn, released_at = self._idle.pop()
+                    if self._expired(released_at) or not self._usable(conn):
+                        self._discard(conn)
+                        continue
+                    self.reused += 1
+                    return conn
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No database connection available within {self.timeout}s '
+                        f'({self._open} open).'
+                    )
+                self.waits += 1
+                self._condition.wait(remaining)
+
+        # Connect outside the lock; the slot is already reserved.
+        try:
+            conn = self.connect()
+        except BaseException:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.created += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        with self._condition:
+            if discard or self._open > self.size:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def close_idle(self):
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.popleft()[0])
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'created': self.created,
+                'reused': self.reused,
+                'closed': self.closed,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+            }
+
+    def _expired(self, released_at):
+        return self.idle_timeout and time.monotonic() - released_at > self.idle_timeout
+
+    def _usable(self, conn):
+        if self.ping is None:
+            return True
+        try:
+            return self.ping(conn)
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        # Called with the lock held.
+        self._open -= 1
+        self.closed += 1
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict, connect, ping=None):
+    """
+    The process-wide pool for a database alias, created on first use. The
+    pool is keyed on NAME as well, so the test database gets its own.
+    """
+    key = (alias, settings_dict['NAME'])
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = settings_dict.get('POOL', {})
+            pool = _pools[key] = ConnectionPool(
+                connect,
+                size=options.get('SIZE', 10),
+                max_overflow=options.get('MAX_OVERFLOW', 10),
+                idle_timeout=options.get('IDLE_TIMEOUT', 300),
+                timeout=options.get('TIMEOUT', 30),
+                ping=ping,
+            )
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_idle()
+        _pools.clear()
+
+
+def render_pool_metrics():
+    """
+    Prometheus lines for every pool in this process.
+    """
+    with _pools_lock:
+        pools = sorted(
+            ((alias, pool.stats()) for (alias, name), pool in _pools.items()),
+            key=lambda item: item[0],
+        )
+    lines = []
+    for name, kind, help_text in (
+        ('open', 'gauge', 'Open pooled database connections.'),
+        ('in_use', 'gauge', 'Pooled database connections checked out.'),
+        ('idle', 'gauge', 'Idle pooled database connections.'),
+        ('created', 'counter', 'Database connections opened by the pool.'),
+        ('reused', 'counter', 'Checkouts served by an idle connection.'),
+        ('closed', 'counter', 'Pooled connections closed (expired, broken or overflow).'),
+        ('waits', 'counter', 'Checkouts that had to wait for a connection.'),
+        ('timeouts', 'counter', 'Checkouts that gave up waiting.'),
+    ):
+        metric = f'littlelemon_db_pool_{name}' + ('_total' if kind == 'counter' else '')
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        for alias, stats in pools:
+            lines.append(f'{metric}{{alias="{alias}"}} {stats[name]}')
+    return lines
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Mixed into a backend's DatabaseWrapper: opening a connection checks one
+    out of the pool and closing it hands it back. A connection closed inside
+    a transaction or after a database error is discarded instead.
+    """
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(
+            self.alias, self.settings_dict,
+            functools.partial(super().get_new_connection, conn_params),
+            ping=self.ping_connection,
+        )
+        return self.pool.acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        discard = self.in_atomic_block or self.errors_occurred
+        if not discard:
+            try:
+                # Leave nothing behind for the next borrower.
+                self.connection.rollback()
+            except Exception:
+                discard = True
+        self.pool.release(self.connection, discard=discard)
+
+    @staticmethod
+    def ping_connection(conn):
+        """
+        Whether conn, a DB-API connection about to be handed out again, still
+        works; raising counts as broken. Backends with a cheaper check of
+        their own (MySQL's ping) override it.
+        """
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+        return True
+
+
+registry.register_collector(render_pool_metrics)
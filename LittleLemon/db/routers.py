@@ -0,0 +1,121 @@
+"""
+Read-replica routing.
+
+ReplicaRoutingMiddleware lets reads made while serving a GET, HEAD or
+OPTIONS request go to one of settings.DATABASE_REPLICAS. Everything else
+uses the primary: unsafe requests, code running outside a request
+(management commands, the shell), reads inside a transaction, and reads made
+after the request has written anything.
+
+Replicas lag behind the primary, so a client that has just written is
+pinned to the primary for REPLICA_LAG_SECONDS with a cookie, and sees its
+own writes on the next page load.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+_state = ContextVar('database_routing', default=None)
+
+
+@contextmanager
+def routing(use_replicas):
+    token = _state.set(RoutingState(use_replicas))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+def use_primary():
+    """
+    Send every query in the block to the primary.
+    """
+    return routing(False)
+
+
+def use_replicas():
+    """
+    Let reads in the block go to the replicas, as in a safe request.
+    """
+    return routing(True)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replicas or state.wrote or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Reads in a transaction must see its writes and locks.
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def use_replicas(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing(self.use_replicas(request)) as state:
+            response = self.get_response(request)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        with routing(self.use_replicas(request)) as state:
+            response = await self.get_response(request)
+        return self.finish(state, response)
+
+    def finish(self, state, response):
+        if state.wrote and settings.DATABASE_REPLICAS and settings.REPLICA_LAG_SECONDS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_LAG_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,20 @@
+"""
+The pooled backend on SQLite, for trying the pool out locally. In-memory
+databases are not pooled, since every connection to one is a new database.
+"""
+from django.db.backends.sqlite3 import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        if self.is_in_memory_db():
+            return base.DatabaseWrapper.get_new_connection(self, conn_params)
+        return super().get_new_connection(conn_params)
+
+    def _close(self):
+        if self.is_in_memory_db():
+            return base.DatabaseWrapper._close(self)
+        return super()._close()
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 
+from LittleLemon.db import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,11 +45,19 @@ INSTALLED_APPS = [
     'restaurant',
     'rest_framework.authtoken',
     'djoser',
+    'django_filters',
+    'benchmarks',
+    'taskqueue',
 
 ]
 
 MIDDLEWARE = [
+    'restaurant.middleware.AdmissionControlMiddleware',
+    'restaurant.middleware.InstrumentationMiddleware',
+    'restaurant.middleware.CompressionMiddleware',
+    'LittleLemon.db.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -62,8 +72,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': ['templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compiled templates are kept in memory; runserver's autoreloader
+            # resets the cache when a template changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -80,20 +97,20 @@ WSGI_APPLICATION = 'LittleLemon.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'LittleLemon',
-        'USER': 'root',
-        'PASSWORD': 'password',
-        'HOST': '127.0.0.1',
-        'PORT': '3306',
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'"
+# Configured from DATABASE_* environment variables; see LittleLemon/db.
+# Defaults to the local MySQL database with persistent, health-checked
+# connections. Set DATABASE_POOL=1 for the pooled backend.
 
-        }
-    }
-}
+DATABASES = database_config()
+
+# Reads made while serving safe requests go to the read replicas (set with
+# DATABASE_REPLICAS). A client that writes is pinned to the primary with
+# REPLICA_PIN_COOKIE for REPLICA_LAG_SECONDS; set it above the replicas'
+# worst expected lag.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['LittleLemon.db.routers.ReplicaRouter']
+REPLICA_LAG_SECONDS = 5
+REPLICA_PIN_COOKIE = 'db_primary'
 
 
 # Password validation
@@ -131,6 +148,29 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Outside DEBUG, collectstatic writes content-hashed, gzip (and brotli, when
+# installed) compressed copies that WhiteNoise serves with far-future
+# immutable Cache-Control headers.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Text responses (JSON, HTML, CSV) at least this long are gzipped for
+# clients that accept it (see restaurant.middleware.CompressionMiddleware).
+RESPONSE_GZIP_MIN_BYTES = 1024
+
+# Browser and proxy cache lifetime of the pre-rendered landing page.
+INDEX_CACHE_SECONDS = 3600
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -138,11 +178,176 @@ STATIC_URL = '/static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    # orjson-backed JSON, falling back to the json module when orjson is
+    # not installed (see restaurant.renderers).
+    'DEFAULT_RENDERER_CLASSES': (
+        'restaurant.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'restaurant.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'restaurant.authentication.CachedTokenAuthentication',
+    ),
+    # Per user (or client IP when anonymous) and per view throttle_scope.
+    'DEFAULT_THROTTLE_CLASSES': (
+        'restaurant.throttling.SlidingWindowThrottle',
     ),
+    'DEFAULT_THROTTLE_RATES': {
+        'menu': '600/min',
+        'booking': '120/min',
+        'auth': '10/min',
+    },
+}
+
+# Cache holding the throttle counters. Point it at a shared backend with
+# atomic increments (Redis, Memcached) so limits hold across workers.
+THROTTLE_CACHE_ALIAS = 'default'
+
+# Menu list pagination (opt-in via ?cursor= or ?page_size=) and streaming
+# (opt-in via ?stream=1).
+MENU_PAGE_SIZE = 100
+MENU_MAX_PAGE_SIZE = 1000
+MENU_STREAM_CHUNK_SIZE = 2000
+
+# Where the pre-built menu snapshots served for the unfiltered menu list are
+# published by the task worker (see restaurant.snapshot). Point every host
+# at shared storage.
+MENU_SNAPSHOT_DIR = BASE_DIR / 'var' / 'snapshots'
+# Seconds a snapshot missing a menu write is still served while a worker
+# publishes the next one; after that the list is built per request.
+MENU_SNAPSHOT_MAX_LAG = 30
+
+# Runs the tests with MENU_SNAPSHOT_DIR in a temporary directory.
+TEST_RUNNER = 'LittleLemon.tests.runner.TestRunner'
+
+# Menu search (restaurant/menu/items/search/): default and maximum ?limit=,
+# and how many matches the in-process index (used on databases without a
+# FULLTEXT index) hands to the database at most.
+MENU_SEARCH_LIMIT = 20
+MENU_SEARCH_MAX_LIMIT = 100
+MENU_SEARCH_MAX_CANDIDATES = 10000
+
+# Menu changes feed (restaurant/menu/items/changes/): default and maximum
+# ?limit= of changes per call.
+MENU_CHANGES_LIMIT = 1000
+MENU_CHANGES_MAX_LIMIT = 5000
+
+# Bulk menu writes (restaurant/menu/items/bulk/), overridable per request
+# with ?batch_size= up to the maximum.
+MENU_BULK_BATCH_SIZE = 500
+MENU_BULK_MAX_BATCH_SIZE = 5000
+
+# Admin changelists count rows exactly up to this many; past it unfiltered
+# lists show the database's row estimate (see restaurant.admin).
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Seats per date for dates without a restaurant.SlotCapacity row, and the
+# widest range restaurant/booking/tables/availability/ answers in one call.
+BOOKING_DEFAULT_CAPACITY = 50
+BOOKING_AVAILABILITY_MAX_DAYS = 366
+
+# Widest date range the booking stats endpoints (restaurant/booking/stats/)
+# answer in one call.
+BOOKING_STATS_MAX_DAYS = 3660
+
+# Serve the ASGI-native menu and booking views under /restaurant/async/
+# alongside the DRF views. They only pay off when running under an ASGI
+# server such as uvicorn.
+ASYNC_API_VIEWS = True
+
+# Live menu and booking updates (restaurant.live), streamed as server-sent
+# events at LIVE_PATH by the ASGI application. LocalBroker only reaches the
+# streams of the process that made the write; with several processes use a
+# shared broker ('restaurant.live.RedisBroker' with LIVE_BROKER_URL). Idle
+# streams get a keep-alive comment every LIVE_KEEPALIVE_SECONDS, a stream
+# LIVE_MAX_PENDING events behind is cut off (clients reconnect after
+# LIVE_RETRY_MS and resync), and menu writes of more than
+# LIVE_MENU_MAX_ITEMS rows are announced as a resync event.
+LIVE_PATH = '/restaurant/live/'
+LIVE_BROKER = 'restaurant.live.LocalBroker'
+LIVE_BROKER_URL = 'redis://127.0.0.1:6379/0'
+LIVE_KEEPALIVE_SECONDS = 15
+LIVE_MAX_PENDING = 100
+LIVE_RETRY_MS = 3000
+LIVE_MENU_MAX_ITEMS = 100
+
+# Admission control (restaurant.admission). A request belongs to the route
+# class of the first ADMISSION_ROUTES rule matching its method (None for
+# any) and path, or to 'default' (the index page, metrics, static files).
+# Per process, a class runs at most `limit` requests at once and queues up
+# to `queue` more for at most `timeout` seconds; the rest get 503 with a
+# Retry-After of at most ADMISSION_RETRY_AFTER_MAX seconds. Classes of a
+# priority listed in ADMISSION_SHED_AT are shed without queueing once the
+# process has that many requests in flight. Size the limits to the
+# database connections a process may use.
+ADMISSION_CLASSES = {
+    'default': {'limit': 16, 'queue': 64, 'timeout': 2.0, 'priority': 'high'},
+    'auth': {'limit': 4, 'queue': 32, 'timeout': 2.0, 'priority': 'high'},
+    'menu_read': {'limit': 8, 'queue': 128, 'timeout': 1.0, 'priority': 'normal'},
+    'menu_write': {'limit': 4, 'queue': 32, 'timeout': 2.0, 'priority': 'normal'},
+    'booking_read': {'limit': 8, 'queue': 32, 'timeout': 1.0, 'priority': 'normal'},
+    'booking_write': {'limit': 8, 'queue': 64, 'timeout': 3.0, 'priority': 'high'},
+    'bulk': {'limit': 1, 'queue': 4, 'timeout': 5.0, 'priority': 'low'},
+    'reports': {'limit': 2, 'queue': 8, 'timeout': 5.0, 'priority': 'low'},
+    'admin': {'limit': 2, 'queue': 8, 'timeout': 5.0, 'priority': 'low'},
+}
+ADMISSION_ROUTES = [
+    ('auth', None, r'^/auth/|^/restaurant/menu/api-token-auth/'),
+    ('bulk', None, r'^/restaurant/menu/items/bulk/'),
+    ('reports', None, r'^/restaurant/booking/stats/'),
+    ('menu_read', ('GET', 'HEAD'), r'^/restaurant/(async/)?menu/items/'),
+    ('menu_write', None, r'^/restaurant/(async/)?menu/items/'),
+    ('booking_read', ('GET', 'HEAD'), r'^/restaurant/(async/)?booking/'),
+    ('booking_write', None, r'^/restaurant/(async/)?booking/'),
+    ('admin', None, r'^/admin/'),
+]
+ADMISSION_SHED_AT = {'low': 12, 'normal': 32}
+ADMISSION_RETRY_AFTER_MAX = 30
+
+# Clients allowed to scrape the Prometheus metrics at /metrics. An empty
+# list leaves the endpoint open.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Point 'default' at a shared backend (Redis, Memcached) in production so
+# every worker sees the same menu cache versions.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
 }
 
+MENU_CACHE_ALIAS = 'default'
+MENU_CACHE_TIMEOUT = 300
+
+# Token -> user resolution cache for CachedTokenAuthentication: a per-process
+# LRU, optionally backed by a shared cache alias. Other processes see a
+# revoked token for at most TOKEN_AUTH_CACHE_TTL seconds.
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 30
+TOKEN_AUTH_SHARED_CACHE_ALIAS = None
+TOKEN_AUTH_SHARED_CACHE_TTL = 300
+
+
+# Background tasks (taskqueue app): where delay() queues them, how often a
+# failing task is tried and how long to back off in between (doubling,
+# in seconds), and after how long a task still marked running is assumed
+# lost with its worker and handed out again. TASKS_ALWAYS_EAGER runs
+# tasks in-process on commit instead of queueing them.
+TASKS_BROKER = 'taskqueue.brokers.DatabaseBroker'
+TASKS_ALWAYS_EAGER = False
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_BACKOFF = 2
+TASKS_RETRY_BACKOFF_MAX = 600
+TASKS_VISIBILITY_TIMEOUT = 600
+
 
 DJOSER = {"USER_ID_FIELD": "username"}
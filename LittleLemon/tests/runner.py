@@ -0,0 +1,23 @@
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests with MENU_SNAPSHOT_DIR in a temporary directory, so the
+    snapshots published by tests that request the unfiltered menu list stay
+    out of the working tree.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.snapshot_dir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MENU_SNAPSHOT_DIR=self.snapshot_dir.name)
+        self.settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.settings_override.disable()
+        self.snapshot_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,177 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from restaurant.admin import EstimatedCountPaginator
+from restaurant.models import Booking, BookingDailyStats, Menu
+from restaurant.templatetags.restaurant_admin import booking_date_hierarchy
+
+
+class AdminTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='pass')
+        self.client.force_login(self.admin)
+
+
+@override_settings(ADMIN_EXACT_COUNT_LIMIT=5)
+class EstimatedCountPaginatorTestCase(TestCase):
+
+    def setUp(self):
+        Menu.objects.bulk_create(Menu(title=f'Dish {i}', price=1, inventory=i) for i in range(20))
+
+    def test_filtered_count_is_capped(self):
+        """
+        Test that filtered lists stop counting at the limit.
+        """
+        paginator = EstimatedCountPaginator(Menu.objects.filter(inventory__gte=2).order_by('id'), 2)
+        self.assertEqual(paginator.count, 5)
+        paginator = EstimatedCountPaginator(Menu.objects.filter(inventory__gte=17).order_by('id'), 2)
+        self.assertEqual(paginator.count, 3)
+
+    def test_unfiltered_count_is_estimated(self):
+        """
+        Test that an unfiltered list over the limit uses the database's
+        statistics, and falls back to the capped count without them.
+        """
+        self.assertEqual(EstimatedCountPaginator(Menu.objects.order_by('id'), 2).count, 5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Menu.objects.bulk_create(Menu(title='New', price=1, inventory=0) for _ in range(3))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(EstimatedCountPaginator(Menu.objects.order_by('id'), 2).count, 20)
+        self.assertFalse(any('COUNT' in query['sql'] for query in queries))
+
+
+class MenuAdminTestCase(AdminTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.items = [
+            Menu.objects.create(title=title, price=Decimal('5.00'), inventory=inventory)
+            for title, inventory in (('Soup', 3), ('Salad', 8), ('Tart', 1))
+        ]
+        self.url = reverse('admin:restaurant_menu_changelist')
+
+    def run_action(self, action, quantity, items):
+        return self.client.post(self.url, {
+            'action': action,
+            'quantity': quantity,
+            ACTION_CHECKBOX_NAME: [item.pk for item in items],
+        }, follow=True)
+
+    def inventory(self):
+        return list(Menu.objects.order_by('id').values_list('inventory', flat=True))
+
+    def test_changelist(self):
+        response = self.client.get(self.url, {'q': 'sa'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.title for item in response.context['cl'].result_list], ['Salad'])
+
+    def test_set_inventory(self):
+        """
+        Test that the action sets every selected item in one UPDATE.
+        """
+        self.client.get(reverse('menu_items'))
+        with CaptureQueriesContext(connection) as queries:
+            self.run_action('set_inventory', 10, self.items[:2])
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "restaurant_menu"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.inventory(), [10, 10, 1])
+        # The cached menu list is invalidated.
+        response = self.client.get(reverse('menu_items'))
+        self.assertEqual([item['inventory'] for item in response.json()], [10, 10, 1])
+
+    def test_add_inventory(self):
+        """
+        Test that quantities are added, and removing stock stops at zero.
+        """
+        self.run_action('add_inventory', 5, self.items)
+        self.assertEqual(self.inventory(), [8, 13, 6])
+        self.run_action('add_inventory', -7, self.items)
+        self.assertEqual(self.inventory(), [1, 6, 0])
+
+    def test_missing_quantity(self):
+        response = self.run_action('set_inventory', '', self.items)
+        self.assertContains(response, 'Enter a whole number in Quantity.')
+        self.assertEqual(self.inventory(), [3, 8, 1])
+
+
+class BookingAdminTestCase(AdminTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for day in (date(2029, 12, 30), date(2030, 1, 2), date(2030, 2, 3)):
+            Booking.objects.create(name='Party', number_of_guest=2, booking_date=day)
+        self.url = reverse('admin:restaurant_booking_changelist')
+
+    def hierarchy(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            choices = booking_date_hierarchy(response.context['cl'])['choices']
+        return [choice['title'] for choice in choices], [query['sql'] for query in queries]
+
+    def test_hierarchy_from_daily_stats(self):
+        """
+        Test that the date hierarchy lists the booked years, months and
+        days from the daily stats rather than the bookings table.
+        """
+        years, sql = self.hierarchy({})
+        self.assertEqual(years, ['2029', '2030'])
+        self.assertTrue(any('"restaurant_bookingdailystats"' in query for query in sql))
+        self.assertFalse(any('DISTINCT' in query and '"restaurant_booking"' in query for query in sql))
+
+        months, _ = self.hierarchy({'booking_date__year': '2030'})
+        self.assertEqual(months, ['January 2030', 'February 2030'])
+        days, _ = self.hierarchy({'booking_date__year': '2030', 'booking_date__month': '1'})
+        self.assertEqual(days, ['January 2'])
+
+    def test_changelist_renders_hierarchy_from_daily_stats(self):
+        BookingDailyStats.objects.create(date=date(2035, 1, 1), bookings=1, guests=1)
+        self.assertContains(self.client.get(self.url), 'booking_date__year=2035')
+
+    def test_hierarchy_with_search(self):
+        """
+        Test that a search by username falls back to the dates of the matching bookings.
+        """
+        guest = User.objects.create_user(username='guest', password='pass')
+        Booking.objects.create(user=guest, name='Wedding', number_of_guest=2, booking_date=date(2031, 6, 1))
+        years, sql = self.hierarchy({'q': 'guest'})
+        self.assertFalse(any('"restaurant_bookingdailystats"' in query for query in sql))
+        self.assertEqual(years, ['June 1'])
+
+    def test_assign_bookings_without_owner(self):
+        """
+        Test that staff can list the bookings without an owner and assign
+        them to a user in one UPDATE.
+        """
+        guest = User.objects.create_user(username='guest', password='pass')
+        Booking.objects.create(user=guest, name='Wedding', number_of_guest=2, booking_date=date(2031, 6, 1))
+        response = self.client.get(self.url, {'user__isnull': 'True'})
+        ownerless = [booking.pk for booking in response.context['cl'].result_list]
+        self.assertEqual(len(ownerless), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'action': 'assign_to_user', 'username': 'guest', ACTION_CHECKBOX_NAME: ownerless[:2],
+            }, follow=True)
+        self.assertContains(response, 'Assigned 2 bookings to guest.')
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "restaurant_booking"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Booking.objects.filter(user=guest).count(), 3)
+
+        response = self.client.post(self.url, {
+            'action': 'assign_to_user', 'username': 'nobody', ACTION_CHECKBOX_NAME: ownerless[2:],
+        }, follow=True)
+        self.assertContains(response, 'Enter the username of an existing user in Username.')
+        self.assertEqual(Booking.objects.filter(user__isnull=True).count(), 1)
+
+    def test_stats_admin_is_read_only(self):
+        self.assertEqual(self.client.get(reverse('admin:restaurant_bookingdailystats_add')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('admin:restaurant_bookingdailystats_changelist')).status_code, 200)
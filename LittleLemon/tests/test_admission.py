@@ -0,0 +1,226 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from restaurant.admission import (
+    SCOPE_KEY, AdmissionControlApplication, AdmissionController, AsyncWaiter, Shed, Waiter, aacquire,
+    get_controller, request_age,
+)
+
+CLASSES = {
+    'default': {'limit': 1, 'queue': 1, 'timeout': 0.5, 'priority': 'high'},
+    'menu_read': {'limit': 1, 'queue': 1, 'timeout': 0.5, 'priority': 'normal'},
+    'reports': {'limit': 2, 'queue': 1, 'timeout': 0.5, 'priority': 'low'},
+}
+ROUTES = [
+    ('reports', None, r'^/restaurant/booking/stats/'),
+    ('menu_read', ('GET', 'HEAD'), r'^/restaurant/(async/)?menu/items/'),
+]
+
+SHED_AT = {'low': 1}
+
+
+class AdmissionControllerTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.controller = AdmissionController(CLASSES, ROUTES, SHED_AT, retry_after_max=30)
+        self.menu = self.controller.classes['menu_read']
+
+    def assertShed(self, route, reason, age=0.0):
+        with self.assertRaises(Shed) as caught:
+            self.controller.admit(route, age, Waiter)
+        self.assertEqual(caught.exception.reason, reason)
+        return caught.exception
+
+    def test_classify(self):
+        classify = self.controller.classify
+        self.assertEqual(classify('GET', '/restaurant/menu/items/').name, 'menu_read')
+        self.assertEqual(classify('GET', '/restaurant/async/menu/items/3').name, 'menu_read')
+        self.assertEqual(classify('POST', '/restaurant/menu/items/').name, 'default')
+        self.assertEqual(classify('GET', '/restaurant/booking/stats/weekly/').name, 'reports')
+        self.assertEqual(classify('GET', '/restaurant/menu/').name, 'default')
+
+    def test_queue_hands_over_slot(self):
+        """
+        Test that a request over the limit waits, gets the slot the running
+        request gives back, and a third one finds the queue full.
+        """
+        self.assertIsNone(self.controller.admit(self.menu, 0.0, Waiter))
+        waiter = self.controller.admit(self.menu, 0.0, Waiter)
+        self.assertIsInstance(waiter, Waiter)
+        self.assertShed(self.menu, 'queue_full')
+
+        threading.Timer(0.05, self.controller.release, (self.menu, 0.05)).start()
+        waiter.wait(1)
+        self.controller.wait_finished(self.menu, waiter, 0.05)
+        self.assertEqual((self.menu.in_flight, len(self.menu.waiters)), (1, 0))
+        self.controller.release(self.menu, 0.05)
+        self.assertEqual((self.menu.in_flight, self.controller.in_flight), (0, 0))
+        self.assertEqual(self.menu.admitted, 2)
+
+    def test_queue_timeout(self):
+        self.controller.admit(self.menu, 0.0, Waiter)
+        waiter = self.controller.admit(self.menu, 0.0, Waiter)
+        waiter.wait(0.01)
+        with self.assertRaises(Shed) as caught:
+            self.controller.wait_finished(self.menu, waiter, 0.01)
+        self.assertEqual(caught.exception.reason, 'timeout')
+        self.assertEqual(len(self.menu.waiters), 0)
+
+    def test_shed_early(self):
+        """
+        Test that a request is shed without waiting when it reached Django
+        past the deadline, or the class's latency says it would miss it.
+        """
+        self.assertShed(self.menu, 'expired', age=0.6)
+        self.controller.admit(self.menu, 0.0, Waiter)
+        self.controller.release(self.menu, 0.2)
+        self.controller.admit(self.menu, 0.0, Waiter)
+        self.assertShed(self.menu, 'deadline', age=0.4)
+        self.controller.release(self.menu, 3.0)
+        self.controller.admit(self.menu, 0.0, Waiter)
+        exc = self.assertShed(self.menu, 'deadline')
+        self.assertEqual(exc.retry_after, 1)
+
+    def test_low_priority_shed_when_busy(self):
+        reports = self.controller.classes['reports']
+        self.controller.admit(self.menu, 0.0, Waiter)
+        self.assertShed(reports, 'overload')
+        self.controller.release(self.menu, 0.01)
+        self.assertIsNone(self.controller.admit(reports, 0.0, Waiter))
+
+    def test_async_waiter(self):
+        async def scenario():
+            self.controller.admit(self.menu, 0.0, AsyncWaiter)
+            waiter = self.controller.admit(self.menu, 0.0, AsyncWaiter)
+            threading.Timer(0.05, self.controller.release, (self.menu, 0.05)).start()
+            await waiter.wait(1)
+            self.controller.wait_finished(self.menu, waiter, 0.05)
+
+        async_to_sync(scenario)()
+        self.assertEqual(self.menu.in_flight, 1)
+
+    def test_cancelled_waiter(self):
+        """
+        Test that a queued request whose task is cancelled leaves the queue,
+        and gives back a slot it was handed before the cancellation ran.
+        """
+        async def cancel(granted):
+            self.controller.admit(self.menu, 0.0, AsyncWaiter)
+            task = asyncio.ensure_future(aacquire(self.controller, self.menu, 0.0))
+            await asyncio.sleep(0)
+            if granted:
+                self.controller.release(self.menu, 0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            if not granted:
+                self.controller.release(self.menu, 0.05)
+
+        for granted in (False, True):
+            with self.subTest(granted=granted):
+                async_to_sync(cancel)(granted)
+                self.assertEqual((self.menu.in_flight, len(self.menu.waiters)), (0, 0))
+                self.assertEqual(self.controller.in_flight, 0)
+
+    def test_limit_must_be_positive(self):
+        with self.assertRaises(ImproperlyConfigured):
+            AdmissionController({'default': {'limit': 0, 'queue': 1, 'timeout': 1}}, [], {}, retry_after_max=30)
+
+    def test_metrics(self):
+        self.controller.admit(self.menu, 0.0, Waiter)
+        self.assertShed(self.menu, 'expired', age=1)
+        metrics = '\n'.join(self.controller.render_metrics())
+        self.assertIn('littlelemon_admission_in_flight{class="menu_read"} 1', metrics)
+        self.assertIn('littlelemon_admission_shed_total{class="menu_read",reason="expired"} 1', metrics)
+
+    def test_request_age(self):
+        now = 1_700_000_010.0
+        self.assertEqual(request_age('t=1700000000.000', now), 10.0)
+        self.assertEqual(request_age('1700000000000', now), 10.0)
+        self.assertEqual(request_age('t=1700000000000000', now), 10.0)
+        self.assertEqual(request_age('', now), 0.0)
+        self.assertEqual(request_age('t=1800000000', now), 0.0)
+
+
+class AdmissionSettingsMixin:
+
+    def setUp(self):
+        # Enabled per test, so each one starts with an idle controller.
+        settings_override = override_settings(
+            ADMISSION_CLASSES=CLASSES, ADMISSION_ROUTES=ROUTES, ADMISSION_SHED_AT=SHED_AT,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class AdmissionControlApplicationTestCase(AdmissionSettingsMixin, SimpleTestCase):
+
+    def scope(self, path='/restaurant/menu/items/', headers=()):
+        return {'type': 'http', 'method': 'GET', 'path': path, 'headers': list(headers)}
+
+    def test_admitted_request(self):
+        """
+        Test that an admitted request reaches the application marked as
+        admitted, and gives its slot back once the response is sent.
+        """
+        application = mock.AsyncMock()
+        async_to_sync(AdmissionControlApplication(application))(self.scope(), None, None)
+        scope = application.await_args.args[0]
+        self.assertIs(scope[SCOPE_KEY], True)
+        menu = get_controller().classes['menu_read']
+        self.assertEqual((menu.admitted, menu.in_flight), (1, 0))
+
+    def test_shed_request(self):
+        application = mock.AsyncMock()
+        send = mock.AsyncMock()
+        started = f't={time.time() - 5:.3f}'.encode()
+        scope = self.scope(headers=[(b'x-request-start', started)])
+        async_to_sync(AdmissionControlApplication(application))(scope, None, send)
+        application.assert_not_awaited()
+        start, body = (call.args[0] for call in send.await_args_list)
+        self.assertEqual(start['status'], 503)
+        self.assertIn((b'x-shed-reason', b'expired'), start['headers'])
+        self.assertIn((b'retry-after', b'1'), start['headers'])
+        self.assertIn(b'too busy', body['body'])
+
+
+class AdmissionControlMiddlewareTestCase(AdmissionSettingsMixin, TestCase):
+
+    def test_shed_response(self):
+        """
+        Test that a request of a full class gets 503 with Retry-After while
+        other classes are still served.
+        """
+        controller = get_controller()
+        menu = controller.classes['menu_read']
+        controller.admit(menu, 0.0, Waiter)
+        controller.admit(menu, 0.0, Waiter)
+
+        response = self.client.get(reverse('menu_items'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(response['X-Shed-Reason'], 'queue_full')
+        self.assertEqual(self.client.get(reverse('index')).status_code, 200)
+
+    def test_expired_request(self):
+        started = f't={time.time() - 5:.3f}'
+        response = self.client.get(reverse('menu_items'), HTTP_X_REQUEST_START=started)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['X-Shed-Reason'], 'expired')
+
+    def test_slot_released(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse('menu_items')).status_code, 200)
+        self.assertEqual(get_controller().in_flight, 0)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('menu_items'))
+        self.assertContains(
+            self.client.get(reverse('metrics')), 'littlelemon_admission_admitted_total{class="menu_read"} 1',
+        )
@@ -0,0 +1,125 @@
+from decimal import Decimal
+import json
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from restaurant.models import Menu, Booking
+from restaurant.serializers import MenuSerializer, BookingSerializer
+
+
+class AsyncMenuViewsTestCase(TestCase):
+
+    def setUp(self):
+        self.menu_item = Menu.objects.create(
+            title='Spaghetti Carbonara',
+            price=Decimal('12.99'),
+            inventory=5
+        )
+
+    def test_list_matches_sync_view(self):
+        """
+        Test that the async menu list returns the same payload as the sync view.
+        """
+        response = self.client.get(reverse('async_menu_items'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), self.client.get(reverse('menu_items')).json())
+
+    def test_create(self):
+        """
+        Test that the async menu list view creates a menu item.
+        """
+        response = self.client.post(
+            reverse('async_menu_items'),
+            data=json.dumps({'title': 'Penne Arrabbiata', 'price': '10.99', 'inventory': 3}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Menu.objects.count(), 2)
+
+    def test_create_invalid(self):
+        """
+        Test that invalid payloads are rejected with the serializer errors.
+        """
+        response = self.client.post(
+            reverse('async_menu_items'),
+            data=json.dumps({'title': 'Penne Arrabbiata'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price', response.json())
+
+    def test_retrieve_update_delete(self):
+        """
+        Test the async single menu item view end to end.
+        """
+        url = reverse('async_single_menu_item', args=[self.menu_item.id])
+        response = self.client.get(url)
+        self.assertEqual(response.json(), json.loads(json.dumps(MenuSerializer(self.menu_item).data)))
+
+        response = self.client.patch(url, data=json.dumps({'inventory': 7}), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.menu_item.refresh_from_db()
+        self.assertEqual(self.menu_item.inventory, 7)
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_json(self):
+        response = self.client.post(reverse('async_menu_items'), data='{', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncBookingViewsTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        self.booking = Booking.objects.create(
+            user=self.user, name='Test booking', number_of_guest=2, booking_date='2022-05-20'
+        )
+
+    def test_requires_authentication(self):
+        response = self.client.get(reverse('async_tables_list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse('async_tables_list'), HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_with_token(self):
+        response = self.client.get(reverse('async_tables_list'), **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.booking.refresh_from_db()
+        self.assertEqual(response.json(), [json.loads(json.dumps(BookingSerializer(self.booking).data))])
+
+    def test_list_with_session(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('async_tables_list'))
+        self.assertEqual(len(response.json()), 1)
+
+    def test_create(self):
+        data = {'name': 'New booking', 'number_of_guest': 4, 'booking_date': '2022-06-15'}
+        response = self.client.post(
+            reverse('async_tables_list'), data=json.dumps(data), content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Booking.objects.get(name='New booking').user, self.user)
+
+    def test_other_users_booking_is_hidden(self):
+        other = User.objects.create_user(username='otheruser', password='testpass')
+        booking = Booking.objects.create(user=other, name='Theirs', number_of_guest=2, booking_date='2022-05-20')
+        response = self.client.get(reverse('async_tables_detail', args=[booking.id]), **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_and_delete(self):
+        url = reverse('async_tables_detail', args=[self.booking.id])
+        response = self.client.patch(
+            url, data=json.dumps({'number_of_guest': 3}), content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['number_of_guest'], 3)
+        response = self.client.delete(url, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Booking.objects.count(), 0)
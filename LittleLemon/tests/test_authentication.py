@@ -0,0 +1,110 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from restaurant import authentication
+from restaurant.authentication import LRUCache
+from restaurant.models import Booking
+
+
+class LRUCacheTestCase(TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_expires_after_ttl(self):
+        cache = LRUCache(maxsize=2, ttl=-1)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    # SessionAuthentication comes first in DEFAULT_AUTHENTICATION_CLASSES,
+    # so rejected credentials are answered with 403 rather than 401.
+
+    def setUp(self):
+        authentication.token_users.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        Booking.objects.create(user=self.user, name='Dinner', number_of_guest=2, booking_date='2022-05-20')
+        self.url = reverse('tables-list')
+
+    def test_second_request_skips_token_query(self):
+        """
+        Test that a cached token resolves its user without querying the database.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Query-Count'], '2')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Query-Count'], '1')
+        self.assertEqual(len(response.data), 1)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_logout_invalidates_token(self):
+        """
+        Test that a token deleted through djoser logout stops authenticating immediately.
+        """
+        self.client.get(self.url)
+        response = self.client.post('/auth/token/logout/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cached_user(self):
+        """
+        Test that every request gets its own user instance, built without the
+        password hash, which is loaded only when read and left alone by save().
+        """
+        self.client.get(self.url)
+        (entry, _), = authentication.token_users._data.values()
+        self.assertNotIn(self.user.password, entry[1].values())
+        first = authentication.get_token_user(self.token.key)
+        second = authentication.get_token_user(self.token.key)
+        self.assertIsNot(first, second)
+        self.assertEqual((first.pk, first.username, first.is_active), (self.user.pk, 'testuser', True))
+        self.assertIn('password', first.get_deferred_fields())
+        second.email = 'guest@example.com'
+        second.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'guest@example.com')
+        with self.assertNumQueries(1):
+            self.assertTrue(first.check_password('testpass'))
+
+    @override_settings(
+        TOKEN_AUTH_SHARED_CACHE_ALIAS='default',
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth'}},
+    )
+    def test_shared_cache(self):
+        """
+        Test that another process's empty LRU is filled from the shared cache.
+        """
+        self.client.get(self.url)
+        authentication.token_users.clear()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Query-Count'], '1')
+        self.token.delete()
+        authentication.token_users.clear()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
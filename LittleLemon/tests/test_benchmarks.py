@@ -0,0 +1,117 @@
+import importlib.util
+from io import StringIO
+import json
+import socket
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from restaurant.models import Menu, Booking
+from benchmarks import seeding
+
+
+class SeedBenchmarkTestCase(TestCase):
+
+    def test_seed(self):
+        """
+        Test that seed_benchmark loads the requested volumes in batches.
+        """
+        call_command('seed_benchmark', menu=25, bookings=40, users=3, batch_size=7, stdout=StringIO())
+        self.assertEqual(Menu.objects.count(), 25)
+        self.assertEqual(Booking.objects.count(), 40)
+        self.assertEqual(User.objects.filter(username__startswith=seeding.USERNAME_PREFIX).count(), 3)
+        self.assertEqual(Token.objects.count(), 3)
+        self.assertFalse(Booking.objects.filter(user__isnull=True).exists())
+
+    def test_seed_is_reproducible(self):
+        """
+        Test that the same seed produces the same data.
+        """
+        call_command('seed_benchmark', menu=10, bookings=0, users=0, seed=3, stdout=StringIO())
+        first = list(Menu.objects.order_by('pk').values_list('price', 'inventory'))
+        call_command('seed_benchmark', menu=10, bookings=0, users=0, seed=3, clear=True, stdout=StringIO())
+        self.assertEqual(list(Menu.objects.order_by('pk').values_list('price', 'inventory')), first)
+
+
+class RunBenchmarkTestCase(TestCase):
+
+    def test_report(self):
+        """
+        Test that run_benchmark reports every scenario without errors and leaves no writes behind.
+        """
+        call_command('seed_benchmark', menu=20, bookings=20, users=2, stdout=StringIO())
+        stdout = StringIO()
+        call_command('run_benchmark', iterations=3, stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(
+            [result['scenario'] for result in report['results']],
+            ['menu_list', 'menu_detail', 'menu_create', 'menu_filter', 'menu_search',
+             'menu_autocomplete', 'booking_list', 'booking_create'],
+        )
+        results = {result['scenario']: result for result in report['results']}
+        self.assertIsInstance(results['menu_search']['within_target'], bool)
+        self.assertIsNone(results['menu_list']['within_target'])
+        for result in report['results']:
+            self.assertEqual(result['errors'], {}, result['scenario'])
+            self.assertIsNotNone(result['p99_ms'])
+            self.assertIsNotNone(result['queries_per_request'])
+        self.assertEqual(Menu.objects.count(), 20)
+        self.assertEqual(Booking.objects.count(), 20)
+
+
+class RunThrottleBenchmarkTestCase(TestCase):
+
+    def test_report(self):
+        """
+        Test that the throttle benchmark reports both throttles at each
+        checkpoint, with the sliding window's cache entries staying flat.
+        """
+        stdout = StringIO()
+        call_command('run_throttle_benchmark', requests=100, stdout=stdout)
+        results = json.loads(stdout.getvalue())['results']
+        self.assertEqual(
+            [(r['throttle'], r['requests']) for r in results],
+            [('sliding_window', 10), ('sliding_window', 100), ('drf_timestamps', 10), ('drf_timestamps', 100)],
+        )
+        sliding = [r['entry_bytes'] for r in results if r['throttle'] == 'sliding_window']
+        timestamps = [r['entry_bytes'] for r in results if r['throttle'] == 'drf_timestamps']
+        self.assertEqual(sliding[0], sliding[1])
+        self.assertGreater(timestamps[1], timestamps[0])
+
+
+class RunRenderBenchmarkTestCase(TestCase):
+
+    def test_report(self):
+        """
+        Test that the render benchmark reports both renderers for both
+        payloads, with identical bodies and a smaller gzipped size.
+        """
+        stdout = StringIO()
+        call_command('run_render_benchmark', menu=50, bookings=50, repeat=1, stdout=stdout)
+        results = json.loads(stdout.getvalue())['results']
+        self.assertEqual(
+            [(r['payload'], r['renderer']) for r in results],
+            [('menu', 'drf'), ('menu', 'fast'), ('bookings', 'drf'), ('bookings', 'fast')],
+        )
+        self.assertEqual(results[0]['bytes'], results[1]['bytes'])
+        self.assertLess(results[0]['gzip_bytes'], results[0]['bytes'])
+
+
+@skipUnless(importlib.util.find_spec('uvicorn'), 'uvicorn is not installed')
+class RunPushBenchmarkTestCase(TestCase):
+
+    def test_report(self):
+        """
+        Test that the push benchmark holds every stream open without adding
+        server threads.
+        """
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        stdout = StringIO()
+        call_command('run_push_benchmark', connections=50, events=0, port=port, stdout=stdout)
+        result = json.loads(stdout.getvalue())['results'][0]
+        self.assertEqual((result['connections'], result['connect_errors']), (50, 0))
+        if result['threads_idle'] is not None:
+            self.assertEqual(result['threads_connected'], result['threads_idle'])
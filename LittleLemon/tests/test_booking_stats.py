@@ -0,0 +1,155 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from restaurant.models import Booking, BookingDailyStats
+from restaurant.testing import QueryBudgetMixin
+
+
+def summary():
+    return {
+        stats.date: (stats.bookings, stats.guests)
+        for stats in BookingDailyStats.objects.filter(bookings__gt=0)
+    }
+
+
+def recomputed():
+    rows = (
+        Booking.objects.order_by().values_list('booking_date')
+        .annotate(bookings=Count('id'), guests=Sum('number_of_guest'))
+    )
+    return {day: (bookings, guests) for day, bookings, guests in rows}
+
+
+class IncrementalStatsTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='diner', password='pass')
+        self.client.force_authenticate(user=self.user)
+
+    def test_api_writes(self):
+        """
+        Test that creating, moving, resizing and deleting bookings through the
+        API keeps the summary equal to a full aggregate.
+        """
+        urls = []
+        for day, guests in (('2030-01-01', 2), ('2030-01-01', 3), ('2030-01-02', 4)):
+            response = self.client.post(
+                reverse('tables-list'), {'name': 'Party', 'number_of_guest': guests, 'booking_date': day}
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            urls.append(reverse('tables-detail', args=[response.data['id']]))
+        self.assertEqual(summary(), {date(2030, 1, 1): (2, 5), date(2030, 1, 2): (1, 4)})
+
+        self.client.put(urls[0], {'name': 'Party', 'number_of_guest': 6, 'booking_date': '2030-01-03'})
+        self.client.patch(urls[1], {'number_of_guest': 1})
+        self.client.delete(urls[2])
+        self.assertEqual(summary(), {date(2030, 1, 1): (1, 1), date(2030, 1, 3): (1, 6)})
+        self.assertEqual(summary(), recomputed())
+
+    def test_rejected_write_leaves_stats(self):
+        """
+        Test that a booking refused for lack of seats is not counted.
+        """
+        response = self.client.post(
+            reverse('tables-list'), {'name': 'Huge', 'number_of_guest': 500, 'booking_date': '2030-01-01'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(summary(), {})
+
+    def test_orm_writes(self):
+        """
+        Test that saves of partially loaded bookings and queryset deletes are
+        counted too.
+        """
+        for guests in (2, 3, 4):
+            Booking.objects.create(name='Party', number_of_guest=guests, booking_date=date(2030, 1, 1))
+        booking = Booking.objects.only('name').first()
+        booking.booking_date = date(2030, 1, 5)
+        booking.save()
+        Booking.objects.filter(number_of_guest=4).delete()
+        self.assertEqual(summary(), {date(2030, 1, 1): (1, 3), date(2030, 1, 5): (1, 2)})
+        self.assertEqual(summary(), recomputed())
+
+
+class RebuildStatsTestCase(TestCase):
+
+    def setUp(self):
+        Booking.objects.bulk_create(
+            Booking(name=f'Party {i}', number_of_guest=i % 5 + 1, booking_date=date(2030, 1, 1 + i % 20))
+            for i in range(100)
+        )
+        BookingDailyStats.objects.create(date=date(2029, 6, 1), bookings=3, guests=9)
+        BookingDailyStats.objects.create(date=date(2030, 1, 1), bookings=99, guests=99)
+
+    def test_rebuild(self):
+        """
+        Test that the command recomputes every booked date in batches and
+        drops rows outside the booked range.
+        """
+        call_command('rebuild_booking_stats', days=7, stdout=StringIO())
+        self.assertEqual(len(recomputed()), 20)
+        self.assertEqual(summary(), recomputed())
+        self.assertFalse(BookingDailyStats.objects.filter(date=date(2029, 6, 1)).exists())
+
+    def test_rebuild_range(self):
+        """
+        Test that --start/--end rebuild only the given dates.
+        """
+        call_command('rebuild_booking_stats', '--start=2030-01-01', '--end=2030-01-03', stdout=StringIO())
+        self.assertEqual(set(summary()), {date(2029, 6, 1), date(2030, 1, 1), date(2030, 1, 2), date(2030, 1, 3)})
+        self.assertEqual(summary()[date(2030, 1, 1)], recomputed()[date(2030, 1, 1)])
+
+
+class BookingStatsViewTestCase(QueryBudgetMixin, APITestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='manager', password='pass', is_staff=True)
+        self.client.force_authenticate(user=self.staff)
+        # 2030-01-07 is a Monday.
+        for day, guests in (('2030-01-06', 2), ('2030-01-07', 5), ('2030-01-07', 3), ('2030-01-09', 4)):
+            Booking.objects.create(name='Party', number_of_guest=guests, booking_date=day)
+        self.range = {'start': '2030-01-01', 'end': '2030-01-31'}
+
+    def test_daily(self):
+        response = self.client.get(reverse('booking-stats-list'), self.range)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'date': '2030-01-06', 'bookings': 1, 'guests': 2},
+            {'date': '2030-01-07', 'bookings': 2, 'guests': 8},
+            {'date': '2030-01-09', 'bookings': 1, 'guests': 4},
+        ])
+        self.assertWithinQueryBudget(response)
+
+    def test_weekly(self):
+        response = self.client.get(reverse('booking-stats-weekly'), self.range)
+        self.assertEqual(response.data, [
+            {'week': '2029-12-31', 'bookings': 1, 'guests': 2},
+            {'week': '2030-01-07', 'bookings': 3, 'guests': 12},
+        ])
+        self.assertWithinQueryBudget(response)
+
+    def test_peaks(self):
+        response = self.client.get(reverse('booking-stats-peaks'), {**self.range, 'limit': 2})
+        self.assertEqual([row['date'] for row in response.data], ['2030-01-07', '2030-01-09'])
+        self.assertWithinQueryBudget(response)
+
+    def test_invalid_range(self):
+        response = self.client.get(reverse('booking-stats-list'), {'start': '2030-01-02', 'end': '2030-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('booking-stats-list'), {'start': '2000-01-01', 'end': '2030-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_only(self):
+        """
+        Test that the stats are not readable by ordinary users.
+        """
+        self.client.force_authenticate(user=User.objects.create_user(username='diner', password='pass'))
+        response = self.client.get(reverse('booking-stats-list'), self.range)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
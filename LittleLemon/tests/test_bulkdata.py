@@ -0,0 +1,182 @@
+from datetime import date
+from decimal import Decimal
+import gzip
+from io import StringIO
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from restaurant import bulkdata
+from restaurant.models import Booking, BookingDailyStats, Menu
+
+
+class BulkDataTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def write(self, name, text):
+        with open(self.path(name), 'w') as f:
+            f.write(text)
+        return self.path(name)
+
+    def run_command(self, *args, **options):
+        call_command(*args, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def menu_rows(self):
+        return list(Menu.objects.order_by('id').values_list('id', 'title', 'price', 'inventory'))
+
+
+class ExportImportTestCase(BulkDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Menu.objects.bulk_create(
+            Menu(title=f'Dish, "{i}"', price=Decimal(i) + Decimal('0.25'), inventory=i) for i in range(23)
+        )
+        self.user = User.objects.create_user(username='diner', password='pass')
+        Booking.objects.create(user=self.user, name='Ada', number_of_guest=2, booking_date=date(2030, 1, 2))
+        Booking.objects.create(name='Walk-in', number_of_guest=4, booking_date=date(2030, 1, 3))
+
+    def test_menu_round_trip(self):
+        """
+        Test that exported menu items import back unchanged, in every format,
+        across several batches.
+        """
+        expected = self.menu_rows()
+        for name in ('menu.csv', 'menu.jsonl', 'menu.csv.gz', 'menu.ndjson.gz'):
+            self.run_command('export_menu', self.path(name), batch_size=5)
+            Menu.objects.all().delete()
+            self.run_command('import_menu', self.path(name), batch_size=5)
+            self.assertEqual(self.menu_rows(), expected, name)
+            self.assertFalse(os.path.exists(bulkdata.checkpoint_path(self.path(name))))
+
+    def test_booking_round_trip(self):
+        """
+        Test that bookings keep their user, or lack of one, through export and import.
+        """
+        fields = ('id', 'user_id', 'name', 'number_of_guest', 'booking_date')
+        expected = list(Booking.objects.order_by('id').values_list(*fields))
+        for name in ('bookings.csv', 'bookings.jsonl'):
+            self.run_command('export_bookings', self.path(name))
+            Booking.objects.all().delete()
+            self.run_command('import_bookings', self.path(name))
+            self.assertEqual(list(Booking.objects.order_by('id').values_list(*fields)), expected, name)
+            self.assertEqual(
+                list(BookingDailyStats.objects.order_by('date').values_list('date', 'bookings', 'guests')),
+                [(date(2030, 1, 2), 1, 2), (date(2030, 1, 3), 1, 4)],
+            )
+
+        with open(self.path('bookings.jsonl')) as f:
+            self.assertEqual(json.loads(f.readline())['booking_date'], '2030-01-02')
+
+    def test_export_to_stdout(self):
+        """
+        Test that - writes the records, and nothing else, to standard output.
+        """
+        stdout = StringIO()
+        call_command('export_menu', '-', format='jsonl', stdout=stdout, stderr=StringIO())
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 23)
+        self.assertEqual(json.loads(lines[0])['price'], '0.25')
+
+    def test_resume_export(self):
+        """
+        Test that a resumed export drops the half-written last line and
+        appends the remaining rows exactly once.
+        """
+        for name in ('full.csv', 'full.jsonl'):
+            self.run_command('export_menu', self.path(name))
+            with open(self.path(name), 'rb') as f:
+                full = f.read()
+            cut = self.path('partial' + os.path.splitext(name)[1])
+            with open(cut, 'wb') as f:
+                f.write(full[:len(full) // 2])
+            self.run_command('export_menu', cut, resume=True, batch_size=4)
+            with open(cut, 'rb') as f:
+                self.assertEqual(f.read(), full, name)
+
+
+class ImportTestCase(BulkDataTestCase):
+
+    def test_invalid_row(self):
+        """
+        Test that an invalid row stops the import with its line number and
+        leaves the batches before it committed and checkpointed.
+        """
+        rows = ''.join(f'Dish {i},{i}.50,{i}\n' for i in range(7))
+        path = self.write('menu.csv', 'title,price,inventory\n' + rows + 'Bad,cheap,1\n')
+        with self.assertRaisesMessage(CommandError, 'Line 9: price:'):
+            self.run_command('import_menu', path, batch_size=3)
+        self.assertEqual(Menu.objects.count(), 6)
+        self.assertEqual(bulkdata.read_checkpoint(path), 6)
+
+        with self.assertRaisesMessage(CommandError, '--resume'):
+            self.run_command('import_menu', path)
+
+        self.write('menu.csv', 'title,price,inventory\n' + rows + 'Good,1.00,1\n')
+        self.run_command('import_menu', path, resume=True, batch_size=3)
+        self.assertEqual(
+            list(Menu.objects.order_by('id').values_list('title', flat=True)),
+            [f'Dish {i}' for i in range(7)] + ['Good'],
+        )
+        self.assertFalse(os.path.exists(bulkdata.checkpoint_path(path)))
+
+    def test_resume_after_unrecorded_batch(self):
+        """
+        Test that rows with ids committed after the last checkpoint are not
+        inserted twice when the import resumes.
+        """
+        path = self.path('menu.jsonl.gz')
+        with gzip.open(path, 'wt') as f:
+            for i in range(1, 11):
+                f.write(json.dumps({'id': i, 'title': f'Dish {i}', 'price': 1, 'inventory': i}) + '\n')
+        # Six rows made it in but the checkpoint only records three.
+        Menu.objects.bulk_create(Menu(id=i, title=f'Dish {i}', price=1, inventory=i) for i in range(1, 7))
+        bulkdata.write_checkpoint(path, 3)
+
+        self.run_command('import_menu', path, resume=True, batch_size=4)
+        self.assertEqual(list(Menu.objects.order_by('id').values_list('id', flat=True)), list(range(1, 11)))
+
+    def test_restart(self):
+        """
+        Test that --restart discards the checkpoint and reads the whole file.
+        """
+        path = self.write('menu.csv', 'title,price,inventory\nSoup,4.00,3\n')
+        bulkdata.write_checkpoint(path, 1)
+        self.run_command('import_menu', path, restart=True)
+        self.assertEqual(Menu.objects.count(), 1)
+
+    def test_validation(self):
+        """
+        Test that unknown columns, missing values and values the column
+        cannot hold are rejected.
+        """
+        cases = [
+            ('title,price,inventory,colour\nSoup,4.00,3,red\n', 'unknown columns colour'),
+            ('title,inventory\nSoup,3\n', 'missing price'),
+            ('title,price,inventory\nSoup,123456789012.00,3\n', 'price:'),
+            ('title,price,inventory\n' + 'x' * 256 + ',4.00,3\n', 'title:'),
+        ]
+        for text, message in cases:
+            path = self.write('menu.csv', text)
+            with self.assertRaisesMessage(CommandError, message):
+                self.run_command('import_menu', path, restart=True)
+        self.assertFalse(Menu.objects.exists())
+
+    def test_unknown_format(self):
+        """
+        Test that a file without a known extension needs --format.
+        """
+        path = self.write('menu.txt', '{"title": "Soup", "price": "4.00", "inventory": 3}\n')
+        with self.assertRaisesMessage(CommandError, '--format'):
+            self.run_command('import_menu', path)
+        self.run_command('import_menu', path, format='jsonl')
+        self.assertEqual(Menu.objects.get().title, 'Soup')
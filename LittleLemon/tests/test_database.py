@@ -0,0 +1,202 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+from LittleLemon.db import database_config
+from LittleLemon.db.pool import ConnectionPool, PoolTimeout, close_pools, render_pool_metrics
+from restaurant.metrics import registry
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class DatabaseConfigTestCase(SimpleTestCase):
+
+    def test_defaults(self):
+        """
+        Test that without environment variables the local MySQL database is
+        used with persistent, health-checked connections.
+        """
+        default = database_config({})['default']
+        self.assertEqual(default['ENGINE'], 'django.db.backends.mysql')
+        self.assertEqual(default['NAME'], 'LittleLemon')
+        self.assertEqual(default['CONN_MAX_AGE'], 60)
+        self.assertTrue(default['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('POOL', default)
+
+    def test_environment_overrides(self):
+        """
+        Test that connection settings are read from the environment.
+        """
+        default = database_config({
+            'DATABASE_HOST': 'db.internal',
+            'DATABASE_CONN_MAX_AGE': 'none',
+            'DATABASE_CONN_HEALTH_CHECKS': 'false',
+        })['default']
+        self.assertEqual(default['HOST'], 'db.internal')
+        self.assertIsNone(default['CONN_MAX_AGE'])
+        self.assertFalse(default['CONN_HEALTH_CHECKS'])
+
+    def test_pool(self):
+        """
+        Test that DATABASE_POOL switches to the pooled backend and leaves
+        connection lifetimes to the pool.
+        """
+        default = database_config({
+            'DATABASE_POOL': '1',
+            'DATABASE_POOL_SIZE': '4',
+            'DATABASE_POOL_MAX_OVERFLOW': '2',
+        })['default']
+        self.assertEqual(default['ENGINE'], 'LittleLemon.db.mysql')
+        self.assertEqual(default['CONN_MAX_AGE'], 0)
+        self.assertEqual(default['POOL']['SIZE'], 4)
+        self.assertEqual(default['POOL']['MAX_OVERFLOW'], 2)
+
+    def test_invalid_values(self):
+        """
+        Test that malformed values fail loudly.
+        """
+        for env in (
+            {'DATABASE_ENGINE': 'oracle'},
+            {'DATABASE_CONN_MAX_AGE': 'soon'},
+            {'DATABASE_POOL': 'maybe'},
+            {'DATABASE_POOL': '1', 'DATABASE_POOL_SIZE': '0'},
+        ):
+            with self.subTest(env=env), self.assertRaises(ImproperlyConfigured):
+                database_config(env)
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+
+    def test_reuses_released_connections(self):
+        """
+        Test that a released connection is handed out again.
+        """
+        pool = ConnectionPool(FakeConnection, size=2)
+        conn = pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(pool.stats()['created'], 1)
+        self.assertEqual(pool.stats()['reused'], 1)
+
+    def test_overflow_connections_are_closed_on_release(self):
+        """
+        Test that connections beyond the pool size are closed when returned.
+        """
+        pool = ConnectionPool(FakeConnection, size=1, max_overflow=1)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(second)
+        self.assertTrue(second.closed)
+        pool.release(first)
+        self.assertFalse(first.closed)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_timeout_when_exhausted(self):
+        """
+        Test that acquire gives up once the pool and overflow are in use.
+        """
+        pool = ConnectionPool(FakeConnection, size=1, max_overflow=0, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        """
+        Test that a waiting acquire is served by a connection released by
+        another thread.
+        """
+        pool = ConnectionPool(FakeConnection, size=1, max_overflow=0, timeout=5)
+        conn = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, (conn,))
+        timer.start()
+        self.assertIs(pool.acquire(), conn)
+        timer.join()
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_idle_and_broken_connections_are_replaced(self):
+        """
+        Test that expired and unusable idle connections are closed rather
+        than handed out.
+        """
+        pool = ConnectionPool(FakeConnection, size=2, idle_timeout=0)
+        conn = pool.acquire()
+        pool.release(conn, discard=True)
+        self.assertTrue(conn.closed)
+
+        pool = ConnectionPool(FakeConnection, size=2, ping=lambda conn: False)
+        conn = pool.acquire()
+        pool.release(conn)
+        self.assertIsNot(pool.acquire(), conn)
+        self.assertTrue(conn.closed)
+
+    def test_failed_connect_frees_slot(self):
+        """
+        Test that a connection error does not leak a pool slot.
+        """
+        def connect():
+            raise OSError('refused')
+
+        pool = ConnectionPool(connect, size=1, max_overflow=0, timeout=0)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                pool.acquire()
+        self.assertEqual(pool.stats()['open'], 0)
+
+
+class PooledSQLiteBackendTestCase(SimpleTestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+        self.addCleanup(close_pools)
+        self.connections = ConnectionHandler({'default': {
+            'ENGINE': 'LittleLemon.db.sqlite3',
+            'NAME': self.path,
+            'POOL': {'SIZE': 2, 'MAX_OVERFLOW': 0},
+        }})
+        self.addCleanup(self.connections.close_all)
+
+    def test_close_returns_connection_to_pool(self):
+        """
+        Test that closing the Django connection hands the underlying
+        connection back to the pool for the next request.
+        """
+        connection = self.connections['default']
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = connection.connection
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(connection.connection, raw)
+        self.assertEqual(connection.pool.stats()['created'], 1)
+
+    def test_broken_connection_fails_ping(self):
+        connection = self.connections['default']
+        connection.ensure_connection()
+        raw = connection.connection
+        self.assertTrue(connection.ping_connection(raw))
+        raw.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.ping_connection(raw)
+
+    def test_pool_metrics(self):
+        """
+        Test that pool statistics are exported with the request metrics.
+        """
+        connection = self.connections['default']
+        connection.ensure_connection()
+        self.assertIn('littlelemon_db_pool_in_use{alias="default"} 1', render_pool_metrics())
+        self.assertIn('littlelemon_db_pool_open{alias="default"} 1', registry.render())
@@ -0,0 +1,63 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from restaurant.fast_serializers import FastBookingSerializer, FastMenuSerializer
+from restaurant.models import Menu, Booking
+from restaurant.serializers import MenuSerializer, BookingSerializer
+
+
+class FastSerializerParityTestCase(APITestCase):
+    """
+    The fast read paths must render byte-identical JSON to the DRF serializers.
+    """
+
+    def setUp(self):
+        for title, price in (
+            ('Water', Decimal('0')),
+            ('Bread', Decimal('0.10')),
+            ('Crème brûlée', Decimal('7.5')),
+            ('Truffle', Decimal('12345678.99')),
+        ):
+            Menu.objects.create(title=title, price=price, inventory=3)
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        Booking.objects.create(user=self.user, name='Dinner', number_of_guest=2, booking_date=date(2022, 5, 20))
+        Booking.objects.create(user=self.user, name='Lunch', number_of_guest=4, booking_date=date(2022, 12, 1))
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_menu_rows(self):
+        expected = self.render(MenuSerializer(Menu.objects.order_by('id'), many=True).data)
+        actual = self.render(FastMenuSerializer.many(FastMenuSerializer.values(Menu.objects.order_by('id'))))
+        self.assertEqual(actual, expected)
+
+    def test_booking_rows(self):
+        expected = self.render(BookingSerializer(Booking.objects.order_by('id'), many=True).data)
+        actual = self.render(FastBookingSerializer.many(FastBookingSerializer.values(Booking.objects.order_by('id'))))
+        self.assertEqual(actual, expected)
+
+    def test_menu_endpoints(self):
+        response = self.client.get(reverse('menu_items'))
+        self.assertEqual(response.content, self.render(MenuSerializer(Menu.objects.all(), many=True).data))
+        item = Menu.objects.get(title='Crème brûlée')
+        response = self.client.get(reverse('single_menu_item', args=[item.id]))
+        self.assertEqual(response.content, self.render(MenuSerializer(item).data))
+
+    def test_menu_paginated_endpoint(self):
+        response = self.client.get(reverse('menu_items'), {'page_size': 2})
+        expected = MenuSerializer(Menu.objects.order_by('id')[:2], many=True).data
+        self.assertEqual(self.render(response.data['results']), self.render(expected))
+
+    def test_booking_endpoints(self):
+        response = self.client.get(reverse('tables-list'))
+        self.assertEqual(
+            response.content,
+            self.render(BookingSerializer(Booking.objects.order_by('booking_date', 'id'), many=True).data),
+        )
+        booking = Booking.objects.get(name='Lunch')
+        response = self.client.get(reverse('tables-detail', args=[booking.id]))
+        self.assertEqual(response.content, self.render(BookingSerializer(booking).data))
@@ -0,0 +1,233 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from restaurant import live, tasks
+from restaurant.models import Booking, Menu
+from restaurant.metrics import registry
+
+
+def http_scope(query='', method='GET', headers=()):
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+        'method': method, 'path': settings.LIVE_PATH, 'raw_path': settings.LIVE_PATH.encode(),
+        'root_path': '', 'query_string': query.encode(),
+        'headers': [(b'host', b'testserver'), *headers],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+
+
+class Connection:
+    """
+    One request to the live updates application, driven like an ASGI server
+    would: the request body, then http.disconnect once disconnect() is called.
+    """
+
+    def __init__(self, application, scope):
+        self.sent = asyncio.Queue()
+        self.requested = False
+        self.disconnected = asyncio.Event()
+        self.task = asyncio.ensure_future(application(scope, self.receive, self.sent.put))
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def next_message(self):
+        return await asyncio.wait_for(self.sent.get(), 5)
+
+    async def next_body(self):
+        return (await self.next_message())['body']
+
+    async def disconnect(self):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, 5)
+
+
+async def wait_for_subscribers(count):
+    for _ in range(100):
+        if live.hub.connections == count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f'{live.hub.connections} subscribers, expected {count}')
+
+
+class LiveUpdatesApplicationTestCase(TestCase):
+
+    def setUp(self):
+        self.fallback = mock.AsyncMock()
+        self.application = live.LiveUpdatesApplication(self.fallback)
+        self.item = Menu.objects.create(title='Soup', price=Decimal('4.00'), inventory=3)
+
+    def test_menu_stream(self):
+        """
+        Test that a stream receives the rows of a committed menu write and
+        is unsubscribed when the client goes away.
+        """
+        async def scenario():
+            connection = Connection(self.application, http_scope('channels=menu'))
+            start = await connection.next_message()
+            self.assertEqual(start['status'], 200)
+            self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+            self.assertEqual(await connection.next_body(), b'retry: %d\n\n' % settings.LIVE_RETRY_MS)
+            await wait_for_subscribers(1)
+            # Published from another thread, as a sync view would.
+            await sync_to_async(live.publish_menu_changes)([self.item.pk, 999])
+            frame = await connection.next_body()
+            await connection.disconnect()
+            await wait_for_subscribers(0)
+            return frame
+
+        frame = async_to_sync(scenario)()
+        event, data = frame.decode().strip().split('\n')
+        self.assertEqual(event, 'event: menu')
+        self.assertEqual(json.loads(data.removeprefix('data: ')), {
+            'changed': [{'id': self.item.pk, 'title': 'Soup', 'price': '4.00', 'inventory': 3}],
+            'deleted': [999],
+        })
+
+    @override_settings(LIVE_KEEPALIVE_SECONDS=0.05)
+    def test_keepalive(self):
+        async def scenario():
+            connection = Connection(self.application, http_scope())
+            await connection.next_message()
+            await connection.next_body()
+            body = await connection.next_body()
+            await connection.disconnect()
+            return body
+
+        self.assertEqual(async_to_sync(scenario)(), live.KEEPALIVE)
+
+    @override_settings(LIVE_MAX_PENDING=2)
+    def test_slow_client_is_cut_off(self):
+        """
+        Test that a stream with more undelivered events than LIVE_MAX_PENDING
+        is ended rather than buffered.
+        """
+        async def scenario():
+            connection = Connection(self.application, http_scope())
+            await connection.next_message()
+            await connection.next_body()
+            dropped = live.hub.dropped
+            # Delivered in one loop iteration, before the stream can send any.
+            for _ in range(3):
+                live.hub.dispatch('menu', b'{}')
+            await asyncio.wait_for(connection.task, 5)
+            self.assertEqual(await connection.next_message(), {'type': 'http.response.body'})
+            self.assertEqual(live.hub.dropped, dropped + 1)
+            self.assertEqual(live.hub.connections, 0)
+
+        async_to_sync(scenario)()
+
+    def test_requests_rejected(self):
+        async def status(scope):
+            connection = Connection(self.application, scope)
+            message = await connection.next_message()
+            body = json.loads(await connection.next_body())
+            await asyncio.wait_for(connection.task, 5)
+            return message['status'], body
+
+        self.assertEqual(
+            async_to_sync(status)(http_scope('channels=menu,specials')),
+            (400, {'channels': ['Unknown channel: specials.']}),
+        )
+        self.assertEqual(async_to_sync(status)(http_scope(method='POST'))[0], 405)
+        self.assertEqual(async_to_sync(status)(http_scope('channels=availability'))[0], 401)
+
+    def test_availability_needs_authentication(self):
+        token = Token.objects.create(user=User.objects.create_user(username='guest', password='pass'))
+
+        async def scenario():
+            scope = http_scope('channels=availability', headers=[(b'authorization', f'Token {token.key}'.encode())])
+            connection = Connection(self.application, scope)
+            message = await connection.next_message()
+            await connection.disconnect()
+            return message['status']
+
+        self.assertEqual(async_to_sync(scenario)(), 200)
+
+    def test_other_requests_go_to_django(self):
+        scope = {**http_scope(), 'path': '/restaurant/menu/items/'}
+        async_to_sync(self.application)(scope, None, None)
+        self.fallback.assert_awaited_once_with(scope, None, None)
+
+
+class PublishTestCase(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(live.LocalBroker, 'wants', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self, write):
+        with mock.patch.object(live.hub, 'dispatch') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+        return [(channel, json.loads(data)) for (channel, data), _ in dispatch.call_args_list]
+
+    def test_menu_writes(self):
+        item = Menu.objects.create(title='Soup', price=Decimal('4.00'), inventory=3)
+        events = self.published(lambda: Menu.objects.consume_inventory({item.pk: 2}))
+        self.assertEqual(events, [('menu', {
+            'changed': [{'id': item.pk, 'title': 'Soup', 'price': '4.00', 'inventory': 1}], 'deleted': [],
+        })])
+        pk = item.pk
+        self.assertEqual(self.published(item.delete), [('menu', {'changed': [], 'deleted': [pk]})])
+
+    def test_bulk_delete_is_one_event(self):
+        """
+        Test that a delete of many rows in one transaction publishes one
+        event and queues one snapshot, although every row sends post_delete.
+        """
+        items = Menu.objects.bulk_create(Menu(title=f'Dish {i}', price=1, inventory=1) for i in range(3))
+        pks = [item.pk for item in items]
+        with mock.patch.object(tasks.publish_menu_snapshot, 'delay') as delay:
+            events = self.published(lambda: Menu.objects.filter(pk__in=pks).delete())
+        self.assertEqual(events, [('menu', {'changed': [], 'deleted': pks})])
+        delay.assert_called_once_with()
+
+    @override_settings(LIVE_MENU_MAX_ITEMS=2)
+    def test_large_menu_write_is_resync(self):
+        items = Menu.objects.bulk_create(Menu(title=f'Dish {i}', price=1, inventory=1) for i in range(3))
+        self.assertEqual(
+            self.published(lambda: Menu.objects.consume_inventory({item.pk: 1 for item in items})),
+            [('menu', {'resync': True})],
+        )
+
+    def test_booking_moved(self):
+        """
+        Test that moving a booking publishes the seats of its old and new date.
+        """
+        booking = Booking.objects.create(name='Party', number_of_guest=4, booking_date=date(2030, 1, 1))
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.booking_date = date(2030, 1, 2)
+        events = self.published(booking.save)
+        capacity = settings.BOOKING_DEFAULT_CAPACITY
+        self.assertEqual(events, [('availability', {'days': [
+            {'date': '2030-01-01', 'capacity': capacity, 'booked': 0, 'remaining': capacity},
+            {'date': '2030-01-02', 'capacity': capacity, 'booked': 4, 'remaining': capacity - 4},
+        ]})])
+
+    def test_nothing_published_without_subscribers(self):
+        item = Menu.objects.create(title='Soup', price=Decimal('4.00'), inventory=3)
+        with mock.patch.object(live.LocalBroker, 'wants', return_value=False):
+            with self.assertNumQueries(0):
+                live.publish_menu_changes([item.pk])
+
+    def test_failure_is_logged(self):
+        with mock.patch.object(live.hub, 'dispatch', side_effect=RuntimeError('down')):
+            with self.assertLogs('restaurant.live', 'ERROR'):
+                live.publish_menu_changes(None)
+
+    def test_metrics(self):
+        self.assertIn('littlelemon_live_connections 0', registry.render())
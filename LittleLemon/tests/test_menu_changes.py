@@ -0,0 +1,174 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from restaurant.models import Menu, MenuChangeCounter, MenuTombstone
+from restaurant.testing import QueryBudgetMixin
+
+
+class ChangeSequenceTestCase(TestCase):
+
+    def test_every_write_takes_a_new_number(self):
+        """
+        Test that saves, queryset updates, bulk creates and deletes each move
+        the sequence forward once committed, and deletes leave a tombstone.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            item = Menu.objects.create(title='Soup', price=Decimal('4.00'), inventory=3)
+        item.refresh_from_db()
+        created = item.change_seq
+        self.assertGreater(created, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.filter(pk=item.pk).update(inventory=4)
+        item.refresh_from_db()
+        self.assertGreater(item.change_seq, created)
+        with self.captureOnCommitCallbacks(execute=True):
+            batch = Menu.objects.bulk_create(Menu(title=f'Dish {i}', price=1, inventory=1) for i in range(3))
+        changes = set(Menu.objects.filter(pk__in=[obj.pk for obj in batch]).values_list('change_seq', flat=True))
+        self.assertEqual(len(changes), 1)
+        self.assertGreater(changes.pop(), item.change_seq)
+        pk = item.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        tombstone = MenuTombstone.objects.get(menu_id=pk)
+        self.assertEqual(Menu.objects.latest_change(), tombstone.change_seq)
+        self.assertEqual(Menu.objects.filter(change_seq__lt=0).count(), 0)
+
+    def test_one_number_per_transaction(self):
+        """
+        Test that the writes of one transaction share a number, taken only
+        after it commits.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(2):
+                soup = Menu.objects.create(title='Soup', price=Decimal('4.00'), inventory=3)
+                Menu.objects.filter(pk=soup.pk).update(inventory=4)
+            Menu.objects.create(title='Salad', price=Decimal('4.00'), inventory=3)
+            self.assertEqual(Menu.objects.latest_change(), 0)
+        self.assertEqual(set(Menu.objects.values_list('change_seq', flat=True)), {1})
+
+    def test_rolled_back_writes_leave_no_number(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                Menu.objects.create(title='Soup', price=Decimal('4.00'), inventory=3)
+                raise ValueError
+        self.assertEqual(Menu.objects.latest_change(), 0)
+
+    def test_counter_recreated_above_existing_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.create(title='Soup', price=Decimal('4.00'), inventory=3)
+        last = Menu.objects.latest_change()
+        MenuChangeCounter.objects.all().delete()
+        self.assertEqual(Menu.objects.next_change(), last + 1)
+
+    def test_counter_recreated_by_filtered_write(self):
+        """
+        Test that a write through a filtered queryset recreates the counter
+        above the highest change of any row, not of the rows it updates.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            old = Menu.objects.create(title='Soup', price=Decimal('4.00'), inventory=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            new = Menu.objects.create(title='Salad', price=Decimal('4.00'), inventory=3)
+        new.refresh_from_db()
+        last = Menu.objects.latest_change()
+        MenuChangeCounter.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.filter(pk=old.pk).update(inventory=2)
+        old.refresh_from_db()
+        self.assertEqual(old.change_seq, last + 1)
+        self.assertGreater(old.change_seq, new.change_seq)
+
+
+class MenuChangesViewTestCase(QueryBudgetMixin, APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pos', password='pass')
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items = [
+                Menu.objects.create(title=title, price=Decimal('5.00'), inventory=10)
+                for title in ('Soup', 'Salad', 'Tart')
+            ]
+        self.url = reverse('menu_items_changes')
+
+    def sync(self, cursor=None, **params):
+        if cursor is not None:
+            params['cursor'] = cursor
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertWithinQueryBudget(response)
+        return response.data
+
+    def test_initial_sync(self):
+        data = self.sync()
+        self.assertEqual([item['title'] for item in data['changed']], ['Soup', 'Salad', 'Tart'])
+        self.assertEqual(data['changed'][0]['price'], '5.00')
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['more'])
+        self.assertEqual(data['cursor'], str(Menu.objects.latest_change()))
+
+    def test_up_to_date_costs_one_query(self):
+        cursor = self.sync()['cursor']
+        with self.assertNumQueries(1):
+            data = self.sync(cursor)
+        self.assertEqual(data, {'cursor': cursor, 'more': False, 'changed': [], 'deleted': []})
+
+    def test_changes_since_cursor(self):
+        """
+        Test that writes through the API endpoints show up once each, and a
+        deleted item only as deleted.
+        """
+        cursor = self.sync()['cursor']
+        soup, salad, tart = self.items
+        # Each request commits, and is numbered, on its own.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('single_menu_item', args=[salad.pk]), {'inventory': 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('menu_items'), {'title': 'Pie', 'price': '6.00', 'inventory': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('menu_items_consume'), [{'id': soup.pk, 'quantity': 1}], format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('menu_items_bulk'), [{'id': tart.pk, 'inventory': 7}], format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('single_menu_item', args=[tart.pk]))
+
+        data = self.sync(cursor)
+        self.assertEqual(
+            [(item['title'], item['inventory']) for item in data['changed']],
+            [('Salad', 2), ('Pie', 1), ('Soup', 9)],
+        )
+        self.assertEqual(data['deleted'], [tart.pk])
+        self.assertEqual(self.sync(data['cursor'])['changed'], [])
+
+    def test_pages_split_a_bulk_write(self):
+        """
+        Test that a small ?limit= walks a bulk write, which shares one change
+        number, without skipping or repeating rows.
+        """
+        cursor = self.sync()['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.bulk_create(Menu(title=f'Dish {i}', price=1, inventory=i) for i in range(5))
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.filter(title='Dish 1').delete()
+        titles, deleted, pages = [], [], 0
+        while True:
+            data = self.sync(cursor, limit=2)
+            titles += [item['title'] for item in data['changed']]
+            deleted += data['deleted']
+            cursor = data['cursor']
+            pages += 1
+            if not data['more']:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(titles, ['Dish 0', 'Dish 2', 'Dish 3', 'Dish 4'])
+        self.assertEqual(len(deleted), 1)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cursor', response.data)
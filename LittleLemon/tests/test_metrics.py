@@ -0,0 +1,106 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from restaurant.metrics import registry
+from restaurant.models import Menu, Booking
+from restaurant.testing import QueryBudgetMixin
+
+
+class InstrumentationMiddlewareTestCase(TestCase):
+
+    def setUp(self):
+        registry.reset()
+        Menu.objects.create(title='Burger', price=Decimal('10.00'), inventory=5)
+
+    def test_timing_headers(self):
+        """
+        Test that every response carries Server-Timing and X-Query-Count headers.
+        """
+        response = self.client.get(reverse('menu_items'), {'page_size': 10})
+        self.assertEqual(response['X-Query-Count'], '1')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_registry_aggregates_by_view(self):
+        """
+        Test that requests are aggregated per view.
+        """
+        self.client.get(reverse('menu_items'), {'page_size': 10})
+        self.client.get(reverse('menu_items'), {'page_size': 10})
+        stats = registry.snapshot('menu_items')
+        self.assertEqual(stats['count'], 2)
+        self.assertEqual(stats['queries'], 1)
+        self.assertGreater(stats['serialization_seconds'], 0)
+        self.assertGreaterEqual(stats['total_seconds'], stats['db_seconds'])
+
+    def test_prometheus_endpoint(self):
+        """
+        Test that the metrics endpoint renders the Prometheus text format.
+        """
+        self.client.get(reverse('menu_items'))
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('littlelemon_requests_total{view="menu_items",method="GET",status="200"} 1', body)
+        self.assertIn('littlelemon_request_duration_seconds_count{view="menu_items"} 1', body)
+        self.assertIn('littlelemon_db_queries_total{view="menu_items"}', body)
+
+    def test_prometheus_endpoint_is_restricted(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """
+    Every endpoint must stay within the query budget its view declares,
+    with the token authentication real clients use.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.menu_item = Menu.objects.create(title='Burger', price=Decimal('10.00'), inventory=5)
+        self.booking = Booking.objects.create(
+            user=self.user, name='Test booking', number_of_guest=2, booking_date='2022-05-20'
+        )
+
+    def test_menu_endpoints(self):
+        menu_url = reverse('single_menu_item', args=[self.menu_item.id])
+        self.assertWithinQueryBudget(self.client.get(reverse('menu_items')))
+        self.assertWithinQueryBudget(self.client.post(
+            reverse('menu_items'), {'title': 'Fries', 'price': '3.00', 'inventory': 2}
+        ))
+        self.assertWithinQueryBudget(self.client.get(menu_url))
+        self.assertWithinQueryBudget(self.client.put(
+            menu_url, {'title': 'Cheeseburger', 'price': '11.00', 'inventory': 5}
+        ))
+        self.assertWithinQueryBudget(self.client.patch(menu_url, {'inventory': 4}))
+        self.assertWithinQueryBudget(self.client.delete(menu_url))
+
+    def test_booking_endpoints(self):
+        booking_url = reverse('tables-detail', args=[self.booking.id])
+        self.assertWithinQueryBudget(self.client.get(reverse('tables-list')))
+        self.assertWithinQueryBudget(self.client.post(
+            reverse('tables-list'), {'name': 'New', 'number_of_guest': 2, 'booking_date': '2022-06-15'}
+        ))
+        self.assertWithinQueryBudget(self.client.get(booking_url))
+        self.assertWithinQueryBudget(self.client.put(
+            booking_url, {'name': 'Updated', 'number_of_guest': 3, 'booking_date': '2022-06-20'}
+        ))
+        self.assertWithinQueryBudget(self.client.patch(booking_url, {'number_of_guest': 4}))
+        self.assertWithinQueryBudget(self.client.delete(booking_url))
+
+    def test_over_budget_fails(self):
+        """
+        Test that the helper fails a response that ran more queries than budgeted.
+        """
+        response = self.client.get(reverse('tables-list'))
+        response['X-Query-Count'] = '100'
+        with self.assertRaises(AssertionError):
+            self.assertWithinQueryBudget(response)
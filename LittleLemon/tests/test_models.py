@@ -1,6 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from django.test import TestCase, Client
-from restaurant.models import Menu, Booking
+from importlib import import_module
+from io import StringIO
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
+from restaurant.models import Menu, MenuChangeCounter, Booking, InsufficientInventory, SlotCapacity, SlotFull
 from restaurant.serializers import MenuSerializer, BookingSerializer
 from datetime import date
 from django.urls import reverse
@@ -46,6 +58,154 @@ class MenuModelTestCase(TestCase):
         self.assertEqual(str(menu), 'Spaghetti Carbonara')
 
 
+class MenuInventoryTestCase(TestCase):
+
+    def setUp(self):
+        self.burger = Menu.objects.create(title='Burger', price=Decimal('10.00'), inventory=5)
+        self.fries = Menu.objects.create(title='Fries', price=Decimal('3.00'), inventory=1)
+
+    def test_consume(self):
+        """
+        Test that consume() decrements the inventory in the database and on the instance.
+        """
+        self.burger.consume(2)
+        self.assertEqual(self.burger.inventory, 3)
+        self.assertEqual(Menu.objects.get(pk=self.burger.pk).inventory, 3)
+
+    def test_consume_insufficient(self):
+        """
+        Test that consuming more than is in stock raises and leaves the inventory untouched.
+        """
+        with self.assertRaises(InsufficientInventory):
+            self.fries.consume(2)
+        self.assertEqual(Menu.objects.get(pk=self.fries.pk).inventory, 1)
+
+    def test_consume_batch_is_all_or_nothing(self):
+        """
+        Test that a batch with one short item decrements none of the items.
+        """
+        with self.assertRaises(InsufficientInventory):
+            Menu.objects.consume_inventory({self.burger.pk: 1, self.fries.pk: 2})
+        self.assertEqual(Menu.objects.get(pk=self.burger.pk).inventory, 5)
+        self.assertEqual(Menu.objects.get(pk=self.fries.pk).inventory, 1)
+
+    def test_consume_unknown_item(self):
+        """
+        Test that consuming an unknown item raises Menu.DoesNotExist.
+        """
+        with self.assertRaises(Menu.DoesNotExist):
+            Menu.objects.consume_inventory({100000: 1})
+
+
+class MenuInventoryConcurrencyTestCase(TransactionTestCase):
+    threads = 8
+    orders_per_thread = 25
+
+    def setUp(self):
+        self.menu = Menu.objects.create(title='Burger', price=Decimal('10.00'), inventory=150)
+
+    def consume_many(self):
+        consumed = 0
+        try:
+            for _ in range(self.orders_per_thread):
+                try:
+                    Menu.objects.consume_inventory({self.menu.pk: 1})
+                    consumed += 1
+                except InsufficientInventory:
+                    pass
+        finally:
+            connection.close()
+        return consumed
+
+    def test_concurrent_consume_loses_no_updates(self):
+        """
+        Test that concurrent decrements of one item neither lose updates nor oversell.
+        """
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Shared-cache in-memory SQLite rejects concurrent writers.')
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            consumed = sum(executor.map(lambda _: self.consume_many(), range(self.threads)))
+        elapsed = time.monotonic() - started
+        self.assertEqual(consumed, 150)
+        self.assertEqual(Menu.objects.get(pk=self.menu.pk).inventory, 0)
+        # 200 single-statement decrements should finish well within this
+        # bound; a lock held across requests would blow straight past it.
+        self.assertLess(elapsed, 10)
+
+    def test_consume_leaves_the_change_counter_until_commit(self):
+        """
+        Test that consuming stock takes no change number, and so no counter
+        row lock, until its transaction has committed.
+        """
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                Menu.objects.consume_inventory({self.menu.pk: 1})
+            self.assertFalse([q for q in queries if MenuChangeCounter._meta.db_table in q['sql']])
+            self.assertEqual(Menu.objects.latest_change(), 1)
+        self.assertEqual(Menu.objects.latest_change(), 2)
+        self.assertEqual(Menu.objects.get(pk=self.menu.pk).change_seq, 2)
+
+    def test_consume_of_other_items_does_not_wait(self):
+        """
+        Test that an open transaction that consumed one item does not hold
+        up consuming another.
+        """
+        if connection.vendor == 'sqlite':
+            self.skipTest('SQLite locks the whole database for a write.')
+        other = Menu.objects.create(title='Fries', price=Decimal('3.00'), inventory=10)
+        consumed, release = threading.Event(), threading.Event()
+
+        def hold():
+            try:
+                with transaction.atomic():
+                    Menu.objects.consume_inventory({self.menu.pk: 1})
+                    consumed.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        def consume_other():
+            try:
+                Menu.objects.consume_inventory({other.pk: 1})
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            holder = executor.submit(hold)
+            self.assertTrue(consumed.wait(10))
+            try:
+                executor.submit(consume_other).result(timeout=5)
+            finally:
+                release.set()
+            holder.result()
+        self.assertEqual(Menu.objects.get(pk=other.pk).inventory, 9)
+        self.assertEqual(Menu.objects.get(pk=self.menu.pk).inventory, 149)
+
+
+class BookingCapacityConcurrencyTestCase(TransactionTestCase):
+    threads = 4
+
+    def book(self, i):
+        try:
+            booking = Booking(name=f'Guest {i}', number_of_guest=1, booking_date=date(2030, 1, 1))
+            booking.save_within_capacity()
+        finally:
+            connection.close()
+
+    def test_first_bookings_of_a_date(self):
+        """
+        Test that concurrent first bookings of a date, which create its
+        capacity row, all go through instead of deadlocking.
+        """
+        if connection.vendor == 'sqlite':
+            self.skipTest('SQLite has no row locks.')
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            list(executor.map(self.book, range(self.threads)))
+        self.assertEqual(Booking.objects.filter(booking_date=date(2030, 1, 1)).count(), self.threads)
+        self.assertEqual(SlotCapacity.objects.filter(date=date(2030, 1, 1)).count(), 1)
+
+
 class BookingModelTestCase(TestCase):
 
     def setUp(self):
@@ -169,4 +329,86 @@ class SingleMenuItemViewTestCase(TestCase):
         response = self.client.delete(
             reverse('single_menu_item', kwargs={'pk': 1000})
         )
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookingCapacityTestCase(TestCase):
+
+    def setUp(self):
+        SlotCapacity.objects.create(date=date(2023, 5, 10), seats=6)
+        Booking.objects.create(name='John Doe', number_of_guest=4, booking_date=date(2023, 5, 10))
+
+    def test_save_within_capacity(self):
+        """
+        Test that a booking that fits the remaining seats is saved.
+        """
+        booking = Booking(name='Jane Doe', number_of_guest=2, booking_date=date(2023, 5, 10))
+        booking.save_within_capacity()
+        self.assertIsNotNone(booking.pk)
+
+    def test_save_over_capacity(self):
+        """
+        Test that a booking that would overbook its date raises SlotFull and is not saved.
+        """
+        booking = Booking(name='Jane Doe', number_of_guest=3, booking_date=date(2023, 5, 10))
+        with self.assertRaises(SlotFull) as ctx:
+            booking.save_within_capacity()
+        self.assertEqual(ctx.exception.remaining, 2)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_update_excludes_itself(self):
+        """
+        Test that updating a booking does not count its own previous guests.
+        """
+        booking = Booking.objects.get()
+        booking.number_of_guest = 6
+        booking.save_within_capacity()
+        self.assertEqual(Booking.objects.get().number_of_guest, 6)
+
+    def test_default_capacity(self):
+        """
+        Test that a date without a capacity row gets the default capacity.
+        """
+        booking = Booking(name='Jane Doe', number_of_guest=2, booking_date=date(2023, 5, 11))
+        booking.save_within_capacity()
+        self.assertEqual(SlotCapacity.objects.get(date=date(2023, 5, 11)).seats, settings.BOOKING_DEFAULT_CAPACITY)
+
+    def test_ensure_keeps_existing_capacity(self):
+        SlotCapacity.objects.ensure(date(2023, 5, 10))
+        self.assertEqual(SlotCapacity.objects.get(date=date(2023, 5, 10)).seats, 6)
+
+    def test_availability(self):
+        """
+        Test that availability reports capacity, booked and remaining seats per date.
+        """
+        with self.assertNumQueries(2):
+            days = Booking.objects.availability(date(2023, 5, 10), date(2023, 5, 11))
+        self.assertEqual(days, [
+            {'date': date(2023, 5, 10), 'capacity': 6, 'booked': 4, 'remaining': 2},
+            {
+                'date': date(2023, 5, 11),
+                'capacity': settings.BOOKING_DEFAULT_CAPACITY,
+                'booked': 0,
+                'remaining': settings.BOOKING_DEFAULT_CAPACITY,
+            },
+        ])
+
+
+class BookingUserBackfillTestCase(TestCase):
+
+    def test_backfill_links_bookings_by_username(self):
+        """
+        Test that the backfill migration links bookings whose name matches a username.
+        """
+        migration = import_module('restaurant.migrations.0004_backfill_booking_user')
+        user = User.objects.create_user(username='johndoe', password='testpass')
+        matched = Booking.objects.create(name='johndoe', number_of_guest=2, booking_date=date(2023, 5, 10))
+        unmatched = Booking.objects.create(name='Jane Doe', number_of_guest=2, booking_date=date(2023, 5, 10))
+        with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+            migration.backfill_booking_user(apps, SimpleNamespace(connection=connection))
+        matched.refresh_from_db()
+        unmatched.refresh_from_db()
+        self.assertEqual(matched.user, user)
+        self.assertIsNone(unmatched.user)
+        # The bookings left without an owner are reported.
+        self.assertIn('1 bookings match no username', stdout.getvalue())
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import gzip
+from io import BytesIO
+from unittest import mock, skipUnless
+import uuid
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from restaurant import parsers, renderers
+from restaurant.models import Menu
+from restaurant.parsers import FastJSONParser
+from restaurant.renderers import FastJSONRenderer
+
+PAYLOAD = [
+    {
+        'price': Decimal('10.50'),
+        'booking_date': date(2030, 1, 2),
+        'created': datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        'id': uuid.UUID(int=1),
+        'title': 'Crème brûlée\u2028',
+        1: None,
+    },
+]
+
+
+class FastJSONRendererTestCase(SimpleTestCase):
+
+    def assertRendersLikeDRF(self, data, media_type='application/json'):
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type),
+        )
+
+    def test_same_output_as_drf(self):
+        """
+        Test that decimals, dates, datetimes, UUIDs, integer keys and
+        characters JavaScript cannot hold render exactly as DRF renders them.
+        """
+        self.assertRendersLikeDRF(PAYLOAD)
+        self.assertRendersLikeDRF(None)
+        self.assertRendersLikeDRF(PAYLOAD, 'application/json; indent=2')
+
+    @skipUnless(renderers.orjson, 'orjson is not installed')
+    def test_uses_orjson(self):
+        with mock.patch.object(renderers.orjson, 'dumps', wraps=renderers.orjson.dumps) as dumps:
+            FastJSONRenderer().render(PAYLOAD, 'application/json')
+        self.assertTrue(dumps.called)
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertRendersLikeDRF(PAYLOAD)
+            self.assertEqual(renderers.dumps({'price': Decimal('1.5')}), b'{"price":1.5}')
+
+
+class FastJSONParserTestCase(SimpleTestCase):
+
+    def parse(self, body):
+        return FastJSONParser().parse(BytesIO(body))
+
+    def test_parse(self):
+        body = '{"title": "Crème", "price": 10.5, "tags": [1, null]}'.encode()
+        self.assertEqual(self.parse(body), JSONParser().parse(BytesIO(body)))
+        with mock.patch.object(parsers, 'orjson', None):
+            self.assertEqual(self.parse(body), {'title': 'Crème', 'price': 10.5, 'tags': [1, None]})
+
+    def test_invalid(self):
+        for orjson in (parsers.orjson, None):
+            with mock.patch.object(parsers, 'orjson', orjson):
+                for body in (b'{"title": ', b'{"price": NaN}', b'\xff'):
+                    with self.assertRaisesMessage(ParseError, 'JSON parse error'):
+                        self.parse(body)
+
+
+@override_settings(RESPONSE_GZIP_MIN_BYTES=500)
+class CompressionMiddlewareTestCase(APITestCase):
+
+    def setUp(self):
+        Menu.objects.bulk_create(Menu(title=f'Dish {i}', price=Decimal('4.50'), inventory=i) for i in range(20))
+        self.url = reverse('menu_items')
+
+    def test_large_response_is_gzipped(self):
+        response = self.client.get(self.url, {'ordering': 'id'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(gzip.decompress(response.content).decode().split('"title"')), 21)
+
+    def test_small_or_unaccepted_response_is_not(self):
+        response = self.client.get(self.url, {'ordering': 'id', 'max_inventory': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        response = self.client.get(self.url, {'ordering': 'id'})
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(len(response.json()), 20)
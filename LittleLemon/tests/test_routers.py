@@ -0,0 +1,132 @@
+from decimal import Decimal
+import unittest
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from LittleLemon.db import database_config
+from LittleLemon.db.routers import ReplicaRouter, ReplicaRoutingMiddleware, use_primary, use_replicas
+from restaurant.models import Menu
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_outside_requests_use_primary(self):
+        """
+        Test that reads outside a safe request go to the primary.
+        """
+        self.assertEqual(self.router.db_for_read(Menu), 'default')
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Menu), 'default')
+
+    def test_reads_in_safe_requests_use_replicas(self):
+        """
+        Test that reads go to a replica until something is written.
+        """
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Menu), 'replica_1')
+            self.assertEqual(self.router.db_for_write(Menu), 'default')
+            self.assertEqual(self.router.db_for_read(Menu), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """
+        Test that everything goes to the primary without replicas.
+        """
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Menu), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        """
+        Test that migrations only run on the primary.
+        """
+        self.assertFalse(self.router.allow_migrate('replica_1', 'restaurant'))
+        self.assertIsNone(self.router.allow_migrate('default', 'restaurant'))
+
+    def test_replicas_from_environment(self):
+        """
+        Test that DATABASE_REPLICAS adds mirrored aliases.
+        """
+        databases = database_config({'DATABASE_REPLICAS': 'replica-a, replica-b:3307'})
+        self.assertEqual(databases['replica_1']['HOST'], 'replica-a')
+        self.assertEqual(databases['replica_1']['PORT'], '3306')
+        self.assertEqual(databases['replica_2']['PORT'], '3307')
+        self.assertEqual(databases['replica_2']['TEST'], {'MIRROR': 'default'})
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingMiddlewareTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def get_response(self, request):
+        response = HttpResponse()
+        response.db = self.router.db_for_read(Menu)
+        if request.method == 'POST':
+            self.router.db_for_write(Menu)
+        return response
+
+    def test_safe_requests_read_from_replicas(self):
+        """
+        Test that a GET reads from a replica and does not pin the client.
+        """
+        response = ReplicaRoutingMiddleware(self.get_response)(self.factory.get('/'))
+        self.assertEqual(response.db, 'replica_1')
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_client_to_primary(self):
+        """
+        Test that a write pins the client to the primary for the lag window.
+        """
+        middleware = ReplicaRoutingMiddleware(self.get_response)
+        response = middleware(self.factory.post('/'))
+        self.assertEqual(response.db, 'default')
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_LAG_SECONDS)
+
+        request = self.factory.get('/')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = '1'
+        self.assertEqual(middleware(request).db, 'default')
+
+
+@unittest.skipUnless(
+    'replica_1' in settings.DATABASES,
+    'needs a replica_1 database, e.g. DATABASE_ENGINE=sqlite3 DATABASE_REPLICAS=replica.sqlite3',
+)
+class ReplicaRoutingIntegrationTestCase(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.item = Menu.objects.create(title='Burger', price=Decimal('10.00'), inventory=5)
+
+    @override_settings(REPLICA_LAG_SECONDS=0)
+    def test_menu_reads_use_replica(self):
+        """
+        Test that menu GETs are answered from the replica.
+        """
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            response = self.client.get(reverse('single_menu_item', args=[self.item.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(replica), 0)
+
+    def test_writes_use_primary(self):
+        """
+        Test that writes, and the reads following them, stay on the primary.
+        """
+        with CaptureQueriesContext(connections['replica_1']) as replica:
+            response = self.client.patch(
+                reverse('single_menu_item', args=[self.item.pk]),
+                {'inventory': 4}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(replica), 0)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
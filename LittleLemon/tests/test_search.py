@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+from restaurant.search import MenuSearchIndex, boolean_query, words
+
+
+class MenuSearchIndexTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.index = MenuSearchIndex([
+            (1, 'Lemon Chicken Burger'),
+            (2, 'Lemon Tart'),
+            (3, 'Chicken Soup'),
+            (4, 'Lemonade'),
+        ])
+
+    def test_all_words_required(self):
+        """
+        Test that every query word has to match.
+        """
+        self.assertEqual(self.index.search(words('chicken lemon')), {1})
+        self.assertEqual(self.index.search(words('tart soup')), set())
+
+    def test_last_word_is_prefix(self):
+        """
+        Test that the last word matches as a prefix and earlier words exactly.
+        """
+        self.assertEqual(self.index.search(words('lemon')), {1, 2, 4})
+        self.assertEqual(self.index.search(words('lem tart')), set())
+        self.assertEqual(self.index.search(words('chick')), {1, 3})
+
+    def test_boolean_query(self):
+        """
+        Test the MySQL boolean-mode query built from the query words.
+        """
+        self.assertEqual(boolean_query(['lemon', 'chi']), '+lemon +chi*')
+        self.assertEqual(boolean_query(['a', 'la', 'tart']), '+tart*')
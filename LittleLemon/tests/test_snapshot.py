@@ -0,0 +1,131 @@
+from decimal import Decimal
+import gzip
+import json
+import os
+import tempfile
+from unittest import skipUnless
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from restaurant import cache, snapshot
+from restaurant.models import Menu
+from taskqueue.brokers import get_broker
+from taskqueue.worker import Worker
+
+
+class SnapshotTestCase(APITestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(MENU_SNAPSHOT_DIR=self.directory, TASKS_ALWAYS_EAGER=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        snapshot.reset()
+        self.addCleanup(snapshot.reset)
+        with self.captureOnCommitCallbacks(execute=True):
+            Menu.objects.bulk_create(
+                Menu(title=f'Dish {i}', price=Decimal('4.50'), inventory=i) for i in range(3)
+            )
+            cache.invalidate_menu_list()
+        self.url = reverse('menu_items')
+
+    def expected(self):
+        return [
+            {'id': item.id, 'title': item.title, 'price': '4.50', 'inventory': item.inventory}
+            for item in Menu.objects.order_by('id')
+        ]
+
+    def test_served_from_snapshot(self):
+        """
+        Test that the unfiltered list is the published document, gzipped for
+        clients that accept it, and costs no queries once loaded.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.json(), self.expected())
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['X-Menu-Version'], str(Menu.objects.latest_change()))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.expected())
+
+    def test_conditional_request(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_published_on_commit(self):
+        """
+        Test that a committed menu write publishes the next version, and only
+        the newest two versions are kept.
+        """
+        versions = []
+        for i in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                Menu.objects.create(title=f'Special {i}', price=Decimal('4.50'), inventory=1)
+            versions.append(Menu.objects.latest_change())
+            self.assertTrue(os.path.exists(snapshot.snapshot_path(versions[-1])))
+        self.assertFalse(os.path.exists(snapshot.snapshot_path(versions[0])))
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Menu-Version'], str(versions[-1]))
+        self.assertEqual(len(response.json()), 6)
+
+    def test_request_never_publishes(self):
+        """
+        Test that without a published snapshot the list is built as usual,
+        and the request leaves publishing to the worker.
+        """
+        with override_settings(MENU_SNAPSHOT_DIR=os.path.join(self.directory, 'empty')):
+            response = self.client.get(self.url)
+            self.assertNotIn('X-Menu-Version', response)
+            self.assertEqual(response.json(), self.expected())
+            self.assertIsNone(snapshot.newest_version())
+
+    @override_settings(TASKS_ALWAYS_EAGER=False, TASKS_BROKER='taskqueue.brokers.InMemoryBroker')
+    def test_lagging_snapshot(self):
+        """
+        Test that writes queue one publish between them, and the snapshot
+        missing them is served for MENU_SNAPSHOT_MAX_LAG seconds only.
+        """
+        broker = get_broker()
+        broker.clear()
+        self.addCleanup(broker.clear)
+        published = self.client.get(self.url)['X-Menu-Version']
+        for i in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                Menu.objects.create(title=f'Special {i}', price=Decimal('4.50'), inventory=1)
+        self.assertEqual([job.name for job in broker.tasks.values()], ['restaurant.tasks.publish_menu_snapshot'])
+
+        self.assertEqual(self.client.get(self.url)['X-Menu-Version'], published)
+        with override_settings(MENU_SNAPSHOT_MAX_LAG=-1):
+            response = self.client.get(self.url)
+            self.assertNotIn('X-Menu-Version', response)
+            self.assertEqual(len(response.json()), 6)
+
+        Worker('test-worker', broker).run_pending()
+        self.assertEqual(self.client.get(self.url)['X-Menu-Version'], str(Menu.objects.latest_change()))
+
+    def test_filtered_list_is_not_snapshot(self):
+        response = self.client.get(self.url, {'ordering': '-id'})
+        self.assertNotIn('X-Menu-Version', response)
+        self.assertEqual(response.data, self.expected()[::-1])
+
+    @skipUnless(snapshot.brotli, 'brotli is not installed')
+    def test_brotli(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(snapshot.brotli.decompress(response.content)), self.expected())
+
+
+class AcceptEncodingTestCase(TestCase):
+
+    def test_accepted_encodings(self):
+        self.assertEqual(snapshot.accepted_encodings('gzip, deflate, br;q=0.8'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(snapshot.accepted_encodings('br;q=0, gzip;q=0.5'), {'gzip'})
+        self.assertEqual(snapshot.accepted_encodings(''), set())
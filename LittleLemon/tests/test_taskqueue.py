@@ -0,0 +1,214 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from taskqueue.brokers import DatabaseBroker, get_broker
+from taskqueue.models import Task
+from taskqueue.registry import task
+from taskqueue.worker import Worker, backoff
+
+calls = []
+
+
+@task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.flaky', max_attempts=2)
+def flaky():
+    raise RuntimeError('boom')
+
+
+@task(name='tests.refresh', unique=True)
+def refresh(value):
+    calls.append(value)
+
+
+class TaskQueueTestCase(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker('test-worker', DatabaseBroker())
+
+    def test_queued_on_commit(self):
+        """
+        Test that delay() queues the task only when the transaction commits.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delay('a')
+            self.assertFalse(Task.objects.exists())
+        task_row = Task.objects.get()
+        self.assertEqual((task_row.name, task_row.args), ('tests.record', ['a']))
+
+    def test_unique_task_queued_once(self):
+        """
+        Test that a unique task is not queued again while the same call is
+        waiting, but is once a worker has taken it.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh.delay('a')
+            refresh.delay('a')
+            refresh.delay('b')
+        self.assertEqual(sorted(Task.objects.values_list('args', flat=True)), [['a'], ['b']])
+        job = self.worker.broker.claim('test-worker')
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh.delay(*job.args)
+        self.assertEqual(Task.objects.filter(args=job.args).count(), 2)
+
+    def test_rolled_back_work_queues_nothing(self):
+        """
+        Test that a task queued in a rolled-back block is dropped.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                record.delay('a')
+                transaction.set_rollback(True)
+        self.assertFalse(Task.objects.exists())
+
+    def test_arguments_must_be_json(self):
+        """
+        Test that unserializable arguments fail in the caller.
+        """
+        with self.assertRaises(TypeError):
+            record.delay(object())
+
+    def test_worker_runs_and_removes_task(self):
+        """
+        Test that a worker runs a due task once and deletes it.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delay('a')
+        self.assertEqual(self.worker.run_pending(), 1)
+        self.assertEqual(calls, ['a'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_countdown(self):
+        """
+        Test that a task is not handed out before it is due.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            record.apply_async(['a'], countdown=60)
+        self.assertFalse(self.worker.run_once())
+
+    def test_retry_with_backoff_then_fail(self):
+        """
+        Test that a failing task is retried later and marked failed once it
+        runs out of attempts.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            flaky.delay()
+        with self.assertLogs('taskqueue.worker', 'WARNING'):
+            self.assertTrue(self.worker.run_once())
+        task_row = Task.objects.get()
+        self.assertEqual((task_row.status, task_row.attempts), (Task.QUEUED, 1))
+        self.assertGreater(task_row.run_after, timezone.now())
+        self.assertIn('RuntimeError: boom', task_row.last_error)
+
+        Task.objects.update(run_after=timezone.now())
+        with self.assertLogs('taskqueue.worker', 'ERROR'):
+            self.assertTrue(self.worker.run_once())
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.attempts), (Task.FAILED, 2))
+        self.assertFalse(self.worker.run_once())
+
+    @override_settings(TASKS_RETRY_BACKOFF=2, TASKS_RETRY_BACKOFF_MAX=10)
+    def test_backoff(self):
+        """
+        Test that the retry delay doubles up to the maximum, less jitter.
+        """
+        for attempts, ceiling in ((1, 2), (2, 4), (3, 8), (6, 10)):
+            delay = backoff(attempts)
+            self.assertTrue(ceiling / 2 <= delay <= ceiling, (attempts, delay))
+
+    def test_claimed_task_is_not_handed_out_twice(self):
+        """
+        Test that a running task is only reclaimed once its worker is presumed lost.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delay('a')
+        broker = DatabaseBroker()
+        self.assertIsNotNone(broker.claim('one'))
+        self.assertIsNone(broker.claim('two'))
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        reclaimed = broker.claim('two')
+        self.assertEqual((reclaimed.locked_by, reclaimed.attempts), ('two', 2))
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager(self):
+        """
+        Test that eager mode runs the task in-process on commit.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delay('a')
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['a'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_run_worker_command(self):
+        """
+        Test that run_worker --burst drains the queue and exits.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delay('a')
+            record.delay('b')
+        call_command('run_worker', processes=1, burst=True, poll_interval=0, stdout=StringIO())
+        self.assertEqual(sorted(calls), ['a', 'b'])
+
+
+@override_settings(TASKS_BROKER='taskqueue.brokers.InMemoryBroker')
+class BookingTasksTestCase(APITestCase):
+
+    def setUp(self):
+        self.broker = get_broker()
+        self.broker.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass', email='test@example.com')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('tables-list')
+
+    def test_booking_confirmation_sent_in_background(self):
+        """
+        Test that creating a booking queues its side effects instead of
+        running them in the request, and that running them sends the
+        confirmation email.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url, {'name': 'Dinner', 'number_of_guest': 2, 'booking_date': '2030-05-01'}
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual([job.name for job in self.broker.tasks.values()], ['restaurant.tasks.booking_changed'])
+
+        worker = Worker('test-worker', self.broker)
+        with self.assertLogs('restaurant.audit') as logs, self.captureOnCommitCallbacks(execute=True):
+            worker.run_pending()
+        self.assertEqual(len(mail.outbox), 0)
+        worker.run_pending()
+        self.assertIn(f"booking {response.data['id']} created", logs.output[0])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@example.com'])
+        self.assertIn('Dinner', mail.outbox[0].body)
+        self.assertEqual(self.broker.tasks, {})
+
+    def test_deleted_booking_is_audited(self):
+        """
+        Test that deleting a booking queues an audit event with the row's data.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url, {'name': 'Dinner', 'number_of_guest': 2, 'booking_date': '2030-05-01'}
+            )
+            self.client.delete(reverse('tables-detail', args=[response.data['id']]))
+        events = [job.args[0] for job in self.broker.tasks.values()]
+        self.assertEqual(events, ['created', 'deleted'])
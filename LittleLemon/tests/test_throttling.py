@@ -0,0 +1,127 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APITestCase
+from restaurant.models import Menu
+from restaurant.throttling import SlidingWindowThrottle, parse_rate
+
+
+def rates(**scopes):
+    return {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': scopes}
+
+
+class FakeView:
+    throttle_scope = 'menu'
+
+
+class SlidingWindowThrottleTestCase(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.now = 60 * 1000.0
+        self.request = Request(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1'))
+
+    def allow(self):
+        throttle = SlidingWindowThrottle()
+        throttle.timer = lambda: self.now
+        return throttle.allow_request(self.request, FakeView()), throttle
+
+    def test_parse_rate(self):
+        """
+        Test that rates are parsed like DRF's.
+        """
+        self.assertEqual(parse_rate('100/min'), (100, 60))
+        self.assertEqual(parse_rate('5/s'), (5, 1))
+        with self.assertRaises(ImproperlyConfigured):
+            parse_rate('lots')
+
+    @override_settings(REST_FRAMEWORK=rates(menu='10/min'))
+    def test_previous_window_slides_out(self):
+        """
+        Test that the previous window's requests count in proportion to how
+        much of it still overlaps the sliding window.
+        """
+        for _ in range(10):
+            self.assertTrue(self.allow()[0])
+        allowed, throttle = self.allow()
+        self.assertFalse(allowed)
+        self.assertGreater(throttle.wait(), 0)
+
+        # Halfway through the next window half of the previous 10 remain.
+        self.now += 90
+        results = [self.allow()[0] for _ in range(6)]
+        self.assertEqual(results, [True] * 5 + [False])
+
+    @override_settings(REST_FRAMEWORK=rates(menu='2/min'))
+    def test_rejected_requests_are_not_counted(self):
+        """
+        Test that a client hammering a throttled endpoint is let back in
+        once the window has moved on.
+        """
+        self.allow()
+        self.allow()
+        for _ in range(50):
+            self.assertFalse(self.allow()[0])
+        self.now += 120
+        self.assertTrue(self.allow()[0])
+
+    @override_settings(REST_FRAMEWORK=rates())
+    def test_scope_without_rate(self):
+        """
+        Test that views whose scope has no rate are not throttled.
+        """
+        self.assertTrue(all(self.allow()[0] for _ in range(100)))
+
+
+@override_settings(REST_FRAMEWORK=rates(menu='3/min', booking='2/min', auth='2/min'))
+class ThrottledViewsTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.item = Menu.objects.create(title='Burger', price=Decimal('10.00'), inventory=5)
+
+    def test_menu_throttled_per_client(self):
+        """
+        Test that the menu views share the menu limit, answer 429 with
+        Retry-After once it is used up, and count each user separately.
+        """
+        for url in (reverse('menu_items'), reverse('single_menu_item', args=[self.item.pk]), reverse('menu_items')):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('menu_items'))
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+        user = User.objects.create_user(username='other', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        self.assertEqual(self.client.get(reverse('menu_items')).status_code, status.HTTP_200_OK)
+
+    def test_scopes_are_independent(self):
+        """
+        Test that using up the menu limit leaves other scopes alone.
+        """
+        user = User.objects.create_user(username='diner', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        for _ in range(3):
+            self.client.get(reverse('menu_items'))
+        self.assertEqual(self.client.get(reverse('menu_items')).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(reverse('tables-list')).status_code, status.HTTP_200_OK)
+
+    def test_token_login_throttled(self):
+        """
+        Test that both token login endpoints are throttled against password guessing.
+        """
+        for url in ('/restaurant/menu/api-token-auth/', '/auth/token/login/'):
+            cache.clear()
+            codes = [
+                self.client.post(url, {'username': 'nobody', 'password': 'guess'}).status_code
+                for _ in range(3)
+            ]
+            self.assertEqual(codes[-1], status.HTTP_429_TOO_MANY_REQUESTS, url)
@@ -1,15 +1,50 @@
 from decimal import Decimal
-from django.test import TestCase, Client
+from unittest import mock
+from django.db import connection
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from rest_framework import status
-from restaurant.models import Menu, Booking
+from restaurant import search
+from restaurant.models import Menu, Booking, SlotCapacity
 from restaurant.serializers import MenuSerializer, BookingSerializer
+from restaurant.fast_serializers import FastMenuSerializer
+from restaurant.streaming import stream_json_list
+from restaurant.views import rendered_index
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
 import json
 
 
+class IndexPageTestCase(TestCase):
+
+    def setUp(self):
+        rendered_index.cache_clear()
+
+    def test_rendered_once(self):
+        """
+        Test that the landing page is rendered on the first request only and
+        served without touching the database or the session.
+        """
+        first = self.client.get(reverse('index'))
+        self.assertTemplateUsed(first, 'index.html')
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('index'))
+        self.assertTemplateNotUsed(second, 'index.html')
+        self.assertEqual(second.content, first.content)
+        self.assertNotIn('Vary', second)
+
+    def test_cache_headers(self):
+        """
+        Test that the landing page is cacheable and revalidates with its ETag.
+        """
+        response = self.client.get(reverse('index'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        response = self.client.get(reverse('index'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
 class MenuItemsViewTestCase(TestCase):
 
     def setUp(self):
@@ -42,7 +77,7 @@ class MenuItemsViewTestCase(TestCase):
         response = self.client.get(reverse('menu_items'))
         menu_items = Menu.objects.all()
         serializer = MenuSerializer(menu_items, many=True)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.json(), serializer.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_create_valid_menu_item(self):
@@ -112,6 +147,7 @@ class BookingViewSetTestCase(APITestCase):
         )
         self.client.force_authenticate(user=self.user)
         self.booking = Booking.objects.create(
+            user=self.user,
             name='Test booking',
             number_of_guest=2,
             booking_date='2022-05-20'
@@ -166,3 +202,469 @@ class BookingViewSetTestCase(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Booking.objects.count(), 0)
+
+
+class MenuItemsPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.menu_items = [
+            Menu.objects.create(title=f'Item {i}', price=Decimal('1.50'), inventory=i)
+            for i in range(5)
+        ]
+        self.url = reverse('menu_items')
+
+    def test_list_is_unpaginated_by_default(self):
+        """
+        Test that the MenuItemsView returns a plain list without pagination parameters.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 5)
+
+    def test_cursor_pagination(self):
+        """
+        Test that following the next links walks every menu item in id order.
+        """
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids += [item['id'] for item in response.data['results']]
+        self.assertEqual(ids, [item.id for item in self.menu_items])
+
+    def test_stream(self):
+        """
+        Test that the streaming mode returns the same payload as the regular list.
+        """
+        response = self.client.get(self.url, {'stream': '1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        expected = MenuSerializer(Menu.objects.order_by('id'), many=True).data
+        self.assertEqual(body, json.loads(json.dumps(expected)))
+
+    def test_stream_spans_several_chunks(self):
+        """
+        Test that streaming with a small chunk size still yields every row once.
+        """
+        body = json.loads(b''.join(stream_json_list(Menu.objects.all(), FastMenuSerializer, chunk_size=2)))
+        self.assertEqual([item['id'] for item in body], [item.id for item in self.menu_items])
+
+    @override_settings(MENU_STREAM_CHUNK_SIZE=2)
+    def test_stream_ordering(self):
+        """
+        Test that streaming keeps ?ordering= across chunks, with rows of equal
+        price in id order.
+        """
+        for i in range(5):
+            Menu.objects.create(title=f'Dish {i}', price=Decimal('3.00') + i % 2, inventory=i)
+        response = self.client.get(self.url, {'stream': '1', 'ordering': '-price'})
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(
+            [item['id'] for item in body], list(Menu.objects.order_by('-price', 'id').values_list('id', flat=True)),
+        )
+
+
+class MenuFilterTestCase(APITestCase):
+    def setUp(self):
+        Menu.objects.create(title='Soup', price=Decimal('4.00'), inventory=30)
+        Menu.objects.create(title='Steak', price=Decimal('25.00'), inventory=5)
+        Menu.objects.create(title='Salad', price=Decimal('8.50'), inventory=0)
+        self.url = reverse('menu_items')
+
+    def test_filter_by_price_and_inventory(self):
+        """
+        Test that the menu list filters on price and inventory ranges.
+        """
+        response = self.client.get(self.url, {'max_price': '10', 'min_inventory': '1'})
+        self.assertEqual([item['title'] for item in response.data], ['Soup'])
+
+    def test_ordering(self):
+        """
+        Test that the menu list can be ordered by price, also when paginated.
+        """
+        response = self.client.get(self.url, {'ordering': '-price'})
+        self.assertEqual([item['title'] for item in response.data], ['Steak', 'Salad', 'Soup'])
+        response = self.client.get(self.url, {'ordering': 'inventory', 'page_size': 2})
+        self.assertEqual([item['title'] for item in response.data['results']], ['Salad', 'Steak'])
+
+    def test_invalid_filter(self):
+        """
+        Test that a malformed filter value is rejected.
+        """
+        response = self.client.get(self.url, {'min_price': 'cheap'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MenuSearchTestCase(APITestCase):
+    def setUp(self):
+        self.burger = Menu.objects.create(title='Lemon Chicken Burger', price=Decimal('12.00'), inventory=5)
+        self.tart = Menu.objects.create(title='Lemon Tart', price=Decimal('6.00'), inventory=0)
+        Menu.objects.create(title='Chicken Soup', price=Decimal('5.00'), inventory=9)
+        self.url = reverse('menu_items_search')
+
+    def test_full_text(self):
+        """
+        Test that every query word must appear in the title, in any order,
+        with the last word matched as a prefix.
+        """
+        response = self.client.get(self.url, {'q': 'chicken lem'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data], [self.burger.id])
+        self.assertEqual(response.data[0], FastMenuSerializer.many(FastMenuSerializer.values(
+            Menu.objects.filter(pk=self.burger.pk)))[0])
+
+    def test_autocomplete(self):
+        """
+        Test that autocomplete matches title prefixes.
+        """
+        response = self.client.get(self.url, {'q': 'lemon t', 'autocomplete': '1'})
+        self.assertEqual([item['title'] for item in response.data], ['Lemon Tart'])
+
+    def test_filters_ordering_and_limit(self):
+        """
+        Test that search results take the menu filters, ordering and limit.
+        """
+        response = self.client.get(self.url, {'q': 'lemon', 'ordering': 'price'})
+        self.assertEqual([item['title'] for item in response.data], ['Lemon Tart', 'Lemon Chicken Burger'])
+        response = self.client.get(self.url, {'q': 'lemon', 'min_inventory': 1})
+        self.assertEqual([item['title'] for item in response.data], ['Lemon Chicken Burger'])
+        response = self.client.get(self.url, {'q': 'chicken', 'limit': 1})
+        self.assertEqual(len(response.data), 1)
+
+    def test_index_follows_menu_changes(self):
+        """
+        Test that new and renamed menu items are found right away.
+        """
+        self.assertEqual(self.client.get(self.url, {'q': 'pie'}).data, [])
+        self.tart.title = 'Lemon Pie'
+        self.tart.save()
+        response = self.client.get(self.url, {'q': 'pie'})
+        self.assertEqual([item['id'] for item in response.data], [self.tart.id])
+        self.assertEqual(self.client.get(self.url, {'q': 'tart'}).data, [])
+
+    def test_index_kept_across_inventory_changes(self):
+        """
+        Test that writes which leave every title alone keep the index.
+        """
+        index = search.menu_index()
+        Menu.objects.consume_inventory({self.burger.pk: 1})
+        item = Menu.objects.get(pk=self.burger.pk)
+        item.inventory += 1
+        item.save()
+        response = self.client.patch(reverse('single_menu_item', args=[self.tart.pk]), {'inventory': 7})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIs(search.menu_index(), index)
+
+    def test_query_required(self):
+        """
+        Test that a search without a query is rejected.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MenuCacheTestCase(APITestCase):
+    def setUp(self):
+        self.menu_item = Menu.objects.create(
+            title='Spaghetti Carbonara',
+            price=Decimal('10.99'),
+            inventory=5
+        )
+        self.list_url = reverse('menu_items')
+        self.detail_url = reverse('single_menu_item', args=[self.menu_item.id])
+
+    def test_list_is_served_from_cache(self):
+        """
+        Test that a repeated list request does not touch the database.
+        """
+        self.client.get(self.list_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_detail_is_served_from_cache(self):
+        """
+        Test that a repeated detail request does not touch the database.
+        """
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['title'], 'Spaghetti Carbonara')
+
+    def test_create_invalidates_list(self):
+        """
+        Test that creating a menu item is visible on the next list request.
+        """
+        self.client.get(self.list_url)
+        self.client.post(self.list_url, {'title': 'Salad', 'price': '4.50', 'inventory': 2})
+        response = self.client.get(self.list_url)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_update_invalidates_detail_and_list(self):
+        """
+        Test that updating a menu item is visible on the next detail and list requests.
+        """
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        self.client.put(self.detail_url, {'title': 'Lasagne', 'price': '11.00', 'inventory': 5})
+        self.assertEqual(self.client.get(self.detail_url).data['title'], 'Lasagne')
+        self.assertEqual(self.client.get(self.list_url).json()[0]['title'], 'Lasagne')
+
+    def test_delete_invalidates_detail_and_list(self):
+        """
+        Test that a deleted menu item is no longer served from the cache.
+        """
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        self.client.delete(self.detail_url)
+        self.assertEqual(self.client.get(self.detail_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.list_url).json(), [])
+
+    def test_conditional_requests(self):
+        """
+        Test that matching ETag and Last-Modified validators produce a 304.
+        """
+        response = self.client.get(self.detail_url)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.list_url)
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_after_write(self):
+        """
+        Test that a write changes the ETag so clients do not keep a stale copy.
+        """
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(self.detail_url, {'inventory': 4})
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['inventory'], 4)
+
+
+class MenuBulkViewTestCase(APITestCase):
+    def setUp(self):
+        self.menu_items = [
+            Menu.objects.create(title=f'Item {i}', price=Decimal('2.00'), inventory=i)
+            for i in range(3)
+        ]
+        self.url = reverse('menu_items_bulk')
+
+    def test_bulk_create(self):
+        """
+        Test that a list payload creates every menu item.
+        """
+        data = [
+            {'title': 'Soup', 'price': '3.50', 'inventory': 4},
+            {'title': 'Bread', 'price': '1.25', 'inventory': 9},
+        ]
+        response = self.client.post(self.url + '?batch_size=1', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['title'] for item in response.data], ['Soup', 'Bread'])
+        self.assertEqual(Menu.objects.count(), 5)
+
+    def test_bulk_create_returns_ids(self):
+        """
+        Test that created items come back with their ids on a backend that
+        returns no rows from a bulk insert, as MySQL does.
+        """
+        data = [{'title': f'Dish {i}', 'price': '3.50', 'inventory': i} for i in range(3)]
+        # A property on some backends, so patched on the class.
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            response = self.client.post(self.url + '?batch_size=2', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        created = dict(Menu.objects.filter(title__startswith='Dish ').values_list('title', 'id'))
+        self.assertEqual([item['id'] for item in response.data], [created[item['title']] for item in data])
+
+    def test_bulk_create_is_all_or_nothing(self):
+        """
+        Test that one invalid item rejects the whole batch with per-item errors.
+        """
+        data = [
+            {'title': 'Soup', 'price': '3.50', 'inventory': 4},
+            {'title': 'Bread', 'price': 'free', 'inventory': 9},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('price', response.data[1])
+        self.assertEqual(Menu.objects.count(), 3)
+
+    def test_bulk_update(self):
+        """
+        Test that a partial update touches only the given fields in one UPDATE batch.
+        """
+        data = [{'id': item.id, 'inventory': 100 + item.id} for item in self.menu_items]
+        with self.assertNumQueries(4):
+            # SAVEPOINT, one SELECT, one UPDATE, RELEASE SAVEPOINT. The change
+            # number is taken after commit.
+            response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for item in self.menu_items:
+            item.refresh_from_db()
+            self.assertEqual(item.inventory, 100 + item.id)
+            self.assertEqual(item.price, Decimal('2.00'))
+
+    def test_bulk_update_unknown_id(self):
+        """
+        Test that updating an unknown id rejects the whole batch.
+        """
+        data = [
+            {'id': self.menu_items[0].id, 'inventory': 50},
+            {'id': 100000, 'inventory': 50},
+        ]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[1], {'id': ['Not found.']})
+        self.menu_items[0].refresh_from_db()
+        self.assertEqual(self.menu_items[0].inventory, 0)
+
+    def test_bulk_delete(self):
+        """
+        Test that a list of ids deletes the matching menu items and reports the rest.
+        """
+        ids = [self.menu_items[0].id, self.menu_items[1].id, 100000]
+        response = self.client.delete(self.url, ids, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['deleted'] for item in response.data], [True, True, False])
+        self.assertEqual(list(Menu.objects.values_list('id', flat=True)), [self.menu_items[2].id])
+
+    def test_bulk_write_invalidates_cache(self):
+        """
+        Test that bulk writes are visible on the next cached list request.
+        """
+        self.client.get(reverse('menu_items'))
+        data = [{'id': self.menu_items[0].id, 'title': 'Renamed'}]
+        self.client.patch(self.url, data, format='json')
+        response = self.client.get(reverse('menu_items'))
+        self.assertEqual(response.json()[0]['title'], 'Renamed')
+
+
+class MenuStockViewTestCase(APITestCase):
+    def setUp(self):
+        self.burger = Menu.objects.create(title='Burger', price=Decimal('10.00'), inventory=5)
+        self.fries = Menu.objects.create(title='Fries', price=Decimal('3.00'), inventory=1)
+        self.url = reverse('menu_items_consume')
+
+    def test_consume(self):
+        """
+        Test that a batch of (item, quantity) pairs is consumed and the remaining stock returned.
+        """
+        data = [
+            {'id': self.burger.id, 'quantity': 2},
+            {'id': self.fries.id, 'quantity': 1},
+            {'id': self.burger.id, 'quantity': 1},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'id': self.burger.id, 'inventory': 2},
+            {'id': self.fries.id, 'inventory': 0},
+        ])
+
+    def test_consume_insufficient(self):
+        """
+        Test that a short item rejects the whole batch with a 409.
+        """
+        data = [
+            {'id': self.burger.id, 'quantity': 2},
+            {'id': self.fries.id, 'quantity': 2},
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['id'], self.fries.id)
+        self.burger.refresh_from_db()
+        self.assertEqual(self.burger.inventory, 5)
+
+    def test_consume_unknown_item(self):
+        """
+        Test that an unknown item returns a 404.
+        """
+        response = self.client.post(self.url, [{'id': 100000, 'quantity': 1}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_consume_invalid_quantity(self):
+        """
+        Test that a non-positive quantity is rejected.
+        """
+        response = self.client.post(self.url, [{'id': self.burger.id, 'quantity': 0}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookingAvailabilityTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass'
+        )
+        self.client.force_authenticate(user=self.user)
+        SlotCapacity.objects.create(date='2022-05-20', seats=5)
+        Booking.objects.create(name='Test booking', number_of_guest=3, booking_date='2022-05-20')
+
+    def test_availability(self):
+        url = reverse('tables-availability')
+        response = self.client.get(url, {'start': '2022-05-20', 'end': '2022-05-21'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0], {
+            'date': '2022-05-20', 'capacity': 5, 'booked': 3, 'remaining': 2,
+        })
+        self.assertEqual(len(response.data), 2)
+
+    def test_availability_invalid_range(self):
+        url = reverse('tables-availability')
+        response = self.client.get(url, {'start': '2022-05-21', 'end': '2022-05-20'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_booking_over_capacity(self):
+        url = reverse('tables-list')
+        data = {'name': 'Big party', 'number_of_guest': 3, 'booking_date': '2022-05-20'}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('number_of_guest', response.data)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class BookingOwnershipTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.other = User.objects.create_user(username='otheruser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.mine = [
+            Booking.objects.create(user=self.user, name='Mine', number_of_guest=2, booking_date=day)
+            for day in ('2022-05-22', '2022-05-20', '2022-05-21')
+        ]
+        self.theirs = Booking.objects.create(
+            user=self.other, name='Theirs', number_of_guest=2, booking_date='2022-05-20'
+        )
+
+    def test_list_only_own_bookings(self):
+        response = self.client.get(reverse('tables-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [booking['booking_date'] for booking in response.data],
+            ['2022-05-20', '2022-05-21', '2022-05-22'],
+        )
+
+    def test_date_range_filter(self):
+        response = self.client.get(reverse('tables-list'), {'date_from': '2022-05-21', 'date_to': '2022-05-21'})
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['booking_date'], '2022-05-21')
+
+    def test_invalid_date_filter(self):
+        response = self.client.get(reverse('tables-list'), {'date_from': 'tomorrow'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_booking_is_hidden(self):
+        response = self.client.get(reverse('tables-detail', args=[self.theirs.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.delete(reverse('tables-detail', args=[self.theirs.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_sets_owner(self):
+        data = {'name': 'New booking', 'number_of_guest': 4, 'booking_date': '2022-06-15', 'user': self.other.id}
+        response = self.client.post(reverse('tables-list'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Booking.objects.get(name='New booking').user, self.user)
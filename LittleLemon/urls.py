@@ -14,19 +14,29 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 from restaurant import views
 router = DefaultRouter()
 router.register(r'tables', views.BookingViewSet,basename='tables')
+router.register(r'stats', views.BookingStatsViewSet, basename='booking-stats')
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', views.metrics, name='metrics'),
+    # Ahead of djoser's own route so token logins are throttled.
+    re_path(r'^auth/token/login/?$', views.ThrottledTokenCreateView.as_view(), name='login'),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
     path('restaurant/menu/', include('restaurant.urls')),
     path('restaurant/booking/', include(router.urls)),
 
 ]
+
+if settings.ASYNC_API_VIEWS:
+    urlpatterns += [
+        path('restaurant/async/', include('restaurant.async_urls')),
+    ]
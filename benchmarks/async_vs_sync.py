@@ -0,0 +1,66 @@
+"""
+Compare requests per second and latency percentiles of the DRF (sync)
+endpoints and their ASGI-native counterparts under uvicorn.
+
+    python -m benchmarks.async_vs_sync --spawn --concurrency 100 --requests 5000 \
+        --token <auth token>
+
+With --spawn a single-worker uvicorn is started for the run; otherwise the
+server at --host/--port is used. Results are printed as JSON. The database
+should already hold data (see the seed_benchmark management command).
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from .loadgen import run_load
+from .servers import server_process
+
+SCENARIOS = [
+    ('menu_list', '/restaurant/menu/items/', '/restaurant/async/menu/items/', False),
+    ('menu_detail', '/restaurant/menu/items/{menu_id}', '/restaurant/async/menu/items/{menu_id}', False),
+    ('booking_list', '/restaurant/booking/tables/', '/restaurant/async/booking/tables/', True),
+]
+
+
+def compare(args):
+    headers = {'Authorization': f'Token {args.token}'} if args.token else {}
+    results = []
+    for name, sync_path, async_path, needs_auth in SCENARIOS:
+        if needs_auth and not args.token:
+            continue
+        row = {'scenario': name}
+        for mode, path in (('sync', sync_path), ('async', async_path)):
+            row[mode] = asyncio.run(run_load(
+                args.host, args.port, path.format(menu_id=args.menu_id),
+                concurrency=args.concurrency, requests=args.requests, duration=args.duration,
+                headers=headers if needs_auth else None,
+            ))
+        results.append(row)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--spawn', action='store_true', help='start a uvicorn server for the run')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--menu-id', type=int, default=1)
+    parser.add_argument('--token', help='auth token for the booking scenarios')
+    args = parser.parse_args(argv)
+
+    if args.spawn:
+        with server_process('asgi', args.host, args.port):
+            results = compare(args)
+    else:
+        results = compare(args)
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
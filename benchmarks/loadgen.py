@@ -0,0 +1,98 @@
+"""
+A small closed-loop HTTP/1.1 load generator built on asyncio streams.
+
+Each worker keeps one keep-alive connection open and issues requests back
+to back, so the measured throughput is what the server sustains at the
+given concurrency. It has no dependencies beyond the standard library.
+"""
+import asyncio
+import time
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed by server')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        size = 0
+        while True:
+            chunk_size = int((await reader.readline()).split(b';')[0], 16)
+            if chunk_size == 0:
+                await reader.readline()
+                break
+            size += len(await reader.readexactly(chunk_size + 2)) - 2
+    else:
+        size = len(await reader.readexactly(int(headers.get('content-length', 0))))
+    return status, size, headers
+
+
+async def _worker(host, port, request, deadline, remaining, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while remaining[0] > 0 and time.monotonic() < deadline:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, _, headers = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors[status] = errors.get(status, 0) + 1
+            if headers.get('connection', '').lower() == 'close':
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, path, concurrency=50, requests=2000, duration=60, method='GET',
+                   headers=None, body=None):
+    """
+    Send `requests` requests to path across `concurrency` connections (or
+    stop after `duration` seconds) and return throughput and latency
+    percentiles in milliseconds. A body is sent as JSON.
+    """
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: keep-alive']
+    lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+    if body is not None:
+        lines += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+    request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b'')
+
+    latencies = []
+    errors = {}
+    remaining = [requests]
+    started = time.perf_counter()
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(
+        _worker(host, port, request, deadline, remaining, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    return {
+        'path': path,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
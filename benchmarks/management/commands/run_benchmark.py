@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmarks import runner, seeding
+from benchmarks.scenarios import default_scenarios
+from restaurant.models import Booking, Menu
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the API benchmark scenarios through the test client and optionally '
+        'a real WSGI/ASGI server, and report the results as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='requests per scenario in client mode')
+        parser.add_argument('--server', choices=['none', 'wsgi', 'asgi'], default='none')
+        parser.add_argument('--requests', type=int, default=2_000,
+                            help='requests per scenario in server mode')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='only run the named scenario (repeatable)')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='do not serve cached menu responses in client mode')
+        parser.add_argument('--output', help='write the JSON report to this file')
+        parser.add_argument('--check', action='store_true',
+                            help='fail if a scenario misses its p95 latency target')
+
+    def handle(self, *args, **options):
+        menu_count = Menu.objects.count()
+        menu_id = Menu.objects.order_by('pk').values_list('pk', flat=True)[menu_count // 2] if menu_count else 1
+        scenarios = default_scenarios(menu_id)
+        if options['scenarios']:
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['scenarios']]
+        token = seeding.benchmark_token()
+
+        results = [
+            runner.run_client(
+                scenario, options['iterations'], token=token, use_cache=not options['no_cache']
+            )
+            for scenario in scenarios
+        ]
+        if options['server'] != 'none':
+            results += runner.run_server(
+                options['server'], scenarios, options['requests'], options['concurrency'],
+                token=token, port=options['port'], workers=options['workers'],
+            )
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'rows': {'menu': Menu.objects.count(), 'bookings': Booking.objects.count()},
+                'cache': not options['no_cache'],
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+        missed = [result['scenario'] for result in results if result['within_target'] is False]
+        if options['check'] and missed:
+            raise CommandError(f"p95 latency target missed by: {', '.join(missed)}")
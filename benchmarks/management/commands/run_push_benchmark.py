@@ -0,0 +1,50 @@
+import json
+import resource
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import push
+from restaurant.models import Menu
+
+
+class Command(BaseCommand):
+    help = (
+        'Hold idle live update streams open against a single-worker uvicorn, '
+        'push menu events through them, and report memory, threads and '
+        'delivery latency as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=5000, help='streams to hold open')
+        parser.add_argument('--events', type=int, default=10,
+                            help='menu writes to push through the streams (needs a menu item)')
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--output', help='write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        # Both ends of every stream are open on this host: the client's here
+        # and the server's in its child process, which inherits the limit.
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        needed = options['connections'] + 100
+        if soft != resource.RLIM_INFINITY and soft < needed:
+            if hard != resource.RLIM_INFINITY and hard < needed:
+                raise CommandError(f'--connections {options["connections"]} needs `ulimit -n {needed}`.')
+            resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+
+        item = None
+        if options['events']:
+            item = Menu.objects.order_by('pk').values('pk', 'inventory').first()
+            if item is None:
+                raise CommandError('--events needs a menu item; run seed_benchmark first.')
+        result = push.run(
+            options['connections'], options['events'],
+            menu_id=item and item['pk'], inventory=item and item['inventory'], port=options['port'],
+        )
+        if item is not None:
+            Menu.objects.filter(pk=item['pk']).update(inventory=item['inventory'])
+
+        output = json.dumps({'results': [result]}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
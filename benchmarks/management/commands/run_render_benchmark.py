@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.rendering import booking_payload, measure, menu_payload
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure render time and response size of large menu and booking lists with '
+        "DRF's JSONRenderer and FastJSONRenderer, and report them as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu', type=int, default=10_000, help='menu items in the menu list')
+        parser.add_argument('--bookings', type=int, default=100_000, help='bookings in the booking list')
+        parser.add_argument('--repeat', type=int, default=3, help='renders per measurement; the best is kept')
+        parser.add_argument('--output', help='write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        results = (
+            measure('menu', menu_payload(options['menu']), options['repeat'])
+            + measure('bookings', booking_payload(options['bookings']), options['repeat'])
+        )
+        output = json.dumps({'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.throttle import measure
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request cost and cache footprint of the API throttle "
+        "against DRF's timestamp-list throttle, and report them as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10_000,
+                            help='requests from one client in one window')
+        parser.add_argument('--output', help='write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        checkpoints = {n for n in (10, 100, 1_000, 10_000, 100_000) if n < requests} | {requests}
+        results = measure('sliding_window', requests, checkpoints) + measure('drf_timestamps', requests, checkpoints)
+        output = json.dumps({'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from benchmarks import seeding
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load a reproducible benchmark dataset of menu items, users and bookings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu', type=int, default=10_000)
+        parser.add_argument('--bookings', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=1_000)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=0, help='random seed for generated values')
+        parser.add_argument('--clear', action='store_true',
+                            help='delete all menu items and bookings and the benchmark users first')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            with transaction.atomic():
+                seeding.clear()
+
+        def progress(model, created):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{model.__name__}: {created}')
+
+        counts = seeding.seed(
+            menu=options['menu'],
+            bookings=options['bookings'],
+            users=options['users'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded ' + ', '.join(f'{count} {name}' for name, count in counts.items())
+        ))
@@ -0,0 +1,160 @@
+"""
+Load test of the live updates stream (restaurant.live): hold thousands of
+idle streams open against one uvicorn worker, then push menu events
+through them.
+
+The report gives the server's resident memory and thread count before and
+after the streams connect (idle streams must not add threads), and how long
+each event took to reach every stream, measured from the write request
+that caused it.
+"""
+import asyncio
+import json
+import time
+import urllib.request
+
+from .loadgen import percentile
+from .servers import process_status, server_process
+
+# Streams opened at once; past the server's listen backlog connections
+# would be refused rather than queued.
+CONNECT_BATCH = 500
+
+
+class Stream:
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port, path):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n'.encode())
+        await writer.drain()
+        head = await reader.readuntil(b'\r\n\r\n')
+        if not head.startswith(b'HTTP/1.1 200'):
+            writer.close()
+            raise ConnectionError(head.split(b'\r\n', 1)[0].decode('latin-1'))
+        stream = cls(reader, writer)
+        # The retry: frame the server opens every stream with.
+        await stream.next_frame()
+        return stream
+
+    async def next_frame(self):
+        # Frames end with a blank line; the chunked transfer framing around
+        # them only ever uses \r\n, so it never ends one early.
+        return await self.reader.readuntil(b'\n\n')
+
+    async def next_event(self):
+        while True:
+            frame = await self.next_frame()
+            if b'event: ' in frame:
+                return time.perf_counter()
+
+    def close(self):
+        self.writer.close()
+
+
+async def open_streams(host, port, path, count):
+    streams, errors = [], 0
+    for start in range(0, count, CONNECT_BATCH):
+        batch = min(CONNECT_BATCH, count - start)
+        opened = await asyncio.gather(
+            *(Stream.open(host, port, path) for _ in range(batch)), return_exceptions=True,
+        )
+        for stream in opened:
+            if isinstance(stream, Stream):
+                streams.append(stream)
+            else:
+                errors += 1
+    return streams, errors
+
+
+def patch_inventory(host, port, menu_id, inventory):
+    request = urllib.request.Request(
+        f'http://{host}:{port}/restaurant/menu/items/{menu_id}',
+        data=json.dumps({'inventory': inventory}).encode(),
+        headers={'Content-Type': 'application/json'},
+        method='PATCH',
+    )
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+async def push_events(host, port, streams, events, menu_id, inventory, timeout):
+    """
+    Change the inventory of menu_id events times, each time waiting for
+    every stream to receive the event. Returns the delivery latencies and
+    the number of deliveries that did not arrive within timeout.
+    """
+    latencies, missed = [], 0
+    for i in range(events):
+        waiting = [asyncio.ensure_future(stream.next_event()) for stream in streams]
+        started = time.perf_counter()
+        await asyncio.to_thread(patch_inventory, host, port, menu_id, inventory + 1 - i % 2)
+        done, pending = await asyncio.wait(waiting, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        missed += len(pending)
+        latencies += [task.result() - started for task in done if task.exception() is None]
+        missed += sum(1 for task in done if task.exception() is not None)
+    return latencies, missed
+
+
+def _snapshot(pid):
+    return {'rss_kb': process_status(pid, 'VmRSS'), 'threads': process_status(pid, 'Threads')}
+
+
+async def _measure(host, port, pid, connections, events, menu_id, inventory, timeout):
+    path = '/restaurant/live/?channels=menu'
+    # One stream first, so the baseline includes the imports and objects
+    # every stream shares.
+    (await Stream.open(host, port, path)).close()
+    await asyncio.sleep(0.5)
+    idle = _snapshot(pid)
+
+    started = time.perf_counter()
+    streams, connect_errors = await open_streams(host, port, path, connections)
+    connect_seconds = time.perf_counter() - started
+    await asyncio.sleep(1)
+    connected = _snapshot(pid)
+
+    latencies, missed = [], 0
+    if events and streams:
+        latencies, missed = await push_events(host, port, streams, events, menu_id, inventory, timeout)
+    for stream in streams:
+        stream.close()
+
+    per_connection = None
+    if idle['rss_kb'] is not None and streams:
+        per_connection = round((connected['rss_kb'] - idle['rss_kb']) / len(streams), 2)
+    return {
+        'connections': len(streams),
+        'connect_errors': connect_errors,
+        'connect_seconds': round(connect_seconds, 2),
+        'rss_kb_idle': idle['rss_kb'],
+        'rss_kb_connected': connected['rss_kb'],
+        'kb_per_connection': per_connection,
+        'threads_idle': idle['threads'],
+        'threads_connected': connected['threads'],
+        'events': events,
+        'deliveries': len(latencies),
+        'missed': missed,
+        'delivery_p50_ms': _ms(percentile(latencies, 50)),
+        'delivery_p99_ms': _ms(percentile(latencies, 99)),
+        'delivery_max_ms': _ms(max(latencies, default=None)),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def run(connections, events=0, menu_id=None, inventory=0, host='127.0.0.1', port=8766, timeout=30):
+    """
+    Start a single-worker uvicorn and measure it holding connections
+    streams, pushing events inventory changes of menu_id through them.
+    """
+    with server_process('asgi', host, port, workers=1) as process:
+        return asyncio.run(_measure(host, port, process.pid, connections, events, menu_id, inventory, timeout))
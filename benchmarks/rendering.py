@@ -0,0 +1,71 @@
+"""
+Render time and bytes on the wire of large menu and booking lists, with
+DRF's JSONRenderer and the API's FastJSONRenderer, uncompressed, gzipped as
+CompressionMiddleware does and brotli compressed when brotli is installed.
+
+The payloads are built in memory from the seeding generators and the fast
+serializers, so no database rows are needed.
+"""
+import random
+import time
+
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from restaurant.fast_serializers import FastBookingSerializer, FastMenuSerializer
+from restaurant.renderers import FastJSONRenderer
+from restaurant.snapshot import BROTLI_QUALITY, brotli
+
+from .seeding import booking_rows, menu_rows
+
+RENDERERS = {'drf': JSONRenderer, 'fast': FastJSONRenderer}
+
+
+def menu_payload(count, seed=0):
+    return FastMenuSerializer.many(
+        {'id': i, 'title': item.title, 'price': item.price, 'inventory': item.inventory}
+        for i, item in enumerate(menu_rows(count, random.Random(seed)), 1)
+    )
+
+
+def booking_payload(count, seed=0):
+    return FastBookingSerializer.many(
+        {
+            'id': i, 'name': booking.name, 'number_of_guest': booking.number_of_guest,
+            'booking_date': booking.booking_date, 'user': booking.user_id,
+        }
+        for i, booking in enumerate(booking_rows(count, list(range(1, 1001)), random.Random(seed)), 1)
+    )
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure(name, payload, repeat=3):
+    """
+    One result per renderer for payload, each with the best of `repeat`
+    render times and the size of the body as sent with each encoding.
+    """
+    results = []
+    for renderer_name, renderer_class in RENDERERS.items():
+        renderer = renderer_class()
+        render_seconds, body = best_of(repeat, lambda: renderer.render(payload, 'application/json'))
+        gzip_seconds, gzipped = best_of(repeat, lambda: compress_string(body))
+        results.append({
+            'payload': name,
+            'rows': len(payload),
+            'renderer': renderer_name,
+            'render_ms': round(render_seconds * 1000, 2),
+            'bytes': len(body),
+            'gzip_ms': round(gzip_seconds * 1000, 2),
+            'gzip_bytes': len(gzipped),
+            'br_bytes': len(brotli.compress(body, quality=BROTLI_QUALITY)) if brotli else None,
+        })
+    return results
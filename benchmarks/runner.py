@@ -0,0 +1,132 @@
+"""
+Measure benchmark scenarios in-process through the Django test client or
+over HTTP against a real server, returning plain dicts ready for JSON.
+"""
+import asyncio
+import json
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .loadgen import percentile, run_load
+from .servers import peak_rss_kb, server_process
+from .throttle import unthrottled
+
+MEMORY_ITERATIONS = 10
+
+
+def _summary(latencies):
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+    }
+
+
+def _target(scenario, latencies):
+    if scenario.target_p95_ms is None:
+        return {'target_p95_ms': None, 'within_target': None}
+    return {
+        'target_p95_ms': scenario.target_p95_ms,
+        'within_target': percentile(latencies, 95) * 1000 <= scenario.target_p95_ms,
+    }
+
+
+def run_client(scenario, iterations, token=None, use_cache=True):
+    """
+    Run scenario `iterations` times through the test client. Reports
+    latency percentiles, queries per request and the peak Python memory
+    allocated by a single request. Memory is traced in a separate pass so
+    tracemalloc's overhead does not skew the latencies. Writes are rolled
+    back afterwards.
+    """
+    client = Client()
+    extra = {'HTTP_AUTHORIZATION': f'Token {token}'} if scenario.auth and token else {}
+    body = json.dumps(scenario.body) if scenario.body is not None else ''
+    # A zero timeout stores no responses but keeps the menu version keys, so
+    # state derived from them (the search index) stays warm as in production.
+    cache_settings = {} if use_cache else {'MENU_CACHE_TIMEOUT': 0}
+    # Every request comes from one client; keep the throttle running but
+    # never rejecting.
+    cache_settings['REST_FRAMEWORK'] = unthrottled(settings.REST_FRAMEWORK)
+
+    def send():
+        response = client.generic(
+            scenario.method, scenario.path, body, content_type='application/json', **extra
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    latencies = []
+    queries = 0
+    errors = {}
+    with override_settings(ALLOWED_HOSTS=['*'], **cache_settings), transaction.atomic():
+        started = time.perf_counter()
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = send()
+                latencies.append(time.perf_counter() - request_started)
+            queries += len(captured)
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+        elapsed = time.perf_counter() - started
+
+        peak = 0
+        for _ in range(min(iterations, MEMORY_ITERATIONS)):
+            tracemalloc.start()
+            send()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        transaction.set_rollback(True)
+
+    return {
+        'scenario': scenario.name,
+        'mode': 'client',
+        'requests': iterations,
+        'errors': errors,
+        'rps': round(iterations / elapsed, 1),
+        **_summary(latencies),
+        'queries_per_request': round(queries / iterations, 2),
+        'peak_memory_kb': peak // 1024,
+        **_target(scenario, latencies),
+    }
+
+
+def run_server(kind, scenarios, requests, concurrency, token=None, host='127.0.0.1', port=8765,
+               workers=1):
+    """
+    Start a WSGI or ASGI server and drive every scenario over HTTP. Query
+    counts are only available in client mode; memory is the peak resident
+    set size of the server's main process.
+    """
+    results = []
+    with server_process(kind, host, port, workers) as process:
+        for scenario in scenarios:
+            headers = {'Authorization': f'Token {token}'} if scenario.auth and token else None
+            body = json.dumps(scenario.body).encode() if scenario.body is not None else None
+            load = asyncio.run(run_load(
+                host, port, scenario.path, concurrency=concurrency, requests=requests,
+                method=scenario.method, headers=headers, body=body,
+            ))
+            results.append({
+                'scenario': scenario.name,
+                'mode': kind,
+                'requests': load['requests'],
+                'errors': load['errors'],
+                'rps': load['rps'],
+                'p50_ms': load['p50_ms'],
+                'p95_ms': load['p95_ms'],
+                'p99_ms': load['p99_ms'],
+                'queries_per_request': None,
+                'peak_memory_kb': peak_rss_kb(process.pid),
+                'target_p95_ms': None,
+                'within_target': None,
+            })
+    return results
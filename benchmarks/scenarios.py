@@ -0,0 +1,38 @@
+from collections import namedtuple
+
+from .seeding import BOOKING_DATE
+
+# target_p95_ms, when set, is the latency run_benchmark --check holds the
+# scenario to in client mode.
+Scenario = namedtuple('Scenario', ['name', 'method', 'path', 'body', 'auth', 'target_p95_ms'],
+                      defaults=[None])
+
+
+def default_scenarios(menu_id):
+    """
+    The request mix every benchmark run measures. menu_id should be an
+    existing menu item for the detail scenario.
+    """
+    return [
+        Scenario('menu_list', 'GET', '/restaurant/menu/items/?page_size=100', None, False),
+        Scenario('menu_detail', 'GET', f'/restaurant/menu/items/{menu_id}', None, False),
+        Scenario(
+            'menu_create', 'POST', '/restaurant/menu/items/',
+            {'title': 'Benchmark item', 'price': '9.99', 'inventory': 10}, False,
+        ),
+        Scenario(
+            'menu_filter', 'GET',
+            '/restaurant/menu/items/?page_size=100&min_price=10&max_price=20&ordering=-price',
+            None, False, 50,
+        ),
+        Scenario('menu_search', 'GET', '/restaurant/menu/items/search/?q=lemon+chick', None, False, 50),
+        Scenario(
+            'menu_autocomplete', 'GET', '/restaurant/menu/items/search/?q=grilled+ke&autocomplete=1',
+            None, False, 25,
+        ),
+        Scenario('booking_list', 'GET', '/restaurant/booking/tables/?date_from=2024-06-01&date_to=2024-06-30', None, True),
+        Scenario(
+            'booking_create', 'POST', '/restaurant/booking/tables/',
+            {'name': 'Benchmark booking', 'number_of_guest': 1, 'booking_date': BOOKING_DATE.isoformat()}, True,
+        ),
+    ]
@@ -0,0 +1,102 @@
+"""
+Bulk loaders for the benchmark dataset.
+
+Rows are produced by generators and written with bulk_create one batch at
+a time, so seeding a million bookings keeps memory flat.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+
+from restaurant.bulkdata import batched
+from restaurant.models import Booking, Menu, SlotCapacity
+
+USERNAME_PREFIX = 'bench_user_'
+BENCHMARK_PASSWORD = 'bench-password'
+# The booking_create scenario books this date; it gets effectively unlimited
+# capacity so long runs do not turn into a stream of 400s.
+BOOKING_DATE = date(2030, 1, 1)
+
+
+def bulk_insert(model, rows, batch_size, progress=None):
+    created = 0
+    for batch in batched(rows, batch_size):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+        if progress:
+            progress(model, created)
+    return created
+
+
+# Titles are built from these so the search scenarios have realistic
+# matches: a word in many titles, a prefix shared by a few.
+MENU_STYLES = ['Lemon', 'Grilled', 'Roasted', 'Spicy', 'Garlic', 'Herb', 'Classic', 'Greek', 'Smoked', 'Crispy']
+MENU_DISHES = [
+    'Burger', 'Pasta', 'Salad', 'Soup', 'Risotto', 'Tart', 'Curry', 'Pizza', 'Sandwich', 'Chicken',
+    'Falafel', 'Hummus', 'Gyro', 'Kebab', 'Moussaka', 'Souvlaki',
+]
+
+
+def menu_rows(count, rng):
+    for i in range(count):
+        yield Menu(
+            title=f'{rng.choice(MENU_STYLES)} {rng.choice(MENU_DISHES)} {i}',
+            price=Decimal(rng.randint(100, 5000)) / 100,
+            inventory=rng.randint(0, 500),
+        )
+
+
+def user_rows(count):
+    # Hashing is deliberately slow, so every benchmark user shares one hash.
+    password = make_password(BENCHMARK_PASSWORD)
+    for i in range(count):
+        yield User(username=f'{USERNAME_PREFIX}{i}', password=password)
+
+
+def booking_rows(count, user_ids, rng, start=date(2024, 1, 1), days=365):
+    for i in range(count):
+        yield Booking(
+            user_id=user_ids[i % len(user_ids)] if user_ids else None,
+            name=f'Booking {i}',
+            number_of_guest=rng.randint(1, 8),
+            booking_date=start + timedelta(days=rng.randrange(days)),
+        )
+
+
+def clear():
+    Booking.objects.all().delete()
+    SlotCapacity.objects.filter(date=BOOKING_DATE).delete()
+    Menu.objects.all().delete()
+    User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+
+def seed(menu=0, bookings=0, users=0, batch_size=5000, seed=0, progress=None):
+    rng = random.Random(seed)
+    counts = {}
+    counts['menu'] = bulk_insert(Menu, menu_rows(menu, rng), batch_size, progress)
+    counts['users'] = bulk_insert(User, user_rows(users), batch_size, progress)
+    user_ids = list(
+        User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk').values_list('pk', flat=True)
+    )
+    with_token = set(Token.objects.filter(user__username__startswith=USERNAME_PREFIX).values_list('user_id', flat=True))
+    tokens = (Token(user_id=pk, key=Token.generate_key()) for pk in user_ids if pk not in with_token)
+    bulk_insert(Token, tokens, batch_size)
+    counts['bookings'] = bulk_insert(Booking, booking_rows(bookings, user_ids, rng), batch_size, progress)
+    SlotCapacity.objects.update_or_create(date=BOOKING_DATE, defaults={'seats': 2 ** 31 - 1})
+    return counts
+
+
+def benchmark_token():
+    """
+    Token of the first seeded benchmark user, or None if none were seeded.
+    """
+    return (
+        Token.objects.filter(user__username__startswith=USERNAME_PREFIX)
+        .order_by('user_id')
+        .values_list('key', flat=True)
+        .first()
+    )
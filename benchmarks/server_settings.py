@@ -0,0 +1,29 @@
+"""
+Settings for benchmark servers: the settings module named by
+BENCHMARK_BASE_SETTINGS with the throttle rates lifted, since every request
+of a load run comes from the same client, and the admission control limits
+lifted, so that runs measure the views rather than load shedding.
+"""
+from importlib import import_module
+import os
+
+# benchmarks.throttle.UNLIMITED_RATE; not imported, since a settings module
+# cannot import code that reads settings.
+UNLIMITED_RATE = '1000000000/s'
+UNLIMITED_CONCURRENCY = 1_000_000
+
+_base = import_module(os.environ.get('BENCHMARK_BASE_SETTINGS', 'LittleLemon.settings'))
+globals().update((name, value) for name, value in vars(_base).items() if name.isupper())
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F821
+    'DEFAULT_THROTTLE_RATES': {
+        scope: UNLIMITED_RATE for scope in REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})  # noqa: F821
+    },
+}
+
+ADMISSION_CLASSES = {
+    name: {**options, 'limit': UNLIMITED_CONCURRENCY}
+    for name, options in ADMISSION_CLASSES.items()  # noqa: F821
+}
+ADMISSION_SHED_AT = {}
@@ -0,0 +1,73 @@
+"""
+Start a throwaway WSGI or ASGI server for a benchmark run and report its
+memory and threads.
+"""
+import contextlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection((host, port), timeout=1):
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f'server on {host}:{port} did not start within {timeout}s')
+
+
+def server_command(kind, host, port, workers):
+    if kind == 'asgi':
+        return [
+            sys.executable, '-m', 'uvicorn', 'LittleLemon.asgi:application',
+            '--host', host, '--port', str(port), '--workers', str(workers),
+            '--log-level', 'warning', '--no-access-log',
+        ]
+    if kind == 'wsgi':
+        if shutil.which('gunicorn') is None:
+            raise RuntimeError('the wsgi server mode needs gunicorn installed')
+        return [
+            'gunicorn', 'LittleLemon.wsgi:application', '--bind', f'{host}:{port}',
+            '--workers', str(workers), '--log-level', 'warning',
+        ]
+    raise ValueError(f'unknown server kind {kind!r}')
+
+
+def process_status(pid, field):
+    """
+    The first number of a /proc/<pid>/status field (such as VmHWM, in KiB,
+    or Threads), or None where /proc is not available.
+    """
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def peak_rss_kb(pid):
+    """
+    Peak resident set size of pid in KiB (VmHWM).
+    """
+    return process_status(pid, 'VmHWM')
+
+
+@contextlib.contextmanager
+def server_process(kind, host, port, workers=1):
+    env = dict(os.environ)
+    env['BENCHMARK_BASE_SETTINGS'] = env.get('DJANGO_SETTINGS_MODULE', 'LittleLemon.settings')
+    env['DJANGO_SETTINGS_MODULE'] = 'benchmarks.server_settings'
+    process = subprocess.Popen(server_command(kind, host, port, workers), env=env)
+    try:
+        wait_for_port(host, port)
+        yield process
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
@@ -0,0 +1,87 @@
+"""
+Per-request cost of the API throttle, compared with DRF's timestamp-list
+throttle, as the number of requests a client has made in the window grows.
+"""
+import pickle
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.throttling import ScopedRateThrottle
+
+from restaurant.throttling import SlidingWindowThrottle
+
+# High enough that no benchmark request is ever rejected, so the throttle
+# still runs on every request but never changes the response.
+UNLIMITED_RATE = '1000000000/s'
+
+
+def unthrottled(rest_framework):
+    """
+    A copy of the REST_FRAMEWORK setting with every throttle rate lifted.
+    """
+    rates = {scope: UNLIMITED_RATE for scope in rest_framework.get('DEFAULT_THROTTLE_RATES', {})}
+    return {**rest_framework, 'DEFAULT_THROTTLE_RATES': rates}
+
+
+class _View:
+    def __init__(self, scope):
+        self.throttle_scope = scope
+
+
+def _timestamp_throttle(scope, rate):
+    class TimestampThrottle(ScopedRateThrottle):
+        THROTTLE_RATES = {scope: rate}
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+    return TimestampThrottle
+
+
+def _sliding_window_throttle(scope, rate):
+    class Throttle(SlidingWindowThrottle):
+        def get_rate(self, view):
+            return scope, rate
+    return Throttle
+
+
+def measure(kind, requests, checkpoints):
+    """
+    Push `requests` requests from one client through a fresh throttle of
+    kind 'sliding_window' or 'drf_timestamps', returning the mean cost per
+    request (in microseconds) and the size of the client's cache entries
+    as each checkpoint is reached.
+    """
+    scope = f'bench-{uuid.uuid4().hex}'
+    rate = f'{requests * 10}/h'
+    throttle_class = (_sliding_window_throttle if kind == 'sliding_window' else _timestamp_throttle)(scope, rate)
+    request = Request(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1'))
+    view = _View(scope)
+    cache = caches[settings.THROTTLE_CACHE_ALIAS]
+
+    results = []
+    elapsed = 0.0
+    since = 0
+    for i in range(1, requests + 1):
+        throttle = throttle_class()
+        started = time.perf_counter()
+        allowed = throttle.allow_request(request, view)
+        elapsed += time.perf_counter() - started
+        assert allowed
+        if i in checkpoints:
+            if kind == 'sliding_window':
+                window = int(throttle.timer() // 3600)
+                keys = [throttle.cache_format.format(scope=scope, ident=throttle.get_cache_ident(request), window=w)
+                        for w in (window - 1, window)]
+            else:
+                keys = [throttle.get_cache_key(request, view)]
+            entry_bytes = sum(len(pickle.dumps(value)) for value in cache.get_many(keys).values())
+            results.append({
+                'throttle': kind,
+                'requests': i,
+                'us_per_request': round(elapsed / (i - since) * 1e6, 2),
+                'entry_bytes': entry_bytes,
+            })
+            elapsed, since = 0.0, i
+    return results
@@ -1,4 +1,240 @@
-from django.contrib import admin
-from .models import Menu, Booking
-# Register your models here.
-admin.site.register([Menu, Booking])
+"""
+Admin classes that keep the changelists fast on large tables.
+
+Every changelist sorts only on indexed columns and counts with
+EstimatedCountPaginator instead of a full COUNT(*). The booking date
+hierarchy is drawn from BookingDailyStats, and menu inventory and booking
+owners are changed with bulk actions that run a single UPDATE.
+"""
+import copy
+from datetime import date, timedelta
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils.functional import cached_property
+
+from . import cache
+from .models import Booking, BookingDailyStats, Menu, SlotCapacity
+
+
+def estimated_row_count(model, using):
+    """
+    The database's own estimate of the number of rows in model's table, from
+    its statistics rather than a scan, or None when it has none.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [table],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            # Filled in by ANALYZE; the first number of each row is the
+            # table's row count.
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts at most ADMIN_EXACT_COUNT_LIMIT rows. Beyond that an unfiltered
+    list reports the database's row estimate and a filtered one stops
+    counting at the limit, so the count costs the same however big the
+    table gets.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) shown next to search results.
+    show_full_result_count = False
+
+
+class MenuActionForm(ActionForm):
+    quantity = forms.IntegerField(required=False, label='Quantity')
+
+
+@admin.register(Menu)
+class MenuAdmin(LargeTableAdmin):
+    list_display = ['id', 'title', 'price', 'inventory']
+    list_display_links = ['id', 'title']
+    list_editable = ['inventory']
+    # Each of these has an index (see Menu.Meta.indexes).
+    sortable_by = ['id', 'title', 'price', 'inventory']
+    ordering = ['id']
+    search_fields = ['^title']
+    action_form = MenuActionForm
+    actions = ['set_inventory', 'add_inventory']
+
+    def get_quantity(self, request):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid() or form.cleaned_data['quantity'] is None:
+            self.message_user(request, 'Enter a whole number in Quantity.', messages.ERROR)
+            return None
+        return form.cleaned_data['quantity']
+
+    def update_inventory(self, request, queryset, inventory):
+        pks = list(queryset.values_list('pk', flat=True))
+        updated = queryset.update(inventory=inventory)
+        # update() sends no signals, so invalidate the cached responses here.
+        cache.invalidate_menu_items(pks, titles=False)
+        self.message_user(request, f'Updated the inventory of {updated} menu items.', messages.SUCCESS)
+
+    @admin.action(description='Set inventory of selected menu items to quantity')
+    def set_inventory(self, request, queryset):
+        quantity = self.get_quantity(request)
+        if quantity is not None:
+            self.update_inventory(request, queryset, max(quantity, 0))
+
+    @admin.action(description='Add quantity to inventory of selected menu items')
+    def add_inventory(self, request, queryset):
+        quantity = self.get_quantity(request)
+        if quantity is not None:
+            self.update_inventory(request, queryset, Greatest(F('inventory') + quantity, 0))
+
+
+HIERARCHY_PARAMS = {'booking_date__year', 'booking_date__month', 'booking_date__day'}
+
+
+class BookedDates:
+    """
+    Stands in for a booking changelist's queryset in the date hierarchy,
+    listing the booked years, months and days from BookingDailyStats
+    instead of a DISTINCT over every booking.
+    """
+
+    def __init__(self, start=None, end=None):
+        self.start = start
+        self.end = end
+
+    def booked(self):
+        stats = BookingDailyStats.objects.filter(bookings__gt=0)
+        if self.start is not None:
+            stats = stats.filter(date__gte=self.start, date__lt=self.end)
+        return stats
+
+    def aggregate(self, **kwargs):
+        # The MIN/MAX of booking_date that picks the starting level.
+        return self.booked().aggregate(**{name: type(agg)('date') for name, agg in kwargs.items()})
+
+    def dates(self, field_name, kind, order='ASC'):
+        return self.booked().dates('date', kind, order)
+
+
+def booked_dates_changelist(cl):
+    """
+    A copy of the booking changelist cl whose date hierarchy reads from
+    BookingDailyStats, or cl itself when a search or another filter is
+    applied and the booked dates could differ from the listed ones.
+    """
+    params = cl.get_filters_params()
+    if cl.query or not set(params) <= HIERARCHY_PARAMS:
+        return cl
+    start = end = None
+    year, month = params.get('booking_date__year'), params.get('booking_date__month')
+    try:
+        if year and month:
+            start = date(int(year), int(month), 1)
+            end = (start + timedelta(days=31)).replace(day=1)
+        elif year:
+            start, end = date(int(year), 1, 1), date(int(year) + 1, 1, 1)
+    except ValueError:
+        return cl
+    summary = copy.copy(cl)
+    summary.queryset = BookedDates(start, end)
+    return summary
+
+
+class BookingActionForm(ActionForm):
+    username = forms.CharField(required=False, label='Username')
+
+
+@admin.register(Booking)
+class BookingAdmin(LargeTableAdmin):
+    list_display = ['id', 'name', 'booking_date', 'number_of_guest', 'user']
+    list_select_related = ['user']
+    # "Empty" lists the bookings without an owner (see migration 0004),
+    # which the API shows to no one; served by booking_user_date_idx.
+    list_filter = [('user', admin.EmptyFieldListFilter)]
+    date_hierarchy = 'booking_date'
+    # Both served by booking_date_idx, which ends in the primary key.
+    ordering = ['-booking_date', '-id']
+    sortable_by = ['id', 'booking_date']
+    # Exact username matches use the unique index on auth_user and then
+    # booking_user_date_idx; a search on name would have to scan.
+    search_fields = ['=user__username']
+    raw_id_fields = ['user']
+    action_form = BookingActionForm
+    actions = ['assign_to_user']
+
+    @admin.action(description='Assign selected bookings to user')
+    def assign_to_user(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        username = form.cleaned_data['username'] if form.is_valid() else ''
+        user = get_user_model().objects.filter(username=username).first() if username else None
+        if user is None:
+            self.message_user(request, 'Enter the username of an existing user in Username.', messages.ERROR)
+            return
+        updated = queryset.update(user=user)
+        self.message_user(request, f'Assigned {updated} bookings to {user}.', messages.SUCCESS)
+
+
+@admin.register(SlotCapacity)
+class SlotCapacityAdmin(admin.ModelAdmin):
+    list_display = ['date', 'seats']
+    list_editable = ['seats']
+    ordering = ['-date']
+    date_hierarchy = 'date'
+
+
+@admin.register(BookingDailyStats)
+class BookingDailyStatsAdmin(admin.ModelAdmin):
+    """
+    Read-only: the rows are maintained from the bookings (see
+    rebuild_booking_stats).
+    """
+    list_display = ['date', 'bookings', 'guests']
+    ordering = ['-date']
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,367 @@
+"""
+Admission control: per route class concurrency limits, bounded queues and
+queue deadlines, so that a traffic spike is answered with quick 503s
+rather than a backlog in which every request times out.
+
+Under ASGI, AdmissionControlApplication (see LittleLemon.asgi) does this in
+front of Django, so shed requests never reach the thread Django runs its
+sync code on. Under WSGI, restaurant.middleware.AdmissionControlMiddleware
+does it as the first middleware. Each request is put in the route class of
+the first ADMISSION_ROUTES rule it matches and asks that class for a slot:
+
+- a request that already waited longer than the class timeout before it
+  reached Django (going by the proxy's X-Request-Start header) is shed;
+- once the process has ADMISSION_SHED_AT[priority] requests in flight,
+  classes of that priority are shed without queueing;
+- a class below its limit, with nobody queued, runs the request at once.
+  Otherwise the request waits its turn in the class queue, unless the
+  queue is full or the class's recent latency says its turn would come
+  after the timeout. A request still queued at the timeout is shed.
+
+Shed requests get 503 with a Retry-After estimated from how long the
+class queue takes to drain. Limits and counts are per process and are
+exported at /metrics.
+"""
+import asyncio
+from collections import Counter, deque
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .metrics import registry
+from .renderers import dumps
+
+PRIORITIES = ('high', 'normal', 'low')
+
+# Weight of the latest request in a class's latency average.
+LATENCY_SMOOTHING = 0.2
+
+SHED_BODY = dumps({'detail': 'The server is too busy to handle this request. Try again later.'})
+
+# Set on the ASGI scope of requests AdmissionControlApplication admitted.
+SCOPE_KEY = 'littlelemon.admitted'
+
+
+class Shed(Exception):
+    def __init__(self, route, reason, retry_after):
+        super().__init__(f'{route.name} request shed: {reason}')
+        self.route = route
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Waiter:
+    """
+    A queued request of a thread-per-request server, blocking its thread.
+    """
+
+    def __init__(self):
+        self.granted = False
+        self._event = threading.Event()
+
+    def grant(self):
+        self.granted = True
+        self._event.set()
+
+    def wait(self, timeout):
+        self._event.wait(timeout)
+
+
+class AsyncWaiter:
+    """
+    A queued request of an async server, waiting without a thread.
+    """
+
+    def __init__(self):
+        self.granted = False
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+
+    def grant(self):
+        self.granted = True
+        self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self._future.done():
+            self._future.set_result(None)
+
+    async def wait(self, timeout):
+        await asyncio.wait({self._future}, timeout=timeout)
+
+
+class RouteClass:
+
+    def __init__(self, name, limit, queue, timeout, priority='normal'):
+        if priority not in PRIORITIES:
+            raise ImproperlyConfigured(f'Route class {name!r} has unknown priority {priority!r}.')
+        if limit <= 0:
+            raise ImproperlyConfigured(f'Route class {name!r} needs a limit of at least 1.')
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.priority = priority
+        self.in_flight = 0
+        self.waiters = deque()
+        # Moving average of the seconds a request of this class takes.
+        self.latency = None
+        self.admitted = 0
+        self.shed = Counter()
+        self.wait_seconds = 0.0
+
+    def observe(self, seconds):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+    def expected_wait(self):
+        """
+        Seconds until a request joining the queue now would get its turn.
+        """
+        return (len(self.waiters) + 1) / self.limit * (self.latency or 0.0)
+
+
+class AdmissionController:
+    """
+    The route classes of this process. One lock guards every count, and is
+    held only for bookkeeping, never while a request waits or runs.
+    """
+
+    def __init__(self, classes, routes, shed_at, retry_after_max):
+        self.classes = {name: RouteClass(name, **options) for name, options in classes.items()}
+        if 'default' not in self.classes:
+            raise ImproperlyConfigured("ADMISSION_CLASSES needs a 'default' class.")
+        self.routes = []
+        for name, methods, pattern in routes:
+            if name not in self.classes:
+                raise ImproperlyConfigured(f'ADMISSION_ROUTES names unknown route class {name!r}.')
+            self.routes.append((self.classes[name], methods and frozenset(methods), re.compile(pattern)))
+        self.shed_at = shed_at
+        self.retry_after_max = retry_after_max
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def classify(self, method, path):
+        for route, methods, pattern in self.routes:
+            if (methods is None or method in methods) and pattern.match(path):
+                return route
+        return self.classes['default']
+
+    def admit(self, route, age, waiter_class):
+        """
+        Take a slot of route for a request that has waited age seconds so
+        far. Returns None when it may run now, or a waiter_class instance to
+        wait on (see wait_finished). Raises Shed.
+        """
+        with self._lock:
+            if age > route.timeout:
+                raise self._shed(route, 'expired')
+            shed_at = self.shed_at.get(route.priority)
+            if shed_at is not None and self.in_flight >= shed_at:
+                raise self._shed(route, 'overload')
+            if route.in_flight < route.limit and not route.waiters:
+                route.in_flight += 1
+                self.in_flight += 1
+                route.admitted += 1
+                return None
+            if len(route.waiters) >= route.queue:
+                raise self._shed(route, 'queue_full')
+            if route.expected_wait() > route.timeout - age:
+                raise self._shed(route, 'deadline')
+            waiter = waiter_class()
+            route.waiters.append(waiter)
+            return waiter
+
+    def wait_finished(self, route, waiter, waited):
+        """
+        Account for a wait that ended after waited seconds, raising Shed
+        unless the waiter was handed a slot.
+        """
+        with self._lock:
+            route.wait_seconds += waited
+            if waiter.granted:
+                return
+            route.waiters.remove(waiter)
+            raise self._shed(route, 'timeout')
+
+    def release(self, route, seconds):
+        """
+        Give back the slot of a request that ran for seconds, handing it
+        straight to the next queued request if there is one.
+        """
+        with self._lock:
+            route.observe(seconds)
+            self._hand_over(route)
+
+    def abandon(self, route, waiter):
+        """
+        Withdraw a waiter whose request went away while it was queued, giving
+        back the slot it may have been handed in the meantime.
+        """
+        with self._lock:
+            if waiter.granted:
+                self._hand_over(route)
+            else:
+                route.waiters.remove(waiter)
+
+    def _hand_over(self, route):
+        if route.waiters:
+            route.admitted += 1
+            route.waiters.popleft().grant()
+        else:
+            route.in_flight -= 1
+            self.in_flight -= 1
+
+    def _shed(self, route, reason):
+        route.shed[reason] += 1
+        retry_after = min(max(math.ceil(route.expected_wait()), 1), self.retry_after_max)
+        return Shed(route, reason, retry_after)
+
+    def render_metrics(self):
+        """
+        Prometheus lines for every route class.
+        """
+        with self._lock:
+            classes = sorted(self.classes.items())
+            lines = []
+            for metric, kind, help_text, value in (
+                ('in_flight', 'gauge', 'Requests running, by route class.', lambda c: c.in_flight),
+                ('queued', 'gauge', 'Requests waiting for a slot, by route class.', lambda c: len(c.waiters)),
+                ('limit', 'gauge', 'Concurrent requests allowed, by route class.', lambda c: c.limit),
+                ('latency_seconds', 'gauge', 'Moving average of request time, by route class.',
+                 lambda c: f'{c.latency or 0.0:.6f}'),
+                ('admitted', 'counter', 'Requests admitted, by route class.', lambda c: c.admitted),
+                ('queue_wait_seconds', 'counter', 'Time spent queued, by route class.',
+                 lambda c: f'{c.wait_seconds:.6f}'),
+            ):
+                metric = f'littlelemon_admission_{metric}' + ('_total' if kind == 'counter' else '')
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+                lines += [f'{metric}{{class="{name}"}} {value(route)}' for name, route in classes]
+            lines += [
+                '# HELP littlelemon_admission_shed_total Requests shed, by route class and reason.',
+                '# TYPE littlelemon_admission_shed_total counter',
+            ]
+            for name, route in classes:
+                lines += [
+                    f'littlelemon_admission_shed_total{{class="{name}",reason="{reason}"}} {count}'
+                    for reason, count in sorted(route.shed.items())
+                ]
+        return lines
+
+
+def acquire(controller, route, age):
+    """
+    Admit a request of route, blocking this thread while it is queued.
+    Raises Shed.
+    """
+    waiter = controller.admit(route, age, Waiter)
+    if waiter is not None:
+        started = time.perf_counter()
+        waiter.wait(route.timeout - age)
+        controller.wait_finished(route, waiter, time.perf_counter() - started)
+
+
+async def aacquire(controller, route, age):
+    waiter = controller.admit(route, age, AsyncWaiter)
+    if waiter is not None:
+        started = time.perf_counter()
+        try:
+            await waiter.wait(route.timeout - age)
+        except BaseException:
+            # Cancelled, typically because the client went away.
+            controller.abandon(route, waiter)
+            raise
+        controller.wait_finished(route, waiter, time.perf_counter() - started)
+
+
+def shed_headers(exc):
+    return {'Retry-After': str(exc.retry_after), 'X-Shed-Reason': exc.reason}
+
+
+class AdmissionControlApplication:
+    """
+    Admission control in front of an ASGI application (the Django handler).
+    A slot is held until the response has been sent, streamed bodies
+    included.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.application(scope, receive, send)
+            return
+        controller = get_controller()
+        route = controller.classify(scope['method'], scope['path'])
+        age = 0.0
+        for name, value in scope['headers']:
+            if name == b'x-request-start':
+                age = request_age(value.decode('latin-1'))
+        try:
+            await aacquire(controller, route, age)
+        except Shed as exc:
+            headers = [(b'content-type', b'application/json')]
+            headers += [(name.lower().encode(), value.encode()) for name, value in shed_headers(exc).items()]
+            await send({'type': 'http.response.start', 'status': 503, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': SHED_BODY})
+            return
+        started = time.perf_counter()
+        try:
+            await self.application({**scope, SCOPE_KEY: True}, receive, send)
+        finally:
+            controller.release(route, time.perf_counter() - started)
+
+
+def request_age(header, now=None):
+    """
+    Seconds since the proxy received the request, from an X-Request-Start
+    value in seconds, milliseconds or microseconds since the epoch, with or
+    without nginx's `t=` prefix. 0 when the header is missing or invalid.
+    """
+    try:
+        started = float(header.removeprefix('t='))
+    except ValueError:
+        return 0.0
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max((now or time.time()) - started, 0.0)
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    settings.ADMISSION_CLASSES, settings.ADMISSION_ROUTES,
+                    settings.ADMISSION_SHED_AT, settings.ADMISSION_RETRY_AFTER_MAX,
+                )
+    return _controller
+
+
+@receiver(setting_changed)
+def reset_controller(setting, **kwargs):
+    global _controller
+    if setting.startswith('ADMISSION_'):
+        _controller = None
+
+
+def render_admission_metrics():
+    return get_controller().render_metrics()
+
+
+registry.register_collector(render_admission_metrics)
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import async_views
+
+
+urlpatterns = [
+    path('menu/items/', async_views.AsyncMenuItemsView.as_view(), name='async_menu_items'),
+    path('menu/items/<int:pk>', async_views.AsyncSingleMenuItemView.as_view(), name='async_single_menu_item'),
+    path('booking/tables/', async_views.AsyncBookingListView.as_view(), name='async_tables_list'),
+    path('booking/tables/<int:pk>/', async_views.AsyncBookingDetailView.as_view(), name='async_tables_detail'),
+]
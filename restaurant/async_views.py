@@ -0,0 +1,193 @@
+"""
+ASGI-native variants of the menu and booking API views.
+
+These are plain Django async views rather than DRF views, because DRF
+dispatches synchronously and would push every request through a
+sync_to_async thread hop. They reuse the DRF serializers for validation and
+output, so payloads match the sync endpoints, and talk to the database with
+Django's async ORM methods.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import CSRFCheck
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+
+from .authentication import get_token_user, set_token_user
+from .models import Booking, Menu
+from .parsers import loads
+from .renderers import dumps
+from .serializers import BookingFilterSerializer, BookingSerializer, MenuSerializer
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+class ParseError(Exception):
+    pass
+
+
+class CSRFFailed(Exception):
+    pass
+
+
+def save_serializer(serializer, **kwargs):
+    """
+    Save serializer, returning the validation errors raised while saving
+    (such as a full booking slot) instead of raising them.
+    """
+    try:
+        serializer.save(**kwargs)
+    except ValidationError as exc:
+        return exc.detail
+    return None
+
+
+async def aauthenticate(request):
+    """
+    Resolve the user the same way the REST_FRAMEWORK authentication classes
+    do: a `Token` Authorization header first, then the session. Returns None
+    for anonymous requests and raises CSRFFailed when a session-authenticated
+    write lacks a valid CSRF token.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) == 2 and header[0].lower() == 'token':
+        user = get_token_user(header[1])
+        if user is None:
+            try:
+                token = await Token.objects.select_related('user').aget(key=header[1])
+            except Token.DoesNotExist:
+                return None
+            user = token.user
+            if user.is_active:
+                set_token_user(header[1], user)
+        return user if user.is_active else None
+
+    user = await sync_to_async(get_user)(request)
+    if not user.is_authenticated:
+        return None
+    check = CSRFCheck(lambda request: None)
+    check.process_request(request)
+    reason = check.process_view(request, None, (), {})
+    if reason:
+        raise CSRFFailed(f'CSRF Failed: {reason}')
+    return user
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    authentication_required = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if self.authentication_required:
+                request.api_user = await aauthenticate(request)
+                if request.api_user is None:
+                    return json_response(
+                        {'detail': 'Authentication credentials were not provided.'}, status=401
+                    )
+            return await super().dispatch(request, *args, **kwargs)
+        except CSRFFailed as exc:
+            return json_response({'detail': str(exc)}, status=403)
+        except (Menu.DoesNotExist, Booking.DoesNotExist):
+            return json_response({'detail': 'Not found.'}, status=404)
+        except ParseError as exc:
+            return json_response({'detail': str(exc)}, status=400)
+
+    def get_data(self):
+        try:
+            return loads(self.request.body or b'{}')
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class AsyncMenuItemsView(AsyncAPIView):
+
+    async def get(self, request):
+        items = [MenuSerializer(item).data async for item in Menu.objects.order_by('id')]
+        return json_response(items)
+
+    async def post(self, request):
+        serializer = MenuSerializer(data=self.get_data())
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        item = await Menu.objects.acreate(**serializer.validated_data)
+        return json_response(MenuSerializer(item).data, status=201)
+
+
+class AsyncSingleMenuItemView(AsyncAPIView):
+
+    async def get(self, request, pk):
+        item = await Menu.objects.aget(pk=pk)
+        return json_response(MenuSerializer(item).data)
+
+    async def put(self, request, pk, partial=False):
+        item = await Menu.objects.aget(pk=pk)
+        serializer = MenuSerializer(item, data=self.get_data(), partial=partial)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        for attr, value in serializer.validated_data.items():
+            setattr(item, attr, value)
+        await item.asave()
+        return json_response(MenuSerializer(item).data)
+
+    async def patch(self, request, pk):
+        return await self.put(request, pk, partial=True)
+
+    async def delete(self, request, pk):
+        item = await Menu.objects.aget(pk=pk)
+        await item.adelete()
+        return HttpResponse(status=204)
+
+
+class AsyncBookingListView(AsyncAPIView):
+    authentication_required = True
+
+    async def get(self, request):
+        filters = BookingFilterSerializer(data=request.GET)
+        if not filters.is_valid():
+            return json_response(filters.errors, status=400)
+        bookings = Booking.objects.for_user(request.api_user, **filters.validated_data)
+        return json_response([BookingSerializer(booking).data async for booking in bookings])
+
+    async def post(self, request):
+        serializer = BookingSerializer(data=self.get_data())
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        # The capacity check runs in a transaction, which the async ORM
+        # cannot open, so this one step hops to a thread.
+        errors = await sync_to_async(save_serializer)(serializer, user=request.api_user)
+        if errors:
+            return json_response(errors, status=400)
+        return json_response(serializer.data, status=201)
+
+
+class AsyncBookingDetailView(AsyncAPIView):
+    authentication_required = True
+
+    async def get(self, request, pk):
+        booking = await Booking.objects.filter(user=request.api_user).aget(pk=pk)
+        return json_response(BookingSerializer(booking).data)
+
+    async def put(self, request, pk, partial=False):
+        booking = await Booking.objects.filter(user=request.api_user).aget(pk=pk)
+        serializer = BookingSerializer(booking, data=self.get_data(), partial=partial)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+        errors = await sync_to_async(save_serializer)(serializer)
+        if errors:
+            return json_response(errors, status=400)
+        return json_response(serializer.data)
+
+    async def patch(self, request, pk):
+        return await self.put(request, pk, partial=True)
+
+    async def delete(self, request, pk):
+        booking = await Booking.objects.filter(user=request.api_user).aget(pk=pk)
+        await booking.adelete()
+        return HttpResponse(status=204)
@@ -0,0 +1,157 @@
+"""
+Token authentication with the token -> user lookup cached in process.
+
+Resolved tokens are kept in a bounded LRU with a short TTL, optionally
+backed by a shared cache so a fresh worker does not have to go to the
+database either. Only the user fields in USER_FIELDS are cached, and every
+request gets its own User instance built from them. Deleting a token
+(djoser logout, rotation) or saving its user evicts the entry from this
+process's LRU and from the shared cache; other processes drop their local
+copy when its TTL runs out.
+"""
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class LRUCache:
+    """
+    A thread-safe LRU mapping whose entries also expire after ttl seconds.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [key for key, (value, _) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+token_users = LRUCache(settings.TOKEN_AUTH_CACHE_SIZE, settings.TOKEN_AUTH_CACHE_TTL)
+
+# The user fields requests read, cached instead of the whole instance, so
+# the password hash stays out of the cache. The others are deferred: loaded
+# on first access, and left alone by save().
+USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_entry(user):
+    return (user._state.db, {field: getattr(user, field) for field in USER_FIELDS})
+
+
+def entry_user(entry):
+    db, values = entry
+    model = get_user_model()
+    # from_db() takes the values in the model's field order.
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(db, names, [values[name] for name in names])
+
+
+def shared_cache():
+    alias = settings.TOKEN_AUTH_SHARED_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def shared_key(key):
+    # Never use the raw token as a cache key on a shared server.
+    return 'authtoken:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_token_user(key):
+    """
+    A new instance of the user for token key from the local LRU or the
+    shared cache, or None when it has to be looked up in the database.
+    """
+    entry = token_users.get(key)
+    if entry is None:
+        cache = shared_cache()
+        if cache is not None:
+            entry = cache.get(shared_key(key))
+            if entry is not None:
+                token_users.set(key, entry)
+    return None if entry is None else entry_user(entry)
+
+
+def set_token_user(key, user):
+    entry = user_entry(user)
+    token_users.set(key, entry)
+    cache = shared_cache()
+    if cache is not None:
+        cache.set(shared_key(key), entry, settings.TOKEN_AUTH_SHARED_CACHE_TTL)
+
+
+def invalidate_token(key):
+    token_users.delete(key)
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(shared_key(key))
+
+
+def invalidate_user_tokens(user):
+    token_users.delete_where(lambda entry: entry[1]['id'] == user.pk)
+    cache = shared_cache()
+    if cache is not None:
+        keys = Token.objects.filter(user=user).values_list('key', flat=True)
+        cache.delete_many([shared_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for DRF's TokenAuthentication that skips the
+    authtoken_token/auth_user query for recently seen tokens.
+    """
+
+    def authenticate_credentials(self, key):
+        user = get_token_user(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            set_token_user(key, user)
+            return user, token
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # An unsaved Token stands in for the row so request.auth.key and
+        # request.auth.user keep working without a query.
+        return user, Token(key=key, user=user)
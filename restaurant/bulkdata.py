@@ -0,0 +1,292 @@
+"""
+Streaming import and export of menu items and bookings as CSV or JSON Lines.
+
+Rows flow through generators end to end: exports read the table in keyset
+chunks (restaurant.streaming.iterate_in_chunks) and imports parse one line
+at a time and insert with bulk_create one batch per transaction, so memory
+use depends on the batch size and not on the size of the file.
+
+Imports record the number of committed rows in a checkpoint file next to
+the input after every batch and can resume from it; exports resume by
+reading the id of the last complete record in the output file. Files ending
+in .gz are read and written through gzip.
+"""
+import csv
+from decimal import Decimal
+import datetime
+import gzip
+from itertools import islice
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .cache import invalidate_menu_list
+from .models import Booking, BookingDailyStats, Menu
+from .streaming import iterate_in_chunks
+
+FORMATS = ('csv', 'jsonl')
+
+
+class BulkDataError(Exception):
+    pass
+
+
+class Dataset:
+    """
+    A model and the columns it is imported and exported with. Foreign keys
+    are written as their raw *_id value. after_import(batch, replayed) runs
+    in the transaction of each imported batch; replayed is true for a batch
+    that may already have been partly committed before a resume.
+    """
+
+    def __init__(self, label, model, fields, after_import):
+        self.label = label
+        self.model = model
+        self.fields = fields
+        self.after_import = after_import
+
+    def model_field(self, name):
+        return self.model._meta.get_field(name[:-3] if name.endswith('_id') else name)
+
+    def required_fields(self):
+        return [
+            name for name in self.fields
+            if name != 'id' and not self.model_field(name).null and not self.model_field(name).has_default()
+        ]
+
+
+def menu_imported(menu_items, replayed):
+    invalidate_menu_list()
+
+
+def bookings_imported(bookings, replayed):
+    # bulk_create skips the signals that keep the daily stats current.
+    if replayed:
+        # Part of the batch may have been committed and counted before.
+        for date in sorted({booking.booking_date for booking in bookings}):
+            BookingDailyStats.objects.rebuild(date, date)
+    else:
+        BookingDailyStats.objects.add_bookings(bookings)
+
+
+DATASETS = {
+    'menu': Dataset('menu items', Menu, ['id', 'title', 'price', 'inventory'], menu_imported),
+    'bookings': Dataset(
+        'bookings', Booking, ['id', 'user_id', 'name', 'number_of_guest', 'booking_date'], bookings_imported,
+    ),
+}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1].lstrip('.').lower()
+    if extension == 'ndjson':
+        return 'jsonl'
+    if extension not in FORMATS:
+        raise BulkDataError(f'Cannot tell the format of {path}; pass --format.')
+    return extension
+
+
+def open_file(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def to_text(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+# Export
+
+def write_records(f, fmt, fields, rows, header=True):
+    """
+    Write rows (dicts) to f, yielding after each one so the caller can
+    report progress.
+    """
+    if fmt == 'csv':
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(fields)
+        for row in rows:
+            writer.writerow(['' if row[name] is None else to_text(row[name]) for name in fields])
+            yield row
+    else:
+        for row in rows:
+            f.write(json.dumps({name: to_text(row[name]) for name in fields}, ensure_ascii=False) + '\n')
+            yield row
+
+
+def last_exported_id(path, fmt):
+    """
+    The id of the last complete record in a partially written export,
+    truncating any half-written line after it. None when only the header
+    (or nothing) was written.
+    """
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        # Find the last two newlines by reading backwards in blocks.
+        position, tail = end, b''
+        while position > 0 and tail.count(b'\n') < 2:
+            step = min(8192, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+        complete = tail[:tail.rfind(b'\n') + 1]
+        if len(complete) < len(tail):
+            f.truncate(position + len(complete))
+    lines = complete.decode('utf-8').splitlines()
+    if not lines:
+        return None
+    last = lines[-1]
+    try:
+        if fmt == 'jsonl':
+            return int(json.loads(last)['id'])
+        value = next(csv.reader([last]))[0]
+        return None if value == 'id' else int(value)
+    except (ValueError, KeyError, IndexError):
+        raise BulkDataError(f'Cannot resume {path}: its last line is not a record with an id.')
+
+
+def export(dataset, f, fmt, batch_size, after_id=None, header=True, progress=None):
+    """
+    Write every row of dataset with an id above after_id to the open file
+    f and return the number written.
+    """
+    queryset = dataset.model.objects.values(*dataset.fields)
+    if after_id is not None:
+        queryset = queryset.filter(id__gt=after_id)
+    written = 0
+    for _ in write_records(f, fmt, dataset.fields, iterate_in_chunks(queryset, batch_size), header):
+        written += 1
+        if progress and written % batch_size == 0:
+            progress(written)
+    if progress and written % batch_size:
+        progress(written)
+    return written
+
+
+# Import
+
+def read_records(f, fmt):
+    """
+    Yield (line number, dict of raw values) for each record in f.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_num, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError as exc:
+                    raise BulkDataError(f'Line {line_num}: {exc}')
+                if not isinstance(row, dict):
+                    raise BulkDataError(f'Line {line_num}: expected a JSON object.')
+                yield line_num, row
+
+
+def build_instances(dataset, records):
+    """
+    Turn raw records into unsaved model instances, converting and
+    validating each value with its model field.
+    """
+    required = dataset.required_fields()
+    for line_num, row in records:
+        unknown = set(row) - set(dataset.fields)
+        if unknown:
+            raise BulkDataError(f'Line {line_num}: unknown columns {", ".join(sorted(unknown))}.')
+        values = {}
+        for name, raw in row.items():
+            field = dataset.model_field(name)
+            if raw == '' and (field.null or name == 'id'):
+                raw = None
+            try:
+                value = None if raw is None else field.to_python(raw)
+                if value is not None:
+                    field.run_validators(value)
+            except ValidationError as exc:
+                raise BulkDataError(f'Line {line_num}: {name}: {" ".join(exc.messages)}')
+            values[name] = value
+        missing = [name for name in required if values.get(name) is None]
+        if missing:
+            raise BulkDataError(f'Line {line_num}: missing {", ".join(missing)}.')
+        yield dataset.model(**values)
+
+
+def checkpoint_path(path):
+    return path + '.checkpoint'
+
+
+def read_checkpoint(path):
+    """
+    The number of rows of path already imported, or 0.
+    """
+    try:
+        with open(checkpoint_path(path)) as f:
+            return json.load(f)['rows']
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, rows):
+    temporary = checkpoint_path(path) + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump({'rows': rows}, f)
+    os.replace(temporary, checkpoint_path(path))
+
+
+def clear_checkpoint(path):
+    try:
+        os.remove(checkpoint_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def import_file(dataset, path, fmt, batch_size, resume=False, progress=None):
+    """
+    Insert every record of the file at path, batch_size rows per
+    transaction, and return (skipped, imported) row counts.
+
+    bulk_create skips save() and signals, so imported bookings are not
+    checked against slot capacity and send no confirmations; the daily
+    booking stats are updated per batch instead.
+
+    With resume, rows covered by the checkpoint are skipped. A crash between
+    a batch committing and its checkpoint being written leaves that batch in
+    the database; rows with an id are then skipped rather than rejected as
+    duplicates when the batch is read again.
+    """
+    skipped = read_checkpoint(path) if resume else 0
+    imported = 0
+    with open_file(path, 'r') as f:
+        records = islice(read_records(f, fmt), skipped, None)
+        for batch in batched(build_instances(dataset, records), batch_size):
+            # Only the first batch after a resume can already be in the table.
+            replayed = resume and imported == 0 and all(obj.pk is not None for obj in batch)
+            with transaction.atomic():
+                dataset.model.objects.bulk_create(batch, ignore_conflicts=replayed)
+                dataset.after_import(batch, replayed)
+            imported += len(batch)
+            write_checkpoint(path, skipped + imported)
+            if progress:
+                progress(skipped + imported)
+    clear_checkpoint(path)
+    return skipped, imported
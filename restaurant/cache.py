@@ -0,0 +1,179 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from LittleLemon.db.routers import use_primary
+
+LIST_VERSION_KEY = 'menu:list:version'
+TITLES_VERSION_KEY = 'menu:titles:version'
+ITEM_VERSION_KEY = 'menu:item:{pk}:version'
+WRITTEN_AT_KEY = 'menu:written_at'
+
+# Sent once the transaction of a menu write has committed, with the pks of
+# the written items (None when the whole list was rewritten).
+menu_committed = Signal()
+
+
+def get_cache():
+    return caches[settings.MENU_CACHE_ALIAS]
+
+
+def _get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock rather than 1 so a version key that was evicted
+        # never comes back with a value an older entry was stored under.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+class _PendingWrite:
+    """
+    The menu writes of one transaction, announced together once it commits.
+    Every write registers commit() on its own, so that the callbacks of
+    writes in a savepoint go with it when it is rolled back; the first
+    callback that runs does the work.
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self.pks = set()
+        self.done = False
+
+    def add(self, keys, pks):
+        self.keys.update(keys)
+        if pks is None:
+            self.pks = None
+        elif self.pks is not None:
+            self.pks.update(pks)
+
+    def commit(self):
+        if self.done:
+            return
+        self.done = True
+        for key in self.keys:
+            _bump_version(key)
+        get_cache().set(WRITTEN_AT_KEY, time.time(), None)
+        menu_committed.send(sender=None, pks=None if self.pks is None else sorted(self.pks))
+
+
+def _pending_write(connection):
+    """
+    The _PendingWrite of the transaction in progress on connection. One
+    left behind by a rolled back transaction, with none of its callbacks
+    registered any more, is replaced.
+    """
+    pending = getattr(connection, 'menu_pending_write', None)
+    if pending is None or pending.done or not any(
+        func == pending.commit for _, func, _ in connection.run_on_commit
+    ):
+        pending = connection.menu_pending_write = _PendingWrite()
+    return pending
+
+
+def _bump_versions(keys, pks=None):
+    # Bump now so this process stops serving the old entries right away, and
+    # again on commit so an entry built from pre-commit rows in between is
+    # discarded as well. A transaction that writes many rows (a bulk delete
+    # sends post_delete per row) does the on-commit half, and sends
+    # menu_committed, once.
+    for key in keys:
+        _bump_version(key)
+    get_cache().set(WRITTEN_AT_KEY, time.time(), None)
+    connection = transaction.get_connection()
+    pending = _pending_write(connection) if connection.in_atomic_block else _PendingWrite()
+    pending.add(keys, pks)
+    connection.on_commit(pending.commit)
+
+
+def invalidate_menu_list():
+    _bump_versions([LIST_VERSION_KEY, TITLES_VERSION_KEY])
+
+
+def invalidate_menu_items(pks, titles=True):
+    """
+    Pass titles=False for writes that neither create, delete nor retitle
+    menu items (inventory and price changes).
+    """
+    pks = list(pks)
+    keys = [LIST_VERSION_KEY] + [ITEM_VERSION_KEY.format(pk=pk) for pk in pks]
+    if titles:
+        keys.append(TITLES_VERSION_KEY)
+    _bump_versions(keys, pks)
+
+
+def list_version():
+    """
+    Changes whenever any menu item is written.
+    """
+    return _get_version(LIST_VERSION_KEY)
+
+
+def titles_version():
+    """
+    Changes whenever a menu item is created, deleted or retitled.
+    """
+    return _get_version(TITLES_VERSION_KEY)
+
+
+def list_key(request):
+    # Paginated payloads embed absolute next/previous links, so the host is
+    # part of the key along with the query string.
+    digest = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'menu:list:{list_version()}:{digest}'
+
+
+def item_key(pk):
+    return f'menu:item:{pk}:{_get_version(ITEM_VERSION_KEY.format(pk=pk))}'
+
+
+def cached_response(request, key, build):
+    """
+    Serve the payload stored under key, calling build() to produce and store
+    it on a miss. Answers with 304 when the client's validators still match.
+    """
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is None:
+        written_at = cache.get(WRITTEN_AT_KEY)
+        if written_at is not None and time.time() - written_at < settings.REPLICA_LAG_SECONDS:
+            # A replica may not have the write that caused this miss yet;
+            # don't store its old rows under the new version.
+            with use_primary():
+                data = build()
+        else:
+            data = build()
+        entry = {'data': data, 'last_modified': int(time.time())}
+        cache.set(key, entry, settings.MENU_CACHE_TIMEOUT)
+
+    renderer = getattr(request, 'accepted_renderer', None)
+    etag = '"%s"' % hashlib.md5(
+        f'{key}:{getattr(renderer, "format", "")}'.encode()
+    ).hexdigest()
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=entry['last_modified'],
+    )
+    if not_modified is not None:
+        return not_modified
+
+    response = Response(entry['data'])
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    return response
@@ -0,0 +1,49 @@
+"""
+Read-only fast paths for the menu and booking GET endpoints.
+
+Rows are fetched with .values() and turned into response dicts directly,
+skipping DRF's per-field introspection and to_representation calls. The
+output must stay identical to MenuSerializer and BookingSerializer; writes
+keep validating through those serializers.
+"""
+from decimal import Context, Decimal
+
+
+class FastSerializer:
+    fields = ()
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.fields)
+
+    @classmethod
+    def to_representation(cls, row):
+        return row
+
+    @classmethod
+    def many(cls, rows):
+        to_representation = cls.to_representation
+        return [to_representation(row) for row in rows]
+
+
+class FastMenuSerializer(FastSerializer):
+    fields = ('id', 'title', 'price', 'inventory')
+
+    # Matches DRF's DecimalField: quantize to the field's decimal places
+    # with the model's max_digits as precision, then format as a string.
+    price_places = Decimal('0.01')
+    price_context = Context(prec=10)
+
+    @classmethod
+    def to_representation(cls, row):
+        row['price'] = '{:f}'.format(row['price'].quantize(cls.price_places, context=cls.price_context))
+        return row
+
+
+class FastBookingSerializer(FastSerializer):
+    fields = ('id', 'name', 'number_of_guest', 'booking_date', 'user')
+
+    @classmethod
+    def to_representation(cls, row):
+        row['booking_date'] = row['booking_date'].isoformat()
+        return row
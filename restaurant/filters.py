@@ -0,0 +1,18 @@
+from django_filters import FilterSet, NumberFilter
+
+from .models import Menu
+
+# Fields ?ordering= accepts on the menu list and search endpoints; each has
+# its own index.
+MENU_ORDERING_FIELDS = ['id', 'title', 'price', 'inventory']
+
+
+class MenuFilter(FilterSet):
+    min_price = NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = NumberFilter(field_name='price', lookup_expr='lte')
+    min_inventory = NumberFilter(field_name='inventory', lookup_expr='gte')
+    max_inventory = NumberFilter(field_name='inventory', lookup_expr='lte')
+
+    class Meta:
+        model = Menu
+        fields = []
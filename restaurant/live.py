@@ -0,0 +1,393 @@
+"""
+Live menu and booking updates, pushed to clients as server-sent events.
+
+Clients open GET /restaurant/live/?channels=menu,availability on the ASGI
+server and receive
+
+    event: menu
+    data: {"changed": [...], "deleted": [...]}
+
+once a menu write has committed, with the changed rows as the menu list
+returns them, and `event: availability` with the seats of every date a
+committed booking write touched, as restaurant/booking/tables/availability/
+returns them. A menu event of {"resync": true} stands for a write too large
+to send row by row; read it from the changes feed
+(restaurant/menu/items/changes/), which is also how a client catches up
+after connecting. The availability channel needs an authenticated user,
+like the endpoint it mirrors.
+
+LiveUpdatesApplication serves the stream as a plain ASGI application in
+front of Django (see LittleLemon.asgi). Each connection is a coroutine
+waiting for its next event rather than a thread, so one process holds
+thousands of idle clients. Events reach it through the broker named by
+LIVE_BROKER: LocalBroker only reaches the subscribers of the process that
+made the write, so with several server processes (or writes served by WSGI
+workers) configure a broker they all share, such as RedisBroker.
+"""
+import asyncio
+from collections import Counter, deque
+from datetime import date
+from importlib import import_module
+import io
+import logging
+import threading
+import time
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.module_loading import import_string
+
+from LittleLemon.db.routers import use_primary
+
+from .async_views import aauthenticate
+from .fast_serializers import FastMenuSerializer
+from .metrics import registry
+from .models import Booking, Menu
+from .renderers import dumps
+from .serializers import AvailabilitySerializer
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Channel -> whether subscribing needs an authenticated user.
+CHANNELS = {'menu': False, 'availability': True}
+
+KEEPALIVE = b': keepalive\n\n'
+
+
+class Subscription:
+    """
+    One client's channels and the frames waiting to be sent to it. Only
+    touched from the event loop serving the client.
+    """
+
+    def __init__(self, channels, loop):
+        self.channels = channels
+        self.loop = loop
+        self.frames = deque()
+        self.max_pending = settings.LIVE_MAX_PENDING
+        self.overflowed = False
+        self.closed = False
+        self._waiter = None
+
+    def deliver(self, frame):
+        if len(self.frames) >= self.max_pending:
+            # Too slow to keep up: cut it off rather than buffer without bound.
+            self.overflowed = True
+            self.close()
+            return
+        self.frames.append(frame)
+        self._wake()
+
+    def close(self):
+        self.closed = True
+        self.frames.clear()
+        self._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def next_frames(self, timeout):
+        """
+        Every frame waiting, or [] when none arrived within timeout.
+        """
+        if not self.frames and not self.closed:
+            # A bare future and timer rather than asyncio.wait_for(), which
+            # would start a task for every wait of every stream.
+            self._waiter = self.loop.create_future()
+            timer = self.loop.call_later(timeout, self._wake)
+            try:
+                await self._waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+        frames = list(self.frames)
+        self.frames.clear()
+        return frames
+
+
+class Hub:
+    """
+    The subscriptions of this process, by event loop and channel.
+    dispatch() may be called from any thread: each loop gets one callback
+    per event, which fans the frame out to that loop's subscriptions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loops = {}
+        self._channels = Counter()
+        self.events = 0
+        self.dropped = 0
+
+    @property
+    def connections(self):
+        with self._lock:
+            return sum(len(subscriptions[None]) for subscriptions in self._loops.values())
+
+    def subscribe(self, channels):
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(channels, loop)
+        with self._lock:
+            by_channel = self._loops.setdefault(loop, {None: set()})
+            for channel in (None, *channels):
+                by_channel.setdefault(channel, set()).add(subscription)
+            self._channels.update(channels)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            by_channel = self._loops[subscription.loop]
+            for channel in (None, *subscription.channels):
+                by_channel[channel].discard(subscription)
+            if not by_channel[None]:
+                del self._loops[subscription.loop]
+            self._channels.subtract(subscription.channels)
+            if subscription.overflowed:
+                self.dropped += 1
+
+    def has_subscribers(self, channel):
+        return self._channels[channel] > 0
+
+    def dispatch(self, channel, data):
+        frame = b'event: ' + channel.encode() + b'\ndata: ' + data + b'\n\n'
+        with self._lock:
+            self.events += 1
+            targets = [
+                (loop, tuple(by_channel[channel]))
+                for loop, by_channel in self._loops.items() if by_channel.get(channel)
+            ]
+        for loop, subscriptions in targets:
+            try:
+                loop.call_soon_threadsafe(self._deliver, subscriptions, frame)
+            except RuntimeError:
+                # The loop has been closed; its subscriptions go with it.
+                pass
+
+    @staticmethod
+    def _deliver(subscriptions, frame):
+        for subscription in subscriptions:
+            if not subscription.closed:
+                subscription.deliver(frame)
+
+
+hub = Hub()
+
+
+class LocalBroker:
+    """
+    Hands events straight to the subscribers of this process.
+    """
+
+    def publish(self, channel, data):
+        hub.dispatch(channel, data)
+
+    def wants(self, channel):
+        return hub.has_subscribers(channel)
+
+    def start(self):
+        pass
+
+
+class RedisBroker:
+    """
+    Publishes events on Redis pub/sub (LIVE_BROKER_URL), and hands the
+    events of every process to the subscribers of this one from a listener
+    thread started with the first subscription.
+    """
+    prefix = 'littlelemon:live:'
+
+    def __init__(self):
+        if redis is None:
+            raise ImproperlyConfigured('RedisBroker needs the redis package.')
+        self.client = redis.Redis.from_url(settings.LIVE_BROKER_URL)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, channel, data):
+        self.client.publish(self.prefix + channel, data)
+
+    def wants(self, channel):
+        # The subscribers may be in any process.
+        return True
+
+    def start(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self.listen, name='live-broker', daemon=True)
+                self._listener.start()
+
+    def listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for message in pubsub.listen():
+                    hub.dispatch(message['channel'].decode()[len(self.prefix):], message['data'])
+            except redis.ConnectionError:
+                logger.warning('Lost the live updates broker connection; reconnecting.', exc_info=True)
+                time.sleep(1)
+
+
+_brokers = {}
+
+
+def get_broker():
+    path = settings.LIVE_BROKER
+    if path not in _brokers:
+        _brokers[path] = import_string(path)()
+    return _brokers[path]
+
+
+def publish(channel, build):
+    """
+    Publish the event build() returns on channel, unless nobody can receive
+    it. Runs once a write has committed, so a failure is logged rather than
+    raised: the write stands either way.
+    """
+    broker = get_broker()
+    try:
+        if broker.wants(channel):
+            broker.publish(channel, dumps(build()))
+    except Exception:
+        logger.exception('Could not publish a live %s event.', channel)
+
+
+def publish_menu_changes(pks):
+    """
+    Publish the menu rows of pks as committed, or a resync event when pks
+    is None (the whole list changed) or too long for one event.
+    """
+    def build():
+        if pks is None or len(pks) > settings.LIVE_MENU_MAX_ITEMS:
+            return {'resync': True}
+        with use_primary():
+            queryset = Menu.objects.filter(pk__in=pks).order_by('id')
+            rows = FastMenuSerializer.many(FastMenuSerializer.values(queryset))
+        found = {row['id'] for row in rows}
+        return {'changed': rows, 'deleted': sorted(set(pks) - found)}
+
+    publish('menu', build)
+
+
+def publish_availability(dates):
+    """
+    Publish the availability of dates (ISO strings) as committed.
+    """
+    def build():
+        days = []
+        with use_primary():
+            for day in sorted({date.fromisoformat(value) for value in dates}):
+                days += Booking.objects.availability(day, day)
+        return {'days': AvailabilitySerializer(days, many=True).data}
+
+    publish('availability', build)
+
+
+class LiveUpdatesApplication:
+    """
+    Serves LIVE_PATH as an event stream and hands every other connection to
+    application (the Django ASGI handler).
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == settings.LIVE_PATH:
+            await self.stream(scope, receive, send)
+        else:
+            await self.application(scope, receive, send)
+
+    async def stream(self, scope, receive, send):
+        if scope['method'] != 'GET':
+            detail = f'Method "{scope["method"]}" not allowed.'
+            await self.respond(send, 405, {'detail': detail}, [(b'allow', b'GET')])
+            return
+        query = parse_qs(scope['query_string'].decode('latin-1'))
+        channels = frozenset(
+            name for value in query.get('channels', ['menu']) for name in value.split(',') if name
+        )
+        unknown = sorted(channels - CHANNELS.keys())
+        if unknown or not channels:
+            await self.respond(send, 400, {'channels': [f'Unknown channel: {", ".join(unknown)}.']})
+            return
+        if any(CHANNELS[channel] for channel in channels) and await self.authenticate(scope) is None:
+            await self.respond(send, 401, {'detail': 'Authentication credentials were not provided.'})
+            return
+
+        get_broker().start()
+        subscription = hub.subscribe(channels)
+        watcher = asyncio.ensure_future(self.wait_for_disconnect(receive, subscription))
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    # Keep proxies such as nginx from buffering the stream.
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            # How long an EventSource waits before reconnecting.
+            retry = b'retry: %d\n\n' % settings.LIVE_RETRY_MS
+            await send({'type': 'http.response.body', 'body': retry, 'more_body': True})
+            while not subscription.closed:
+                frames = await subscription.next_frames(settings.LIVE_KEEPALIVE_SECONDS)
+                if subscription.closed:
+                    break
+                body = b''.join(frames) or KEEPALIVE
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            if subscription.overflowed:
+                await send({'type': 'http.response.body'})
+        finally:
+            watcher.cancel()
+            hub.unsubscribe(subscription)
+
+    @staticmethod
+    async def wait_for_disconnect(receive, subscription):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        subscription.close()
+
+    @staticmethod
+    async def authenticate(scope):
+        request = ASGIRequest(scope, io.BytesIO())
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        return await aauthenticate(request)
+
+    @staticmethod
+    async def respond(send, status, data, headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), *headers],
+        })
+        await send({'type': 'http.response.body', 'body': dumps(data)})
+
+
+def render_live_metrics():
+    """
+    Prometheus lines for the live update streams of this process.
+    """
+    lines = []
+    for metric, kind, help_text, value in (
+        ('littlelemon_live_connections', 'gauge', 'Open live update streams.', hub.connections),
+        ('littlelemon_live_events_total', 'counter', 'Live update events dispatched.', hub.events),
+        ('littlelemon_live_dropped_total', 'counter',
+         'Live update streams cut off for falling too far behind.', hub.dropped),
+    ):
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}', f'{metric} {value}']
+    return lines
+
+
+registry.register_collector(render_live_metrics)
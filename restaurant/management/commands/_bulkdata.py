@@ -0,0 +1,126 @@
+"""
+Shared implementation of the import_* and export_* commands. Django skips
+command modules whose name starts with an underscore.
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from restaurant import bulkdata
+
+
+class BulkDataCommand(BaseCommand):
+    dataset = None
+
+    @property
+    def label(self):
+        return bulkdata.DATASETS[self.dataset].label
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=bulkdata.FORMATS,
+                            help='file format; by default taken from the file extension')
+        parser.add_argument('--batch-size', type=int, default=5_000,
+                            help='rows per query and per transaction')
+
+    def get_format(self, path, options):
+        try:
+            return options['format'] or bulkdata.detect_format(path)
+        except bulkdata.BulkDataError as exc:
+            raise CommandError(exc)
+
+    def progress(self, label):
+        def progress(rows):
+            if self.verbosity > 1:
+                self.stderr.write(f'{label}: {rows} rows')
+        return progress
+
+
+class ImportCommand(BulkDataCommand):
+
+    @property
+    def help(self):
+        return (
+            f'Stream a CSV or JSON Lines file of {self.label} into the database in batches. '
+            'Stops at the first invalid row; rerun with --resume to continue after the last committed batch.'
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        super().add_arguments(parser)
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--resume', action='store_true',
+                           help='skip the rows committed by an earlier, interrupted run')
+        group.add_argument('--restart', action='store_true',
+                           help='discard the checkpoint of an earlier run and import from the first row')
+
+    def handle(self, *args, path, **options):
+        self.verbosity = options['verbosity']
+        fmt = self.get_format(path, options)
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+        if options['restart']:
+            bulkdata.clear_checkpoint(path)
+        elif not options['resume'] and os.path.exists(bulkdata.checkpoint_path(path)):
+            raise CommandError(
+                f'An earlier import of {path} was interrupted; pass --resume to continue it '
+                'or --restart to import the whole file again.'
+            )
+        try:
+            skipped, imported = bulkdata.import_file(
+                bulkdata.DATASETS[self.dataset], path, fmt, options['batch_size'],
+                resume=options['resume'], progress=self.progress(path),
+            )
+        except (bulkdata.BulkDataError, DatabaseError) as exc:
+            raise CommandError(
+                f'{exc}\nThe batches before it were committed; fix the file and rerun with --resume.'
+            )
+        message = f'Imported {imported} {self.label}'
+        if skipped:
+            message += f' (skipped {skipped} already imported)'
+        self.stdout.write(self.style.SUCCESS(message))
+
+
+class ExportCommand(BulkDataCommand):
+
+    @property
+    def help(self):
+        return (
+            f'Stream all {self.label} to a CSV or JSON Lines file in id order. '
+            'Rerun with --resume to append the rows after the last complete record.'
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="output file, or - for standard output")
+        super().add_arguments(parser)
+        parser.add_argument('--resume', action='store_true',
+                            help='append to an interrupted export instead of overwriting it')
+
+    def handle(self, *args, path, **options):
+        self.verbosity = options['verbosity']
+        to_stdout = path == '-'
+        if to_stdout and not options['format']:
+            raise CommandError('Pass --format when writing to standard output.')
+        fmt = self.get_format(path, options)
+        resume = options['resume'] and not to_stdout and os.path.exists(path) and os.path.getsize(path) > 0
+        if resume and path.endswith('.gz'):
+            raise CommandError('Compressed exports cannot be resumed.')
+
+        dataset = bulkdata.DATASETS[self.dataset]
+        try:
+            after_id = bulkdata.last_exported_id(path, fmt) if resume else None
+            if to_stdout:
+                # Records carry their own line endings.
+                self.stdout.ending = ''
+                written = bulkdata.export(dataset, self.stdout, fmt, options['batch_size'])
+            else:
+                with bulkdata.open_file(path, 'a' if resume else 'w') as f:
+                    written = bulkdata.export(
+                        dataset, f, fmt, options['batch_size'],
+                        after_id=after_id, header=not resume, progress=self.progress(path),
+                    )
+        except bulkdata.BulkDataError as exc:
+            raise CommandError(exc)
+        # Keep standard output clean for the data itself.
+        out = self.stderr if to_stdout else self.stdout
+        out.write(self.style.SUCCESS(f'Exported {written} {self.label}'))
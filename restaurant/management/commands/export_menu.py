@@ -0,0 +1,5 @@
+from ._bulkdata import ExportCommand
+
+
+class Command(ExportCommand):
+    dataset = 'menu'
@@ -0,0 +1,5 @@
+from ._bulkdata import ImportCommand
+
+
+class Command(ImportCommand):
+    dataset = 'menu'
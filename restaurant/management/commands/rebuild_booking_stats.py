@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils.dateparse import parse_date
+
+from restaurant.models import Booking, BookingDailyStats
+
+
+def date_argument(value):
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(value)
+    return date
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the booking daily stats from the bookings table, one window of dates per '
+        'transaction. Run it after bulk imports or other writes that bypass model signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date_argument, help='first date to rebuild (default: earliest booking)')
+        parser.add_argument('--end', type=date_argument, help='last date to rebuild (default: latest booking)')
+        parser.add_argument('--days', type=int, default=31, help='dates per batch')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1.')
+        start, end = options['start'], options['end']
+        if start is None or end is None:
+            bounds = Booking.objects.aggregate(first=Min('booking_date'), last=Max('booking_date'))
+            if start is None and end is None:
+                # Rows outside the booked range can only be stale.
+                stale = BookingDailyStats.objects.all()
+                if bounds['first'] is not None:
+                    stale = stale.exclude(date__range=(bounds['first'], bounds['last']))
+                stale.delete()
+            start = start or bounds['first']
+            end = end or bounds['last']
+        if start is None or end is None:
+            self.stdout.write(self.style.SUCCESS('No bookings to summarise'))
+            return
+        if end < start:
+            raise CommandError('--end must not be before --start.')
+
+        dates = 0
+        window_start = start
+        while window_start <= end:
+            window_end = min(window_start + timedelta(days=options['days'] - 1), end)
+            dates += BookingDailyStats.objects.rebuild(window_start, window_end)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{window_start} to {window_end}: {dates} booked dates so far')
+            window_start = window_end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt booking stats for {dates} booked dates from {start} to {end}'))
@@ -0,0 +1,199 @@
+"""
+Per-view request metrics: query count, database time, serialization time
+and total time.
+
+RequestMetrics collects the numbers for one request (filled in by
+restaurant.middleware.InstrumentationMiddleware and InstrumentedViewMixin)
+and the process-wide registry aggregates them by view for the Prometheus
+text endpoint. Each worker process keeps its own registry.
+"""
+from collections import defaultdict
+import threading
+import time
+
+from django.template.response import SimpleTemplateResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        """
+        A connection.execute_wrapper() hook counting and timing every query.
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialization_seconds * 1000:.2f}, '
+            f'total;dur={self.total_seconds * 1000:.2f}'
+        )
+
+
+class _ViewStats:
+
+    def __init__(self):
+        self.requests = defaultdict(int)
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.queries = 0
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(_ViewStats)
+        self._collectors = []
+
+    def register_collector(self, collector):
+        """
+        Add a callable returning extra Prometheus lines (HELP/TYPE included)
+        to every render().
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def observe(self, view, method, status, metrics):
+        with self._lock:
+            stats = self._views[view]
+            stats.requests[(method, status)] += 1
+            stats.count += 1
+            stats.total_seconds += metrics.total_seconds
+            stats.db_seconds += metrics.db_seconds
+            stats.serialization_seconds += metrics.serialization_seconds
+            stats.queries += metrics.queries
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if metrics.total_seconds <= bound:
+                    stats.buckets[i] += 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self, view):
+        with self._lock:
+            stats = self._views.get(view)
+            return None if stats is None else {
+                'count': stats.count,
+                'queries': stats.queries,
+                'db_seconds': stats.db_seconds,
+                'serialization_seconds': stats.serialization_seconds,
+                'total_seconds': stats.total_seconds,
+            }
+
+    def render(self):
+        """
+        The registry in the Prometheus text exposition format.
+        """
+        lines = [
+            '# HELP littlelemon_requests_total Requests handled, by view, method and status.',
+            '# TYPE littlelemon_requests_total counter',
+        ]
+        with self._lock:
+            views = sorted(self._views.items())
+            for view, stats in views:
+                for (method, status), count in sorted(stats.requests.items()):
+                    lines.append(
+                        f'littlelemon_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}'
+                    )
+
+            lines += [
+                '# HELP littlelemon_request_duration_seconds Total request time, by view.',
+                '# TYPE littlelemon_request_duration_seconds histogram',
+            ]
+            for view, stats in views:
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    lines.append(
+                        f'littlelemon_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}'
+                    )
+                lines.append(f'littlelemon_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {stats.count}')
+                lines.append(f'littlelemon_request_duration_seconds_sum{{view="{view}"}} {stats.total_seconds:.6f}')
+                lines.append(f'littlelemon_request_duration_seconds_count{{view="{view}"}} {stats.count}')
+
+            for name, attr, help_text in (
+                ('db_queries_total', 'queries', 'SQL queries executed, by view.'),
+                ('db_duration_seconds_total', 'db_seconds', 'Time spent in SQL queries, by view.'),
+                ('serialization_duration_seconds_total', 'serialization_seconds',
+                 'Time spent serializing and rendering responses, by view.'),
+            ):
+                lines += [
+                    f'# HELP littlelemon_{name} {help_text}',
+                    f'# TYPE littlelemon_{name} counter',
+                ]
+                for view, stats in views:
+                    value = getattr(stats, attr)
+                    value = f'{value:.6f}' if isinstance(value, float) else value
+                    lines.append(f'littlelemon_{name}{{view="{view}"}} {value}')
+        for collector in self._collectors:
+            lines += collector()
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def request_metrics(request):
+    return getattr(request, 'metrics', None)
+
+
+def timed_serialization(metrics, func):
+    """
+    Wrap func so its run time, less any database time spent inside it,
+    counts as serialization time on metrics.
+    """
+    if metrics is None:
+        return func
+
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        db_before = metrics.db_seconds
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Lazy querysets are evaluated while serializing; that part is
+            # already counted as database time.
+            elapsed = time.perf_counter() - started - (metrics.db_seconds - db_before)
+            metrics.serialization_seconds += elapsed
+    return timed
+
+
+class InstrumentedViewMixin:
+    """
+    Adds serialization and render timing to a DRF view and lets it declare
+    a query_budget: an int, or a dict of HTTP method to int, checked by
+    restaurant.testing.QueryBudgetMixin.
+    """
+    query_budget = None
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        metrics = request_metrics(self.request)
+        if metrics is not None:
+            serializer.to_representation = timed_serialization(metrics, serializer.to_representation)
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        metrics = request_metrics(request)
+        if metrics is not None and isinstance(response, SimpleTemplateResponse):
+            # Render here rather than in the handler so the JSON encoding
+            # is attributed to serialization; render() is idempotent.
+            timed_serialization(metrics, response.render)()
+        return response
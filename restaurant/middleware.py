@@ -0,0 +1,149 @@
+from contextlib import ExitStack
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.middleware.gzip import GZipMiddleware
+
+from . import admission
+from .admission import get_controller
+from .metrics import RequestMetrics, registry
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+class AdmissionControlMiddleware:
+    """
+    Run, queue or shed every request according to its route class (see
+    restaurant.admission), unless AdmissionControlApplication admitted it
+    already. Shed requests are answered with 503 and Retry-After before any
+    other middleware runs. A slot is held until the response is returned,
+    which for streamed responses is before their body is sent.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.admitted(request):
+            return self.get_response(request)
+        controller = get_controller()
+        route = controller.classify(request.method, request.path_info)
+        try:
+            admission.acquire(controller, route, admission.request_age(request.META.get('HTTP_X_REQUEST_START', '')))
+        except admission.Shed as exc:
+            return self.shed_response(exc)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            controller.release(route, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if self.admitted(request):
+            return await self.get_response(request)
+        controller = get_controller()
+        route = controller.classify(request.method, request.path_info)
+        try:
+            await admission.aacquire(
+                controller, route, admission.request_age(request.META.get('HTTP_X_REQUEST_START', '')),
+            )
+        except admission.Shed as exc:
+            return self.shed_response(exc)
+        started = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            controller.release(route, time.perf_counter() - started)
+
+    @staticmethod
+    def admitted(request):
+        return getattr(request, 'scope', {}).get(admission.SCOPE_KEY, False)
+
+    @staticmethod
+    def shed_response(exc):
+        response = HttpResponse(admission.SHED_BODY, content_type='application/json', status=503)
+        for name, value in admission.shed_headers(exc).items():
+            response[name] = value
+        # Counted in the admission metrics; under overload, logging each one
+        # as a server error would only add to the load.
+        response._has_been_logged = True
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    Record query count, database time and total time for every request,
+    aggregate them by view and report them in Server-Timing and
+    X-Query-Count response headers.
+
+    Queries are counted on the request's own thread. Async views run
+    their ORM calls in a worker thread, so for them only the total time is
+    recorded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = request.metrics = RequestMetrics()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics.record_query))
+            response = self.get_response(request)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        return self.finish(request, response, metrics, started)
+
+    def finish(self, request, response, metrics, started):
+        metrics.total_seconds = time.perf_counter() - started
+        registry.observe(view_label(request), request.method, response.status_code, metrics)
+        response['Server-Timing'] = metrics.server_timing()
+        response['X-Query-Count'] = str(metrics.queries)
+        return response
+
+
+# Event streams are left out: gzip would hold events back until its buffer fills.
+COMPRESSIBLE_TYPES = {'application/json', 'text/html', 'text/plain', 'text/csv'}
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware limited to text responses of at least
+    RESPONSE_GZIP_MIN_BYTES, for clients that accept gzip. Below that the
+    bytes saved are not worth the time spent compressing, and images and
+    already encoded responses (static files, the menu snapshot) are left
+    alone.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').partition(';')[0].strip()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+        if not response.streaming and len(response.content) < settings.RESPONSE_GZIP_MIN_BYTES:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 1000
+
+
+def backfill_booking_user(apps, schema_editor):
+    """
+    Link existing bookings to the user whose username matches the booking
+    name. Each batch is its own short UPDATE over a primary key range, so
+    the table is never locked for the whole backfill.
+
+    Bookings matching no username keep no owner, so they are listed to no
+    one by the API. Their number is reported; staff find them with the
+    "By user: Empty" filter of the booking admin and hand them to a user
+    with its "Assign selected bookings to user" action.
+    """
+    Booking = apps.get_model('restaurant', 'Booking')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    db = schema_editor.connection.alias
+    owner = User.objects.using(db).filter(username=OuterRef('name')).values('pk')[:1]
+    last_pk = 0
+    while True:
+        pks = list(
+            Booking.objects.using(db)
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not pks:
+            break
+        Booking.objects.using(db).filter(
+            pk__gte=pks[0], pk__lte=pks[-1], user__isnull=True,
+        ).update(user_id=Subquery(owner))
+        last_pk = pks[-1]
+    unmatched = Booking.objects.using(db).filter(user__isnull=True).count()
+    if unmatched:
+        print(
+            f'\n  {unmatched} bookings match no username and have no owner; '
+            'assign them in the booking admin.',
+            end='',
+        )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('restaurant', '0003_booking_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_booking_user, migrations.RunPython.noop),
+    ]
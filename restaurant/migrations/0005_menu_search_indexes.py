@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+# Django has no FULLTEXT index type; restaurant.search queries this one
+# with MATCH ... AGAINST. Other databases use an in-process index instead.
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        table = schema_editor.quote_name(apps.get_model('restaurant', 'Menu')._meta.db_table)
+        schema_editor.execute(f'CREATE FULLTEXT INDEX menu_title_fulltext ON {table} (title)')
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        table = schema_editor.quote_name(apps.get_model('restaurant', 'Menu')._meta.db_table)
+        schema_editor.execute(f'DROP INDEX menu_title_fulltext ON {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0004_backfill_booking_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['title'], name='menu_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['price'], name='menu_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['inventory'], name='menu_inventory_idx'),
+        ),
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
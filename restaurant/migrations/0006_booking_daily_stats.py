@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 18:24
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_booking_stats(apps, schema_editor):
+    """
+    Summarise the existing bookings with one GROUP BY over the booking_date
+    index; the result has one row per booked date.
+    """
+    Booking = apps.get_model('restaurant', 'Booking')
+    BookingDailyStats = apps.get_model('restaurant', 'BookingDailyStats')
+    db = schema_editor.connection.alias
+    rows = (
+        Booking.objects.using(db)
+        .order_by()
+        .values_list('booking_date')
+        .annotate(bookings=Count('id'), guests=Sum('number_of_guest'))
+    )
+    BookingDailyStats.objects.using(db).bulk_create(
+        (BookingDailyStats(date=date, bookings=bookings, guests=guests) for date, bookings, guests in rows),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0005_menu_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('bookings', models.IntegerField(default=0)),
+                ('guests', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'booking daily stats',
+            },
+        ),
+        migrations.RunPython(backfill_booking_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_booking_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MenuTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('menu_id', models.BigIntegerField()),
+                ('change_seq', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['change_seq', 'id'], name='menu_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menutombstone',
+            index=models.Index(fields=['change_seq', 'menu_id'], name='menu_tombstone_seq_idx'),
+        ),
+    ]
@@ -1,22 +1,532 @@
-from django.db import models
+from collections import defaultdict
+from datetime import timedelta
+import secrets
+
+from django.conf import settings
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import Count, F, Max, Sum
+
+from .cache import invalidate_menu_items
 
 # Create your models here.
 
 
+class InsufficientInventory(Exception):
+    def __init__(self, pk, quantity):
+        super().__init__(f'Menu item {pk} has fewer than {quantity} in stock.')
+        self.pk = pk
+        self.quantity = quantity
+
+
+def new_change_marker():
+    # Negative, so never mistaken for a number of the sequence.
+    return -1 - secrets.randbits(62)
+
+
+class PendingMenuChanges:
+    """
+    The menu writes of one transaction. Until it commits, their rows and
+    tombstones carry a change marker of the transaction's own in change_seq,
+    which stamp_changes() replaces with the next number of the sequence once
+    it has committed. Every write registers commit() on its own, so that
+    the callbacks of writes in a savepoint go with it when it is rolled
+    back; the first callback that runs does the work.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        # bulk_create() adds a marker per call (see MenuQuerySet.bulk_create).
+        self.markers = [new_change_marker()]
+        self.deleted = False
+        self.done = False
+
+    @property
+    def marker(self):
+        return self.markers[0]
+
+    def commit(self):
+        if self.done:
+            return
+        self.done = True
+        Menu.objects.db_manager(self.using).stamp_changes(self.markers, tombstones=self.deleted)
+
+
+def pending_menu_changes(using):
+    """
+    The PendingMenuChanges of the transaction in progress on using, which
+    the caller is about to write menu rows in.
+    """
+    connection = connections[using]
+    pending = getattr(connection, 'menu_pending_changes', None)
+    if pending is None or pending.done or not any(
+        func == pending.commit for _, func, _ in connection.run_on_commit
+    ):
+        # None yet, or one left behind by a rolled back transaction.
+        pending = connection.menu_pending_changes = PendingMenuChanges(using)
+    connection.on_commit(pending.commit)
+    return pending
+
+
+class MenuQuerySet(models.QuerySet):
+    """
+    Every write of menu rows through the queryset, Menu.save() or
+    Menu.delete() gets a number from the menu change sequence once its
+    transaction has committed: in change_seq, or in a MenuTombstone for
+    deletes, for the changes feed (restaurant/menu/items/changes/). See
+    PendingMenuChanges and stamp_changes.
+    """
+
+    def next_change(self):
+        """
+        The next number of the menu change sequence. The counter row stays
+        locked until the surrounding transaction ends.
+        """
+        counter = MenuChangeCounter.objects.using(self.db)
+        with transaction.atomic(using=self.db, savepoint=False):
+            if not counter.filter(pk=1).update(value=F('value') + 1):
+                # First use (or a flushed table): carry on from the highest
+                # number already handed out, over every row rather than the
+                # ones this queryset happens to be filtered to.
+                highest = max(
+                    self.model._base_manager.using(self.db).aggregate(highest=Max('change_seq'))['highest'] or 0,
+                    MenuTombstone.objects.using(self.db).aggregate(highest=Max('change_seq'))['highest'] or 0,
+                )
+                counter.get_or_create(pk=1, defaults={'value': highest})
+                counter.filter(pk=1).update(value=F('value') + 1)
+            return counter.values_list('value', flat=True).get(pk=1)
+
+    def stamp_changes(self, markers, tombstones=True):
+        """
+        Number the committed writes that left markers in change_seq, in a
+        short transaction of its own, and return the number.
+
+        Only this transaction holds the counter row, not the writes
+        themselves, so concurrent writes of different items never wait for
+        each other. Stamps commit in sequence order: once a reader sees
+        change n, every change below n is visible too. A row written again
+        since carries the later write's marker and is left to its stamp.
+        tombstones=False skips the tombstones, when nothing was deleted.
+        """
+        with transaction.atomic(using=self.db):
+            change = self.next_change()
+            self.model._base_manager.using(self.db).filter(change_seq__in=markers).update(change_seq=change)
+            if tombstones:
+                MenuTombstone.objects.using(self.db).filter(change_seq__in=markers).update(change_seq=change)
+        return change
+
+    def latest_change(self):
+        """
+        The last number handed out; every change up to it has committed.
+        """
+        return MenuChangeCounter.objects.using(self.db).filter(pk=1).values_list('value', flat=True).first() or 0
+
+    def update(self, **kwargs):
+        # bulk_update() goes through here too, once per batch.
+        with transaction.atomic(using=self.db, savepoint=False):
+            kwargs['change_seq'] = pending_menu_changes(self.db).marker
+            return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            # A marker of this call's own, so that its rows can be told
+            # apart from the transaction's other writes.
+            marker = new_change_marker()
+            pending_menu_changes(self.db).markers.append(marker)
+            for obj in objs:
+                obj.change_seq = marker
+            created = super().bulk_create(objs, *args, **kwargs)
+            conflicts = kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts')
+            if not connections[self.db].features.can_return_rows_from_bulk_insert and not conflicts:
+                self._fill_created_pks(objs, marker)
+            return created
+
+    def _fill_created_pks(self, objs, marker):
+        # MySQL returns no primary keys from a bulk insert. The rows of this
+        # call are the only ones with its marker, and auto-increment keys
+        # follow insertion order.
+        missing = [obj for obj in objs if obj.pk is None]
+        if not missing:
+            return
+        pks = (
+            self.model._base_manager.using(self.db).filter(change_seq=marker)
+            .exclude(pk__in=[obj.pk for obj in objs if obj.pk is not None])
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        for obj, pk in zip(missing, pks):
+            obj.pk = pk
+
+    def delete(self):
+        with transaction.atomic(using=self.db, savepoint=False):
+            pending = pending_menu_changes(self.db)
+            pending.deleted = True
+            MenuTombstone.objects.using(self.db).bulk_create(
+                MenuTombstone(menu_id=pk, change_seq=pending.marker) for pk in self.values_list('pk', flat=True)
+            )
+            return super().delete()
+
+    def consume_inventory(self, quantities):
+        """
+        Decrement inventory for every (pk, quantity) pair, or for none of them.
+
+        Each row is decremented with a single conditional
+        `UPDATE ... SET inventory = inventory - q WHERE inventory >= q`, so
+        concurrent callers never lose an update and no lock is held beyond
+        the statement's own transaction. Rows are updated in pk order to
+        keep concurrent batches from deadlocking.
+        """
+        with transaction.atomic(using=self.db):
+            for pk, quantity in sorted(quantities.items()):
+                updated = self.filter(pk=pk, inventory__gte=quantity).update(
+                    inventory=F('inventory') - quantity
+                )
+                if not updated:
+                    if not self.filter(pk=pk).exists():
+                        raise self.model.DoesNotExist(f'Menu item {pk} does not exist.')
+                    raise InsufficientInventory(pk, quantity)
+        invalidate_menu_items(list(quantities), titles=False)
+
+
 class Menu(models.Model):
 
     title = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     inventory = models.IntegerField()
+    # Number of the last change to the row (see MenuQuerySet.next_change).
+    change_seq = models.BigIntegerField(default=0, editable=False)
+
+    objects = MenuQuerySet.as_manager()
+
+    class Meta:
+        # Title prefix search and the ?ordering= fields of the menu
+        # endpoints. On MySQL, migration 0005 also adds a FULLTEXT index on
+        # title for restaurant.search.
+        indexes = [
+            models.Index(fields=['title'], name='menu_title_idx'),
+            models.Index(fields=['price'], name='menu_price_idx'),
+            models.Index(fields=['inventory'], name='menu_inventory_idx'),
+            # Range scans of the changes feed.
+            models.Index(fields=['change_seq', 'id'], name='menu_change_seq_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        item = super().from_db(db, field_names, values)
+        if 'title' in item.__dict__:
+            # The title as last read from or written to the database, so a
+            # save can tell whether it retitled the item.
+            item.stored_title = item.title
+        return item
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        using = using or router.db_for_write(Menu, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            self.change_seq = pending_menu_changes(using).marker
+            if update_fields is not None:
+                update_fields = {*update_fields, 'change_seq'}
+            super().save(force_insert, force_update, using, update_fields)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(Menu, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            pending = pending_menu_changes(using)
+            pending.deleted = True
+            MenuTombstone.objects.using(using).create(menu_id=self.pk, change_seq=pending.marker)
+            return super().delete(using, keep_parents)
+
+    def consume(self, quantity):
+        Menu.objects.consume_inventory({self.pk: quantity})
+        self.refresh_from_db(fields=['inventory'])
+
+
+class MenuTombstone(models.Model):
+    """
+    A deleted menu item, kept so that clients of the changes feed learn
+    about the delete.
+    """
+    menu_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['change_seq', 'menu_id'], name='menu_tombstone_seq_idx'),
+        ]
+
+
+class MenuChangeCounter(models.Model):
+    """
+    A single row holding the last number of the menu change sequence.
+    """
+    value = models.BigIntegerField(default=0)
+
+
+class SlotFull(Exception):
+    def __init__(self, date, remaining):
+        super().__init__(f'Only {remaining} seats left on {date}.')
+        self.date = date
+        self.remaining = remaining
+
+
+class SlotCapacityQuerySet(models.QuerySet):
+
+    def ensure(self, date):
+        """
+        Create the capacity row for date with the default capacity unless it
+        exists. Call it before the transaction that locks the row: creating
+        the row of a new date under select_for_update() takes gap locks on
+        which two first bookings for that date can deadlock.
+        """
+        if self.filter(date=date).exists():
+            return
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(date=date, seats=settings.BOOKING_DEFAULT_CAPACITY)
+        except IntegrityError:
+            # A concurrent booking for the same date created it first.
+            pass
+
+    def lock(self, date):
+        """
+        Return the capacity row for date (see ensure()) and hold its row lock
+        until the end of the surrounding transaction. Bookings for the same
+        date serialise on this row while bookings for other dates proceed in
+        parallel.
+        """
+        try:
+            return self.select_for_update().get(date=date)
+        except self.model.DoesNotExist:
+            # Deleted since ensure(), or never ensured.
+            capacity, _ = self.select_for_update().get_or_create(
+                date=date, defaults={'seats': settings.BOOKING_DEFAULT_CAPACITY}
+            )
+            return capacity
+
+
+class SlotCapacity(models.Model):
+    date = models.DateField(unique=True)
+    seats = models.PositiveIntegerField()
+
+    objects = SlotCapacityQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f'{self.date}: {self.seats}'
+
+
+class BookingQuerySet(models.QuerySet):
+
+    def for_user(self, user, date_from=None, date_to=None):
+        """
+        Bookings owned by user, optionally limited to a date range, in the
+        order of the (user, booking_date) index.
+        """
+        queryset = self.filter(user=user)
+        if date_from is not None:
+            queryset = queryset.filter(booking_date__gte=date_from)
+        if date_to is not None:
+            queryset = queryset.filter(booking_date__lte=date_to)
+        return queryset.order_by('booking_date', 'id')
+
+    def booked_seats(self, start, end):
+        """
+        Return {date: guests} for every date in [start, end] with a booking,
+        using a single GROUP BY over the booking_date index.
+        """
+        rows = (
+            self.filter(booking_date__range=(start, end))
+            .order_by()
+            .values_list('booking_date')
+            .annotate(guests=Sum('number_of_guest'))
+        )
+        return dict(rows)
+
+    def availability(self, start, end):
+        booked = self.booked_seats(start, end)
+        capacities = dict(
+            SlotCapacity.objects.filter(date__range=(start, end)).values_list('date', 'seats')
+        )
+        days = []
+        day = start
+        while day <= end:
+            capacity = capacities.get(day, settings.BOOKING_DEFAULT_CAPACITY)
+            guests = booked.get(day, 0)
+            days.append({
+                'date': day,
+                'capacity': capacity,
+                'booked': guests,
+                'remaining': max(capacity - guests, 0),
+            })
+            day += timedelta(days=1)
+        return days
+
 
 class Booking(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='bookings',
+    )
     name = models.CharField(max_length=255)
     number_of_guest = models.IntegerField()
     booking_date = models.DateField()
 
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['booking_date'], name='booking_date_idx'),
+            models.Index(fields=['user', 'booking_date'], name='booking_user_date_idx'),
+        ]
+
     def __str__(self) -> str:
         return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        booking = super().from_db(db, field_names, values)
+        if 'booking_date' in booking.__dict__ and 'number_of_guest' in booking.__dict__:
+            booking.stored_stats = booking.stats_key()
+        return booking
+
+    def stats_key(self):
+        """
+        What this booking contributes to restaurant.BookingDailyStats. The
+        value as last read from or written to the database is kept in
+        stored_stats, so updates can be applied as a delta.
+        """
+        return self.booking_date, self.number_of_guest
+
+    def save_within_capacity(self):
+        """
+        Save the booking unless it would overbook its date, raising SlotFull.
+
+        The capacity row for the date is locked for the duration of this
+        short transaction only, so two concurrent bookings for the same
+        date cannot both see the same free seats.
+        """
+        SlotCapacity.objects.ensure(self.booking_date)
+        with transaction.atomic():
+            capacity = SlotCapacity.objects.lock(self.booking_date)
+            others = Booking.objects.filter(booking_date=self.booking_date)
+            if self.pk is not None:
+                others = others.exclude(pk=self.pk)
+            booked = others.aggregate(guests=Sum('number_of_guest'))['guests'] or 0
+            if booked + self.number_of_guest > capacity.seats:
+                raise SlotFull(self.booking_date, max(capacity.seats - booked, 0))
+            self.save()
+
+
+class BookingDailyStatsQuerySet(models.QuerySet):
+
+    def add(self, date, bookings, guests):
+        """
+        Add bookings and guests (either may be negative) to the row for date
+        with a single relative UPDATE, creating the row on first use.
+        """
+        counts = {'bookings': F('bookings') + bookings, 'guests': F('guests') + guests}
+        if self.filter(date=date).update(**counts):
+            return
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(date=date, bookings=bookings, guests=guests)
+        except IntegrityError:
+            # A concurrent booking for the same date created it first.
+            self.filter(date=date).update(**counts)
+
+    def add_bookings(self, bookings):
+        """
+        Count new bookings written without signals (bulk_create).
+        """
+        changes = defaultdict(lambda: [0, 0])
+        for booking in bookings:
+            changes[booking.booking_date][0] += 1
+            changes[booking.booking_date][1] += booking.number_of_guest
+        with transaction.atomic(using=self.db, savepoint=False):
+            for date, (count, guests) in sorted(changes.items()):
+                self.add(date, count, guests)
+
+    def apply_change(self, old, new):
+        """
+        Move a booking's contribution from old to new, both a
+        Booking.stats_key() or None when the booking did not or no longer
+        exists. Rows are updated in date order to keep concurrent writers
+        from deadlocking.
+        """
+        changes = defaultdict(lambda: [0, 0])
+        if old is not None:
+            changes[old[0]][0] -= 1
+            changes[old[0]][1] -= old[1]
+        if new is not None:
+            changes[new[0]][0] += 1
+            changes[new[0]][1] += new[1]
+        with transaction.atomic(using=self.db, savepoint=False):
+            for date, (bookings, guests) in sorted(changes.items()):
+                if bookings or guests:
+                    self.add(date, bookings, guests)
+
+    def rebuild(self, start, end):
+        """
+        Recompute the rows for [start, end] from the bookings table with one
+        GROUP BY over the booking_date index. Returns the number of dates
+        with bookings.
+        """
+        with transaction.atomic(using=self.db):
+            # Lock the range (and on InnoDB the gaps in it) first, so booking
+            # writes for these dates wait for the rebuild instead of adding
+            # to rows it is about to replace.
+            list(self.select_for_update().filter(date__range=(start, end)).values_list('date'))
+            rows = (
+                Booking.objects.using(self.db)
+                .filter(booking_date__range=(start, end))
+                .order_by()
+                .values_list('booking_date')
+                .annotate(bookings=Count('id'), guests=Sum('number_of_guest'))
+            )
+            stats = [self.model(date=date, bookings=bookings, guests=guests) for date, bookings, guests in rows]
+            self.filter(date__range=(start, end)).delete()
+            self.bulk_create(stats)
+        return len(stats)
+
+    def between(self, start, end):
+        return self.filter(date__range=(start, end), bookings__gt=0).order_by('date')
+
+    def weekly(self, start, end):
+        """
+        Totals per week (starting on Monday) for the dates in [start, end].
+        """
+        weeks = {}
+        for date, bookings, guests in self.between(start, end).values_list('date', 'bookings', 'guests'):
+            week = weeks.setdefault(date - timedelta(days=date.weekday()), [0, 0])
+            week[0] += bookings
+            week[1] += guests
+        return [
+            {'week': week, 'bookings': bookings, 'guests': guests}
+            for week, (bookings, guests) in weeks.items()
+        ]
+
+    def peaks(self, start, end, limit):
+        """
+        The limit busiest dates in [start, end] by guests.
+        """
+        return self.between(start, end).order_by('-guests', 'date')[:limit]
+
+
+class BookingDailyStats(models.Model):
+    """
+    Booking count and total guests per booking date, kept up to date by the
+    Booking signals in restaurant.signals and rebuilt from scratch by the
+    rebuild_booking_stats command. Writes that skip signals (bulk_create,
+    QuerySet.update, raw SQL) need a rebuild of the dates they touched.
+    """
+    date = models.DateField(unique=True)
+    bookings = models.IntegerField(default=0)
+    guests = models.IntegerField(default=0)
+
+    objects = BookingDailyStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'booking daily stats'
+
+    def __str__(self) -> str:
+        return f'{self.date}: {self.bookings} bookings, {self.guests} guests'
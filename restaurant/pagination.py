@@ -0,0 +1,22 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class MenuCursorPagination(CursorPagination):
+    """
+    Keyset pagination over Menu.id.
+
+    Pagination is opt-in so existing clients that expect a plain list keep
+    working: a page is only returned when the request carries a cursor or a
+    page_size query parameter.
+    """
+    ordering = 'id'
+    page_size = settings.MENU_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MENU_MAX_PAGE_SIZE
+
+    def get_page_size(self, request):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().get_page_size(request)
@@ -0,0 +1,41 @@
+"""
+JSON request parsing through orjson when it is installed (see
+restaurant.renderers).
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data):
+    """
+    Decode a JSON document given as bytes or str. Raises ValueError when it
+    is not valid JSON (NaN and Infinity included).
+    """
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser through loads(), which orjson reads straight from the UTF-8
+    request body.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return loads(data)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
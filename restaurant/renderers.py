@@ -0,0 +1,51 @@
+"""
+JSON rendering through orjson, which is several times faster than the json
+module behind DRF's JSONRenderer. Decimals, dates and the other types that
+orjson does not encode the way DRF does are handed to DRF's encoder, so the
+output is the same bytes either way. Without orjson installed everything
+goes through the json module.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Matches JSONRenderer with the default UNICODE_JSON and COMPACT_JSON settings.
+encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+if orjson is not None:
+    # orjson would write datetimes with microseconds and +00:00 where DRF
+    # writes milliseconds and Z, so dates and times go to DRF's encoder too.
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(data):
+    """
+    data as compact UTF-8 JSON bytes, as the API renders it.
+    """
+    if orjson is None:
+        return encoder.encode(data).encode()
+    return orjson.dumps(data, default=encoder.default, option=OPTIONS)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer through dumps(). Indented output (an indent= Accept
+    parameter or the browsable API) and the ensure_ascii or non-compact
+    settings are left to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = dumps(data)
+        # Escaped like JSONRenderer does: valid in JSON but not in JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,124 @@
+"""
+Menu title search.
+
+Full-text queries match menu items whose title contains every query word,
+the last word as a prefix so results update as the user types. On MySQL
+this is a MATCH ... AGAINST query on the menu_title_fulltext index. Other
+databases use an in-process inverted index of title words, rebuilt from the
+primary whenever a menu item has been created, deleted or retitled.
+
+Autocomplete matches titles starting with the query on the title B-tree
+index.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+import re
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Lookup
+
+from LittleLemon.db.routers import use_primary
+from . import cache
+from .models import Menu
+
+WORD_RE = re.compile(r'\w+')
+# InnoDB's innodb_ft_min_token_size default; shorter words are not indexed.
+MYSQL_MIN_TOKEN_SIZE = 3
+
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+
+class FullTextMatch(Lookup):
+    """
+    title__search='...' as a MySQL boolean-mode full-text match.
+    """
+    lookup_name = 'search'
+
+    def as_mysql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'MATCH ({lhs}) AGAINST ({rhs} IN BOOLEAN MODE)', lhs_params + rhs_params
+
+
+Menu._meta.get_field('title').register_lookup(FullTextMatch)
+
+
+def boolean_query(terms):
+    # Every word required, the last one as a prefix. Requiring a word too
+    # short to be indexed would match nothing, so those are left out.
+    required = [f'+{term}' for term in terms[:-1] if len(term) >= MYSQL_MIN_TOKEN_SIZE]
+    return ' '.join(required + [f'+{terms[-1]}*'])
+
+
+class MenuSearchIndex:
+    """
+    Title words mapped to the ids of the menu items using them, with the
+    words kept sorted for prefix lookups.
+    """
+
+    def __init__(self, rows, version=None):
+        postings = defaultdict(set)
+        for pk, title in rows:
+            for word in words(title):
+                postings[word].add(pk)
+        self.postings = dict(postings)
+        self.words = sorted(postings)
+        self.version = version
+
+    def matching(self, term, prefix=False):
+        if not prefix:
+            return self.postings.get(term, set())
+        ids = set()
+        for i in range(bisect_left(self.words, term), len(self.words)):
+            word = self.words[i]
+            if not word.startswith(term):
+                break
+            ids |= self.postings[word]
+        return ids
+
+    def search(self, terms):
+        result = None
+        for i, term in enumerate(terms):
+            ids = self.matching(term, prefix=i == len(terms) - 1)
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result or set()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def menu_index():
+    """
+    The process's search index, rebuilt when the menu titles have changed.
+    """
+    global _index
+    version = cache.titles_version()
+    with _index_lock:
+        if _index is None or _index.version != version:
+            # Read from the primary: an index built from a lagging replica
+            # would be kept until the next menu write.
+            with use_primary():
+                rows = Menu.objects.values_list('id', 'title').iterator(chunk_size=10_000)
+                _index = MenuSearchIndex(rows, version)
+        return _index
+
+
+def search_menu(queryset, q, autocomplete=False):
+    if autocomplete:
+        return queryset.filter(title__istartswith=q)
+    terms = words(q)
+    if not terms:
+        return queryset.none()
+    if connections[queryset.db].vendor == 'mysql':
+        return queryset.filter(title__search=boolean_query(terms))
+    # Very broad matches are cut to the lowest ids to keep the IN list
+    # within the database's parameter limit.
+    ids = sorted(menu_index().search(terms))[:settings.MENU_SEARCH_MAX_CANDIDATES]
+    return queryset.filter(pk__in=ids)
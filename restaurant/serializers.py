@@ -1,14 +1,143 @@
-from rest_framework.serializers import ModelSerializer
-from .models import Menu, Booking
+from django.conf import settings
+from rest_framework.serializers import (
+    BooleanField, CharField, DateField, IntegerField, ListSerializer, ModelSerializer, Serializer,
+    ValidationError,
+)
+from .models import Menu, Booking, BookingDailyStats, SlotFull
+
+
+class MenuListSerializer(ListSerializer):
+    """
+    Writes many menu items with bulk_create/bulk_update instead of one
+    INSERT or UPDATE per row. The batch size comes from the serializer
+    context.
+    """
+
+    def create(self, validated_data):
+        objs = [Menu(**attrs) for attrs in validated_data]
+        return Menu.objects.bulk_create(objs, batch_size=self.context.get('batch_size'))
+
+    def update(self, instances, validated_data):
+        # instances maps id -> Menu, validated_data is aligned with the
+        # submitted items, which each carry the id of the row they update.
+        objs = []
+        fields = set()
+        for item, attrs in zip(self.initial_data, validated_data):
+            obj = instances[int(item['id'])]
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+            fields.update(attrs)
+            objs.append(obj)
+        if fields:
+            Menu.objects.bulk_update(objs, sorted(fields), batch_size=self.context.get('batch_size'))
+        return objs
 
 
 class MenuSerializer(ModelSerializer):
     class Meta:
         model = Menu
-        fields = '__all__'
+        fields = ['id', 'title', 'price', 'inventory']
+        list_serializer_class = MenuListSerializer
 
 
 class BookingSerializer(ModelSerializer):
     class Meta:
         model = Booking
         fields = '__all__'
+        read_only_fields = ['user']
+
+    def create(self, validated_data):
+        return self.save_within_capacity(Booking(**validated_data))
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        return self.save_within_capacity(instance)
+
+    def save_within_capacity(self, booking):
+        try:
+            booking.save_within_capacity()
+        except SlotFull as exc:
+            raise ValidationError({'number_of_guest': [str(exc)]})
+        return booking
+
+
+class StockConsumeSerializer(Serializer):
+    id = IntegerField()
+    quantity = IntegerField(min_value=1)
+
+
+class MenuSearchQuerySerializer(Serializer):
+    q = CharField(max_length=255)
+    autocomplete = BooleanField(default=False)
+    limit = IntegerField(min_value=1, max_value=settings.MENU_SEARCH_MAX_LIMIT,
+                         default=settings.MENU_SEARCH_LIMIT)
+
+
+class MenuChangesQuerySerializer(Serializer):
+    # "<change>" or "<change>.<id>", as returned by the previous call.
+    cursor = CharField(required=False)
+    limit = IntegerField(min_value=1, max_value=settings.MENU_CHANGES_MAX_LIMIT,
+                         default=settings.MENU_CHANGES_LIMIT)
+
+    def validate_cursor(self, value):
+        change, _, pk = value.partition('.')
+        try:
+            return int(change), int(pk) if pk else None
+        except ValueError:
+            raise ValidationError('Pass the cursor of the previous response.')
+
+
+class BookingFilterSerializer(Serializer):
+    date_from = DateField(required=False)
+    date_to = DateField(required=False)
+
+
+class AvailabilityQuerySerializer(Serializer):
+    start = DateField()
+    end = DateField()
+
+    def validate(self, attrs):
+        days = (attrs['end'] - attrs['start']).days
+        if days < 0:
+            raise ValidationError({'end': ['end must not be before start.']})
+        if days >= settings.BOOKING_AVAILABILITY_MAX_DAYS:
+            raise ValidationError(
+                {'end': [f'At most {settings.BOOKING_AVAILABILITY_MAX_DAYS} days can be requested.']}
+            )
+        return attrs
+
+
+class AvailabilitySerializer(Serializer):
+    date = DateField()
+    capacity = IntegerField()
+    booked = IntegerField()
+    remaining = IntegerField()
+
+
+class BookingStatsQuerySerializer(Serializer):
+    start = DateField()
+    end = DateField()
+    limit = IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        days = (attrs['end'] - attrs['start']).days
+        if days < 0:
+            raise ValidationError({'end': ['end must not be before start.']})
+        if days >= settings.BOOKING_STATS_MAX_DAYS:
+            raise ValidationError(
+                {'end': [f'At most {settings.BOOKING_STATS_MAX_DAYS} days can be requested.']}
+            )
+        return attrs
+
+
+class BookingDailyStatsSerializer(ModelSerializer):
+    class Meta:
+        model = BookingDailyStats
+        fields = ['date', 'bookings', 'guests']
+
+
+class BookingWeeklyStatsSerializer(Serializer):
+    week = DateField()
+    bookings = IntegerField()
+    guests = IntegerField()
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import authentication, cache, live, tasks
+from .models import Booking, BookingDailyStats, Menu
+
+
+@receiver(post_save, sender=Menu)
+def invalidate_saved_menu_item(sender, instance, created, **kwargs):
+    titles = created or getattr(instance, 'stored_title', None) != instance.title
+    instance.stored_title = instance.title
+    cache.invalidate_menu_items([instance.pk], titles=titles)
+
+
+@receiver(post_delete, sender=Menu)
+def invalidate_deleted_menu_item(sender, instance, **kwargs):
+    cache.invalidate_menu_items([instance.pk])
+
+
+@receiver(cache.menu_committed)
+def queue_menu_snapshot(sender, **kwargs):
+    tasks.publish_menu_snapshot.delay()
+
+
+@receiver(cache.menu_committed)
+def publish_menu_changes(sender, pks=None, **kwargs):
+    live.publish_menu_changes(pks)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    authentication.invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user_tokens(sender, instance, **kwargs):
+    authentication.invalidate_user_tokens(instance)
+
+
+def booking_snapshot(booking):
+    return {
+        'id': booking.pk,
+        'user': booking.user_id,
+        'name': booking.name,
+        'number_of_guest': booking.number_of_guest,
+        'booking_date': str(booking.booking_date),
+    }
+
+
+@receiver(post_save, sender=Booking)
+def queue_booking_saved(sender, instance, created, **kwargs):
+    tasks.booking_changed.delay('created' if created else 'updated', booking_snapshot(instance))
+
+
+@receiver(post_delete, sender=Booking)
+def queue_booking_deleted(sender, instance, **kwargs):
+    tasks.booking_changed.delay('deleted', booking_snapshot(instance))
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_stats(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance.stored_stats = None
+    elif not hasattr(instance, 'stored_stats'):
+        # Not loaded with its date and guests (or given an explicit pk).
+        instance.stored_stats = (
+            Booking.objects.filter(pk=instance.pk).values_list('booking_date', 'number_of_guest').first()
+        )
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def publish_booking_availability(sender, instance, **kwargs):
+    # Connected ahead of update_booking_stats, so stored_stats still holds
+    # the date a moved booking had before.
+    dates = {str(instance.booking_date)}
+    if getattr(instance, 'stored_stats', None):
+        dates.add(str(instance.stored_stats[0]))
+    transaction.on_commit(lambda: live.publish_availability(sorted(dates)))
+
+
+@receiver(post_save, sender=Booking)
+def update_booking_stats(sender, instance, **kwargs):
+    BookingDailyStats.objects.apply_change(instance.stored_stats, instance.stats_key())
+    instance.stored_stats = instance.stats_key()
+
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_stats(sender, instance, **kwargs):
+    BookingDailyStats.objects.apply_change(getattr(instance, 'stored_stats', instance.stats_key()), None)
@@ -0,0 +1,271 @@
+"""
+The whole menu as one pre-built JSON document, published next to gzip and
+(when the brotli package is installed) brotli compressed copies.
+
+publish() writes the snapshot of the latest menu change (see
+MenuQuerySet.latest_change) to MENU_SNAPSHOT_DIR; the
+restaurant.tasks.publish_menu_snapshot task runs it in a worker after
+committed menu writes. Requests never build one: each process serves the
+newest snapshot in the directory from memory, which costs one cache lookup
+and no queries. Once a snapshot misses a menu write (see
+cache.WRITTEN_AT_KEY, which needs a cache shared by every process) and is
+older than MENU_SNAPSHOT_MAX_LAG seconds, the list is built as usual until
+the worker catches up.
+"""
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+
+from django.conf import settings
+
+from LittleLemon.db.routers import use_primary
+
+from . import cache
+from .fast_serializers import FastMenuSerializer
+from .models import Menu
+from .streaming import stream_json_list
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Past these, compression takes several times longer for a few percent
+# smaller files, and a request may have to wait for a build.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+# Content-Encoding -> file suffix, in order of preference.
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+FILE_RE = re.compile(r'^menu-(\d+)\.json(\.gz|\.br)?$')
+
+
+class Snapshot:
+
+    def __init__(self, version, published_at, bodies):
+        self.version = version
+        self.published_at = published_at
+        # Content-Encoding (None for the uncompressed body) -> bytes.
+        self.bodies = bodies
+
+    @property
+    def etag(self):
+        # Weak, as it stands for every encoding of the same document.
+        return f'W/"menu-{self.version}"'
+
+    def negotiate(self, accept_encoding):
+        """
+        The (Content-Encoding, body) pair to send to a client with the given
+        Accept-Encoding header.
+        """
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.bodies and (encoding in accepted or '*' in accepted):
+                return encoding, self.bodies[encoding]
+        return None, self.bodies[None]
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding, params = coding.strip().lower(), params.replace(' ', '')
+        if not coding:
+            continue
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+def snapshot_path(version, suffix=''):
+    return os.path.join(settings.MENU_SNAPSHOT_DIR, f'menu-{version}.json{suffix}')
+
+
+class Compressors:
+    """
+    Writes the document and its compressed copies to temporary files as it
+    is generated, so the rows never have to be held in memory at once.
+    """
+
+    def __init__(self, directory):
+        self.files = {None: self.temporary(directory)}
+        self.compressors = {'gzip': zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)}
+        self.files['gzip'] = self.temporary(directory)
+        if brotli is not None:
+            self.compressors['br'] = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.files['br'] = self.temporary(directory)
+
+    @staticmethod
+    def temporary(directory):
+        return tempfile.NamedTemporaryFile(dir=directory, prefix='.menu-', suffix='.tmp', delete=False)
+
+    def write(self, data):
+        self.files[None].write(data)
+        for encoding, compressor in self.compressors.items():
+            self.files[encoding].write(compressor.compress(data))
+
+    def close(self):
+        for encoding, compressor in self.compressors.items():
+            self.files[encoding].write(compressor.flush() if encoding == 'gzip' else compressor.finish())
+        for f in self.files.values():
+            f.close()
+
+    def discard(self):
+        for f in self.files.values():
+            f.close()
+            os.remove(f.name)
+
+
+def publish():
+    """
+    Write the snapshot of the latest menu change unless it, or a newer one,
+    is published already, and remove all but the newest two. Returns the
+    version published or found.
+    """
+    # A replica may not have the latest writes yet.
+    with use_primary():
+        started = time.time()
+        # Every write numbered up to version committed before its number
+        # did, so the rows read next hold all of them.
+        version = Menu.objects.latest_change()
+        newest = newest_version()
+        if newest is not None and newest >= version:
+            return newest
+        os.makedirs(settings.MENU_SNAPSHOT_DIR, exist_ok=True)
+        output = Compressors(settings.MENU_SNAPSHOT_DIR)
+        try:
+            for chunk in stream_json_list(Menu.objects.all(), FastMenuSerializer):
+                output.write(chunk)
+            output.close()
+        except BaseException:
+            output.discard()
+            raise
+    # Dated when the rows were read, for the MENU_SNAPSHOT_MAX_LAG check.
+    for f in output.files.values():
+        os.utime(f.name, (started, started))
+    # The uncompressed file goes last: its presence marks the snapshot complete.
+    for encoding, suffix in ENCODINGS.items():
+        if encoding in output.files:
+            os.replace(output.files[encoding].name, snapshot_path(version, suffix))
+    os.replace(output.files[None].name, snapshot_path(version))
+    prune()
+    return version
+
+
+def published_versions():
+    """
+    The published versions in MENU_SNAPSHOT_DIR, mapped to their files.
+    """
+    versions = {}
+    try:
+        names = os.listdir(settings.MENU_SNAPSHOT_DIR)
+    except FileNotFoundError:
+        return versions
+    for name in names:
+        match = FILE_RE.match(name)
+        if match:
+            versions.setdefault(int(match[1]), []).append(name)
+    return versions
+
+
+def newest_version():
+    """
+    The newest complete snapshot in MENU_SNAPSHOT_DIR, or None.
+    """
+    complete = [version for version, names in published_versions().items() if f'menu-{version}.json' in names]
+    return max(complete, default=None)
+
+
+def prune(keep=2):
+    versions = published_versions()
+    for version in sorted(versions)[:-keep]:
+        for name in versions[version]:
+            try:
+                os.remove(os.path.join(settings.MENU_SNAPSHOT_DIR, name))
+            except FileNotFoundError:
+                pass
+
+
+def load(version):
+    """
+    The published snapshot of version read into memory, or None when it has
+    not been published (or was pruned since).
+    """
+    bodies = {}
+    try:
+        with open(snapshot_path(version), 'rb') as f:
+            bodies[None] = f.read()
+            published_at = int(os.fstat(f.fileno()).st_mtime)
+        for encoding, suffix in ENCODINGS.items():
+            if os.path.exists(snapshot_path(version, suffix)):
+                with open(snapshot_path(version, suffix), 'rb') as f:
+                    bodies[encoding] = f.read()
+    except FileNotFoundError:
+        return None
+    return Snapshot(version, published_at, bodies)
+
+
+# Rescan MENU_SNAPSHOT_DIR when its mtime changes, and at least this often
+# (seconds) for filesystems with coarse timestamps.
+SCAN_INTERVAL = 1
+
+_latest = None
+_scanned = (None, 0)
+_lock = threading.Lock()
+
+
+def current():
+    """
+    The newest published snapshot, or None when there is none or it misses
+    a menu write and is older than MENU_SNAPSHOT_MAX_LAG seconds.
+    Never builds one: that is the worker's job (see publish()).
+    """
+    snapshot = _latest
+    try:
+        mtime = os.stat(settings.MENU_SNAPSHOT_DIR).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    now = time.monotonic()
+    if _scanned[0] != mtime or now - _scanned[1] >= SCAN_INTERVAL:
+        # One thread per process loads; the rest keep serving what they have.
+        if _lock.acquire(blocking=snapshot is None):
+            try:
+                snapshot = _rescan(mtime, now)
+            finally:
+                _lock.release()
+    if snapshot is None:
+        return None
+    written_at = cache.get_cache().get(cache.WRITTEN_AT_KEY)
+    if written_at is not None and written_at > snapshot.published_at:
+        # Missing a write, possibly of the last MENU_SNAPSHOT_MAX_LAG seconds only.
+        if time.time() - snapshot.published_at > settings.MENU_SNAPSHOT_MAX_LAG:
+            return None
+    return snapshot
+
+
+def _rescan(mtime, now):
+    global _latest, _scanned
+    version = newest_version()
+    if version is not None and (_latest is None or _latest.version != version):
+        # None if pruned in the meantime; the next scan finds its successor.
+        _latest = load(version) or _latest
+    _scanned = (mtime, now)
+    return _latest
+
+
+def reset():
+    """
+    Forget the snapshot held in memory.
+    """
+    global _latest, _scanned
+    _latest = None
+    _scanned = (None, 0)
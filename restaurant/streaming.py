@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+
+
+def iterate_in_chunks(queryset, chunk_size):
+    """
+    Yield every row (model instance or .values() dict) of queryset in its
+    ordering (by id when it has none), one keyset chunk at a time.
+
+    The MySQL driver buffers a whole result set client side even with
+    .iterator(), so each chunk is its own query for the rows after the last
+    one yielded, `LIMIT chunk_size`, and at most chunk_size rows are ever
+    held in memory. The ordering gets id as a tie-breaker so every row has
+    its own position; the ordered fields must not be null.
+    """
+    ordering, tie_breaker = [], 'id'
+    for name in queryset.query.order_by:
+        if name.lstrip('-') in ('id', 'pk'):
+            tie_breaker = name.replace('pk', 'id')
+            break
+        ordering.append(name)
+    ordering.append(tie_breaker)
+    fields = [name.lstrip('-') for name in ordering]
+    ordered = queryset.order_by(*ordering)
+    last = None
+    while True:
+        chunk = ordered if last is None else ordered.filter(_after(ordering, fields, last))
+        count = 0
+        for obj in chunk[:chunk_size].iterator(chunk_size=chunk_size):
+            count += 1
+            last = obj
+            yield obj
+        if count < chunk_size:
+            return
+
+
+def _after(ordering, fields, row):
+    # Rows past row in the ordering: equal on the leading fields and past it
+    # on the next one, for each field in turn.
+    values = [row[field] if isinstance(row, dict) else getattr(row, field) for field in fields]
+    after = Q()
+    for i, (name, field) in enumerate(zip(ordering, fields)):
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        after |= Q(**dict(zip(fields[:i], values[:i])), **{f'{field}__{lookup}': values[i]})
+    return after
+
+
+def stream_json_list(queryset, fast_serializer, chunk_size=None):
+    """
+    Yield a JSON array as bytes one row at a time, rendering rows with one of the
+    restaurant.fast_serializers classes.
+    """
+    chunk_size = chunk_size or settings.MENU_STREAM_CHUNK_SIZE
+    to_representation = fast_serializer.to_representation
+    yield b'['
+    separator = b''
+    for row in iterate_in_chunks(fast_serializer.values(queryset), chunk_size):
+        yield separator + dumps(to_representation(row))
+        separator = b','
+    yield b']'
+
+
+def streaming_json_response(queryset, fast_serializer, chunk_size=None):
+    return StreamingHttpResponse(
+        stream_json_list(queryset, fast_serializer, chunk_size),
+        content_type='application/json',
+    )
@@ -0,0 +1,50 @@
+"""
+Background work following booking and menu changes, queued by
+restaurant.signals once the change has committed.
+"""
+import logging
+
+from templated_mail.mail import BaseEmailMessage
+
+from taskqueue.registry import task
+from . import snapshot
+from .models import Booking
+
+audit_logger = logging.getLogger('restaurant.audit')
+
+
+class BookingConfirmationEmail(BaseEmailMessage):
+    template_name = 'email/booking_confirmation.html'
+
+
+@task
+def booking_changed(event, booking):
+    """
+    Audit a booking created, updated or deleted event; booking is the row
+    as a dict, since a deleted booking can no longer be loaded. Follow-up
+    work with its own retries is queued from here, off the request path.
+    """
+    audit_logger.info(
+        'booking %s %s: user=%s date=%s guests=%s',
+        booking['id'], event, booking['user'], booking['booking_date'], booking['number_of_guest'],
+    )
+    if event == 'created' and booking['user'] is not None:
+        send_booking_confirmation.delay(booking['id'])
+
+
+@task(max_attempts=8)
+def send_booking_confirmation(booking_id):
+    booking = Booking.objects.select_related('user').filter(pk=booking_id).first()
+    if booking is None or booking.user is None or not booking.user.email:
+        return
+    BookingConfirmationEmail(context={'booking': booking, 'user': booking.user}).send([booking.user.email])
+
+
+@task(unique=True)
+def publish_menu_snapshot():
+    """
+    Publish the menu snapshot of the latest menu change. Queued once however
+    many writes ask for it before a worker gets to it, and does nothing when
+    a snapshot that new is published already.
+    """
+    snapshot.publish()
@@ -0,0 +1,11 @@
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+
+from restaurant.admin import booked_dates_changelist
+
+register = template.Library()
+
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def booking_date_hierarchy(cl):
+    return date_hierarchy(booked_dates_changelist(cl))
@@ -0,0 +1,22 @@
+class QueryBudgetMixin:
+    """
+    TestCase mixin checking responses against the query_budget declared on
+    the view that served them (see restaurant.metrics.InstrumentedViewMixin).
+    The count comes from the X-Query-Count header set by
+    InstrumentationMiddleware.
+    """
+
+    def assertWithinQueryBudget(self, response):
+        view_class = getattr(response.resolver_match.func, 'cls', None)
+        method = response.request['REQUEST_METHOD']
+        budget = getattr(view_class, 'query_budget', None)
+        if isinstance(budget, dict):
+            budget = budget.get(method)
+        if budget is None:
+            self.fail(f'{response.resolver_match.view_name} declares no query budget for {method}.')
+        queries = int(response['X-Query-Count'])
+        if queries > budget:
+            self.fail(
+                f'{response.resolver_match.view_name} {method} ran {queries} queries, '
+                f'over its budget of {budget}.'
+            )
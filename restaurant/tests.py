@@ -6,9 +6,14 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from .serializers import MenuSerializer
+from .views import rendered_index
 
 
 class TestViews(TestCase):
+    def setUp(self):
+        # The landing page is rendered once per process.
+        rendered_index.cache_clear()
+
     def test_index(self):
         response = self.client.get('/restaurant/menu/')
         self.assertEqual(response.status_code, 200)
@@ -94,7 +99,7 @@ class MenuItemsViewTestCase(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         serializer = MenuSerializer([menu_item], many=True)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.json(), serializer.data)
 
 
 class SingleMenuItemViewTestCase(APITestCase):
@@ -0,0 +1,96 @@
+"""
+Sliding-window rate limiting for the API views.
+
+DRF's SimpleRateThrottle stores a list of request timestamps per client,
+which grows with the limit and is rewritten on every request. Here each
+client and scope costs two integer counters, one for the current fixed
+window and one for the previous, updated with the cache's atomic incr().
+The request rate is estimated by weighting the previous window's count by
+how much of it still overlaps the sliding window, which smooths out the
+burst a plain fixed window allows at its boundary.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    '100/min' -> (100, 60). Like DRF, only the period's first letter counts.
+    """
+    try:
+        num, period = rate.split('/')
+        return int(num), PERIODS[period[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f'Invalid throttle rate {rate!r}.')
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Limits each authenticated user, or anonymous client IP, to the rate
+    DEFAULT_THROTTLE_RATES sets for the view's throttle_scope. Views without
+    a throttle_scope, or whose scope has no rate, are not throttled.
+    """
+    cache_format = 'throttle:{scope}:{ident}:{window}'
+    timer = time.time
+
+    def get_rate(self, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return None, None
+        # Read on every request rather than once at import, so the rates
+        # follow settings overrides.
+        return scope, api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+
+    def get_cache_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope, rate = self.get_rate(view)
+        if rate is None:
+            return True
+        limit, duration = parse_rate(rate)
+
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        ident = self.get_cache_ident(request)
+        now = self.timer()
+        window = int(now // duration)
+        key = self.cache_format.format(scope=scope, ident=ident, window=window)
+        previous_key = self.cache_format.format(scope=scope, ident=ident, window=window - 1)
+
+        count = self.incr(cache, key, duration)
+        previous = cache.get(previous_key, 0)
+        elapsed = now - window * duration
+        if previous * (1 - elapsed / duration) + count <= limit:
+            return True
+
+        # Rejected requests do not use up the allowance.
+        cache.decr(key)
+        self.wait_time = self.time_to_wait(limit, duration, count, previous, elapsed)
+        return False
+
+    def incr(self, cache, key, duration):
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The key expires once it is no longer the previous window.
+            if cache.add(key, 1, 2 * duration + 1):
+                return 1
+            return cache.incr(key)
+
+    def time_to_wait(self, limit, duration, count, previous, elapsed):
+        if previous and count <= limit:
+            # Until enough of the previous window has slid out.
+            return max(0.0, duration * (1 - (limit - count) / previous) - elapsed)
+        return duration - elapsed
+
+    def wait(self):
+        return getattr(self, 'wait_time', None)
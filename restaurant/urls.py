@@ -1,11 +1,14 @@
 from django.urls import path
 from . import views
-from rest_framework.authtoken.views import obtain_auth_token
 
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('items/', views.MenuItemsView.as_view(), name='menu_items'),
+    path('items/search/', views.MenuSearchView.as_view(), name='menu_items_search'),
+    path('items/changes/', views.MenuChangesView.as_view(), name='menu_items_changes'),
+    path('items/bulk/', views.MenuBulkView.as_view(), name='menu_items_bulk'),
+    path('items/stock/consume/', views.MenuStockView.as_view(), name='menu_items_consume'),
     path('items/<int:pk>', views.SingleMenuItemView.as_view(),name='single_menu_item'),
-    path('api-token-auth/', obtain_auth_token),
+    path('api-token-auth/', views.ThrottledObtainAuthToken.as_view()),
 ]
@@ -1,26 +1,467 @@
-from django.shortcuts import render
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateAPIView, DestroyAPIView
-from rest_framework.viewsets import ModelViewSet
-from .models import Menu, Booking
-from .serializers import MenuSerializer, BookingSerializer
-from rest_framework.permissions import IsAuthenticated
+import functools
+import hashlib
 
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from rest_framework import status
+from rest_framework.decorators import action
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.generics import (
+    DestroyAPIView, GenericAPIView, ListAPIView, ListCreateAPIView, RetrieveUpdateAPIView,
+)
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
+from djoser.views import TokenCreateView
+from rest_framework.authtoken.views import ObtainAuthToken
+from .models import Menu, MenuTombstone, Booking, BookingDailyStats, InsufficientInventory
+from .serializers import (
+    AvailabilityQuerySerializer, AvailabilitySerializer, BookingDailyStatsSerializer,
+    BookingFilterSerializer, BookingSerializer, BookingStatsQuerySerializer, BookingWeeklyStatsSerializer,
+    MenuChangesQuerySerializer, MenuSearchQuerySerializer, MenuSerializer, StockConsumeSerializer,
+)
+from . import cache, snapshot
+from .fast_serializers import FastBookingSerializer, FastMenuSerializer
+from .filters import MENU_ORDERING_FIELDS, MenuFilter
+from .metrics import InstrumentedViewMixin, registry, request_metrics, timed_serialization
+from .pagination import MenuCursorPagination
+from .search import search_menu
+from .streaming import streaming_json_response
+from .throttling import SlidingWindowThrottle
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
+
+@functools.lru_cache(maxsize=None)
+def rendered_index():
+    """
+    The landing page and its ETag. The page does not depend on the request,
+    so it is rendered once per process and without context processors.
+    """
+    content = render_to_string('index.html')
+    return content, '"%s"' % hashlib.md5(content.encode()).hexdigest()
+
+
+def index_page():
+    # Pick up template edits while developing.
+    return rendered_index.__wrapped__() if settings.DEBUG else rendered_index()
+
+
+@condition(etag_func=lambda request: index_page()[1])
+@cache_control(public=True, max_age=settings.INDEX_CACHE_SECONDS)
 def index(request):
-    return render(request, 'index.html', {})
+    return HttpResponse(index_page()[0])
+
+
+def metrics(request):
+    if settings.METRICS_ALLOWED_IPS and request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class ThrottledObtainAuthToken(ObtainAuthToken):
+    # ObtainAuthToken opts out of the default throttles; opt back in.
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'auth'
+
+
+class ThrottledTokenCreateView(TokenCreateView):
+    throttle_scope = 'auth'
+
+
+class FastReadMixin:
+    """
+    Serve GET list and detail requests through fast_serializer_class, which
+    reads .values() rows and builds the payload directly. Writes still go
+    through serializer_class.
+    """
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        fast = self.fast_serializer_class
+        many = timed_serialization(request_metrics(request), fast.many)
+        rows = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(many(page))
+        return Response(many(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        fast = self.fast_serializer_class
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        row = fast.values(queryset).first()
+        if row is None:
+            raise Http404
+        return Response(timed_serialization(request_metrics(request), fast.to_representation)(row))
+
+
+class MenuItemsView(InstrumentedViewMixin, FastReadMixin, ListCreateAPIView):
+    # Budgets include the token lookup of an authenticated request.
+    query_budget = {'GET': 2, 'POST': 4}
+    throttle_scope = 'menu'
+    queryset = Menu.objects.all()
+    serializer_class = MenuSerializer
+    fast_serializer_class = FastMenuSerializer
+    pagination_class = MenuCursorPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = MenuFilter
+    ordering_fields = MENU_ORDERING_FIELDS
+    ordering = ['id']
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params and request.accepted_renderer.format == 'json':
+            response = self.snapshot_response(request)
+            if response is not None:
+                return response
+        # ?stream=1 writes the whole menu as a JSON array without ever
+        # materialising the full queryset or response body in memory.
+        if request.query_params.get('stream') in ('1', 'true'):
+            queryset = self.filter_queryset(self.get_queryset())
+            return streaming_json_response(queryset, self.fast_serializer_class)
+        return cache.cached_response(
+            request, cache.list_key(request),
+            lambda: super(MenuItemsView, self).list(request, *args, **kwargs).data,
+        )
+
+    def snapshot_response(self, request):
+        """
+        The unfiltered list as the pre-built, pre-compressed menu snapshot
+        (see restaurant.snapshot), in the best encoding the client accepts.
+        """
+        published = snapshot.current()
+        if published is None:
+            return None
+        # finalize_response copies self.headers over the response's own.
+        self.headers['Vary'] = 'Accept, Accept-Encoding'
+        not_modified = get_conditional_response(
+            request, etag=published.etag, last_modified=published.published_at,
+        )
+        if not_modified is not None:
+            return not_modified
+        encoding, body = published.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        response = HttpResponse(body, content_type='application/json')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['ETag'] = published.etag
+        response['Last-Modified'] = http_date(published.published_at)
+        response['X-Menu-Version'] = published.version
+        # Shared caches may keep it but must revalidate, which the ETag makes cheap.
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+class MenuSearchView(InstrumentedViewMixin, ListAPIView):
+    """
+    Full-text (?q=) or title prefix (?q=&autocomplete=1) search over the
+    menu, taking the same filters and ordering as the menu list and
+    returning at most ?limit= items.
+    """
+    throttle_scope = 'menu'
+    query_budget = 2
+    queryset = Menu.objects.all()
+    serializer_class = MenuSerializer
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = MenuFilter
+    ordering_fields = MENU_ORDERING_FIELDS
+    ordering = ['title']
+
+    def list(self, request, *args, **kwargs):
+        params = MenuSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+
+        def build():
+            queryset = search_menu(
+                self.filter_queryset(self.get_queryset()), query['q'], query['autocomplete']
+            )
+            rows = FastMenuSerializer.values(queryset)[:query['limit']]
+            return timed_serialization(request_metrics(request), FastMenuSerializer.many)(rows)
+
+        # Results are cached under the menu list version like the list itself.
+        return cache.cached_response(request, cache.list_key(request), build)
+
+
+def after_cursor(change, pk, pk_field):
+    if pk is None:
+        return Q(change_seq__gt=change)
+    return Q(change_seq__gt=change) | Q(change_seq=change, **{f'{pk_field}__gt': pk})
+
 
+class MenuChangesView(InstrumentedViewMixin, GenericAPIView):
+    """
+    Menu items changed or deleted after ?cursor=, for clients that keep a
+    copy of the menu. Without a cursor every item is returned. Pass back the
+    cursor of each response to get the changes made since; `more` is true
+    while further changes are waiting.
+    """
+    throttle_scope = 'menu'
+    # The token lookup, the change counter, and the changed and deleted
+    # rows. A client that is up to date costs the counter lookup alone.
+    query_budget = 4
+    queryset = Menu.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        params = MenuChangesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        cursor = params.validated_data.get('cursor')
+        limit = params.validated_data['limit']
+        # Every query goes to the same database, so the rows read are the
+        # ones the counter value covers.
+        using = router.db_for_read(Menu)
+        latest = Menu.objects.using(using).latest_change()
+        if cursor is not None and cursor[1] is None and cursor[0] >= latest:
+            return Response({'cursor': str(cursor[0]), 'more': False, 'changed': [], 'deleted': []})
+
+        changes = self.get_changes(using, cursor, latest, limit + 1)
+        more = len(changes) > limit
+        changes = changes[:limit]
+        # Only the last change of each item counts.
+        items = {}
+        for change, pk, row in changes:
+            items.pop(pk, None)
+            items[pk] = row
+        to_representation = FastMenuSerializer.to_representation
+        return Response({
+            'cursor': f'{changes[-1][0]}.{changes[-1][1]}' if more else str(latest),
+            'more': more,
+            'changed': [to_representation(row) for row in items.values() if row is not None],
+            'deleted': [pk for pk, row in items.items() if row is None],
+        })
+
+    def get_changes(self, using, cursor, latest, count):
+        """
+        The first count (change, id, row) triples after cursor and up to
+        change latest, in change order; row is None for a delete.
+        """
+        # Changes past latest may not all have committed yet.
+        rows = Menu.objects.using(using).filter(change_seq__lte=latest)
+        if cursor is not None:
+            rows = rows.filter(after_cursor(*cursor, 'id'))
+        rows = rows.order_by('change_seq', 'id').values('change_seq', *FastMenuSerializer.fields)[:count]
+        changes = [(row.pop('change_seq'), row['id'], row) for row in rows]
+        if cursor is not None:
+            # A client starting from scratch never had the deleted items.
+            tombstones = (
+                MenuTombstone.objects.using(using)
+                .filter(after_cursor(*cursor, 'menu_id'), change_seq__lte=latest)
+                .order_by('change_seq', 'menu_id')
+                .values_list('change_seq', 'menu_id')[:count]
+            )
+            changes = sorted(changes + [(change, pk, None) for change, pk in tombstones], key=lambda c: c[:2])
+        return changes[:count]
 
-class MenuItemsView(ListCreateAPIView):
+
+class SingleMenuItemView(InstrumentedViewMixin, FastReadMixin, RetrieveUpdateAPIView, DestroyAPIView):
+    throttle_scope = 'menu'
+    query_budget = {'GET': 2, 'PUT': 5, 'PATCH': 5, 'DELETE': 6}
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
+    fast_serializer_class = FastMenuSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        return cache.cached_response(
+            request, cache.item_key(kwargs['pk']),
+            lambda: super(SingleMenuItemView, self).retrieve(request, *args, **kwargs).data,
+        )
 
 
-class SingleMenuItemView(RetrieveUpdateAPIView, DestroyAPIView):
+class MenuBulkView(InstrumentedViewMixin, GenericAPIView):
+    """
+    Create, update or delete many menu items in one request.
+
+    POST takes a list of items, PUT/PATCH a list of items that each carry
+    an id, and DELETE a list of ids. Every call runs in a single
+    transaction and writes in batches of ?batch_size= rows.
+    """
+    throttle_scope = 'menu'
     queryset = Menu.objects.all()
     serializer_class = MenuSerializer
 
+    def get_batch_size(self):
+        try:
+            batch_size = int(self.request.query_params['batch_size'])
+        except (KeyError, ValueError):
+            return settings.MENU_BULK_BATCH_SIZE
+        return max(1, min(batch_size, settings.MENU_BULK_MAX_BATCH_SIZE))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['batch_size'] = self.get_batch_size()
+        return context
+
+    def get_list_payload(self):
+        if not isinstance(self.request.data, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+        return self.request.data
+
+    def get_ids(self, items):
+        ids = []
+        errors = []
+        for item in items:
+            raw = item.get('id') if isinstance(item, dict) else item
+            try:
+                ids.append(int(raw))
+                errors.append({})
+            except (TypeError, ValueError):
+                errors.append({'id': ['A valid integer id is required.']})
+        if any(errors):
+            raise ValidationError(errors)
+        return ids
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=self.get_list_payload(), many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+            cache.invalidate_menu_list()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def put(self, request, *args, **kwargs):
+        return self.update(request, partial=False)
+
+    def patch(self, request, *args, **kwargs):
+        return self.update(request, partial=True)
+
+    def update(self, request, partial):
+        items = self.get_list_payload()
+        ids = self.get_ids(items)
+        with transaction.atomic():
+            instances = self.get_queryset().select_for_update().in_bulk(ids)
+            missing = [{} if pk in instances else {'id': ['Not found.']} for pk in ids]
+            if any(missing):
+                raise ValidationError(missing)
+            serializer = self.get_serializer(instances, data=items, many=True, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            cache.invalidate_menu_items(
+                ids, titles=any('title' in attrs for attrs in serializer.validated_data),
+            )
+        return Response(serializer.data)
+
+    def delete(self, request, *args, **kwargs):
+        ids = self.get_ids(self.get_list_payload())
+        batch_size = self.get_batch_size()
+        deleted = set()
+        with transaction.atomic():
+            for start in range(0, len(ids), batch_size):
+                batch = ids[start:start + batch_size]
+                deleted.update(self.get_queryset().filter(pk__in=batch).values_list('pk', flat=True))
+                self.get_queryset().filter(pk__in=batch).delete()
+            cache.invalidate_menu_items(ids)
+        return Response([{'id': pk, 'deleted': pk in deleted} for pk in ids])
+
 
-class BookingViewSet(ModelViewSet):
+class MenuStockView(InstrumentedViewMixin, GenericAPIView):
+    """
+    Consume stock for a list of {"id", "quantity"} pairs in one call.
+
+    Either every item is decremented or none is: the request fails with 409
+    when any item is short and 404 when any item does not exist.
+    """
+    throttle_scope = 'menu'
+    queryset = Menu.objects.all()
+    serializer_class = StockConsumeSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        quantities = {}
+        for item in serializer.validated_data:
+            quantities[item['id']] = quantities.get(item['id'], 0) + item['quantity']
+        try:
+            Menu.objects.consume_inventory(quantities)
+        except Menu.DoesNotExist as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+        except InsufficientInventory as exc:
+            return Response({'detail': str(exc), 'id': exc.pk}, status=status.HTTP_409_CONFLICT)
+        remaining = self.get_queryset().filter(pk__in=quantities).order_by('id').values('id', 'inventory')
+        return Response(list(remaining))
+
+
+class BookingViewSet(InstrumentedViewMixin, FastReadMixin, ModelViewSet):
+    # Writes include the capacity row lock and the daily stats update, each
+    # with a row created on first use of a date; the capacity row is looked
+    # up, and created if needed, before the lock is taken.
+    query_budget = {'GET': 2, 'POST': 13, 'PUT': 15, 'PATCH': 15, 'DELETE': 4}
+    throttle_scope = 'booking'
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
+    fast_serializer_class = FastBookingSerializer
     permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # Only the requesting user's bookings, optionally narrowed with
+        # ?date_from=&date_to=, all served by the (user, booking_date) index.
+        filters = BookingFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return Booking.objects.for_user(self.request.user, **filters.validated_data)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=False)
+    def availability(self, request):
+        """
+        Remaining seats for every date in ?start=&end= (inclusive).
+        """
+        query = AvailabilityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        days = Booking.objects.availability(query.validated_data['start'], query.validated_data['end'])
+        return Response(AvailabilitySerializer(days, many=True).data)
+
+
+class BookingStatsViewSet(InstrumentedViewMixin, GenericViewSet):
+    """
+    Booking reports for staff over ?start=&end=, read from the per-date
+    summary in BookingDailyStats so each costs one query over at most
+    BOOKING_STATS_MAX_DAYS rows, however many bookings there are.
+    """
+    query_budget = 1
+    throttle_scope = 'booking'
+    permission_classes = [IsAdminUser]
+    queryset = BookingDailyStats.objects.all()
+    serializer_class = BookingDailyStatsSerializer
+
+    def get_serializer_class(self):
+        return BookingWeeklyStatsSerializer if self.action == 'weekly' else BookingDailyStatsSerializer
+
+    def get_query(self):
+        query = BookingStatsQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        return query.validated_data
+
+    def list(self, request):
+        """
+        Bookings and guests for every booked date.
+        """
+        query = self.get_query()
+        stats = BookingDailyStats.objects.between(query['start'], query['end'])
+        return Response(self.get_serializer(stats, many=True).data)
+
+    @action(detail=False)
+    def weekly(self, request):
+        """
+        Bookings and guests per week, keyed by the Monday starting it.
+        """
+        query = self.get_query()
+        stats = BookingDailyStats.objects.weekly(query['start'], query['end'])
+        return Response(self.get_serializer(stats, many=True).data)
+
+    @action(detail=False)
+    def peaks(self, request):
+        """
+        The ?limit= (default 10) dates with the most guests.
+        """
+        query = self.get_query()
+        stats = BookingDailyStats.objects.peaks(query['start'], query['end'], query['limit'])
+        return Response(self.get_serializer(stats, many=True).data)
@@ -0,0 +1,131 @@
+"""
+Where queued tasks wait for a worker.
+
+DatabaseBroker keeps them in the taskqueue_task table and is what the
+run_worker command uses. InMemoryBroker keeps them in a process-local list
+for tests, which drain it with taskqueue.worker.Worker.run_pending().
+"""
+from datetime import timedelta
+import itertools
+import threading
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+CLAIM_CANDIDATES = 10
+
+
+class DatabaseBroker:
+
+    def enqueue(self, name, args, kwargs, run_after, max_attempts, unique=False):
+        """
+        Queue a call and return its Task. With unique, a queued call with
+        the same arguments that no worker has claimed yet is returned
+        instead. Two processes racing may still queue one each.
+        """
+        if unique:
+            waiting = Task.objects.filter(name=name, args=args, kwargs=kwargs, status=Task.QUEUED).first()
+            if waiting is not None:
+                return waiting
+        return Task.objects.create(
+            name=name, args=args, kwargs=kwargs, run_after=run_after, max_attempts=max_attempts,
+        )
+
+    def claimable(self, now):
+        # Due tasks, and tasks whose worker died mid-run.
+        stale = now - timedelta(seconds=settings.TASKS_VISIBILITY_TIMEOUT)
+        return Q(status=Task.QUEUED, run_after__lte=now) | Q(status=Task.RUNNING, locked_at__lt=stale)
+
+    def claim(self, worker_id):
+        """
+        Mark the next due task as running for worker_id and return it, or
+        None when nothing is due. The claim is a conditional UPDATE, so two
+        workers racing for the same row cannot both win it and no row lock
+        is held while the task runs.
+        """
+        now = timezone.now()
+        condition = self.claimable(now)
+        candidates = Task.objects.filter(condition).order_by('run_after').values_list('pk', flat=True)
+        for pk in candidates[:CLAIM_CANDIDATES]:
+            claimed = Task.objects.filter(condition, pk=pk).update(
+                status=Task.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return Task.objects.get(pk=pk)
+        return None
+
+    def complete(self, job):
+        Task.objects.filter(pk=job.pk).delete()
+
+    def retry(self, job, error, run_after):
+        Task.objects.filter(pk=job.pk).update(
+            status=Task.QUEUED, run_after=run_after, locked_by='', locked_at=None, last_error=error,
+        )
+
+    def fail(self, job, error):
+        Task.objects.filter(pk=job.pk).update(
+            status=Task.FAILED, locked_by='', locked_at=None, last_error=error,
+        )
+
+
+class InMemoryBroker:
+
+    def __init__(self):
+        self.tasks = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def enqueue(self, name, args, kwargs, run_after, max_attempts, unique=False):
+        with self._lock:
+            if unique:
+                for job in self.tasks.values():
+                    if (job.name, job.args, job.kwargs, job.status) == (name, args, kwargs, Task.QUEUED):
+                        return job
+            job = Task(
+                pk=next(self._ids), name=name, args=args, kwargs=kwargs, run_after=run_after,
+                max_attempts=max_attempts, status=Task.QUEUED,
+            )
+            self.tasks[job.pk] = job
+        return job
+
+    def claim(self, worker_id):
+        now = timezone.now()
+        with self._lock:
+            due = [
+                job for job in self.tasks.values()
+                if job.status == Task.QUEUED and job.run_after <= now
+            ]
+            if not due:
+                return None
+            job = min(due, key=lambda job: (job.run_after, job.pk))
+            job.status, job.locked_by, job.locked_at = Task.RUNNING, worker_id, now
+            job.attempts += 1
+            return job
+
+    def complete(self, job):
+        with self._lock:
+            self.tasks.pop(job.pk, None)
+
+    def retry(self, job, error, run_after):
+        job.status, job.run_after, job.last_error = Task.QUEUED, run_after, error
+
+    def fail(self, job, error):
+        job.status, job.last_error = Task.FAILED, error
+
+    def clear(self):
+        with self._lock:
+            self.tasks.clear()
+
+
+_brokers = {}
+
+
+def get_broker():
+    path = settings.TASKS_BROKER
+    if path not in _brokers:
+        _brokers[path] = import_string(path)()
+    return _brokers[path]
@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from taskqueue.worker import Worker, autodiscover
+
+
+def work(worker_id, stop_event, poll_interval, burst):
+    # Only the parent reacts to Ctrl-C; it tells the children through
+    # stop_event so each finishes the task it is running.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    Worker(worker_id).run(stop_event, poll_interval=poll_interval, burst=burst)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='seconds an idle worker waits before polling again')
+        parser.add_argument('--burst', action='store_true',
+                            help='exit once no task is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        autodiscover()
+        processes = max(1, options['processes'])
+        hostname = socket.gethostname()
+
+        if processes == 1:
+            stop_event = threading.Event()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda signum, frame: stop_event.set())
+            Worker(f'{hostname}:{os.getpid()}').run(
+                stop_event, poll_interval=options['poll_interval'], burst=options['burst'],
+            )
+            return
+
+        # Children are forked with Django already set up, and must open
+        # their own database connections.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop_event = context.Event()
+        children = [
+            context.Process(
+                target=work,
+                args=(f'{hostname}:{os.getpid()}-{i}', stop_event, options['poll_interval'], options['burst']),
+                daemon=True,
+            )
+            for i in range(processes)
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f'Started {processes} workers.')
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda signum, frame: stop_event.set())
+        for child in children:
+            child.join()
@@ -0,0 +1,77 @@
+"""
+Registering task functions and queueing calls to them.
+
+    @task(max_attempts=8)
+    def send_receipt(order_id):
+        ...
+
+    send_receipt.delay(order.pk)
+
+delay() hands the call to the broker once the surrounding transaction
+commits, so a worker never picks up a task for rows it cannot see yet and a
+rolled-back request queues nothing. Arguments must be JSON serializable.
+With TASKS_ALWAYS_EAGER the call runs in-process at that point instead.
+
+A unique task is not queued again while a call with the same arguments is
+still waiting for a worker; use it for work that only needs to happen once
+more, however often it is asked for.
+"""
+from datetime import timedelta
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+registry = {}
+
+
+class TaskFunction:
+
+    def __init__(self, func, name, max_attempts, unique=False):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.unique = unique
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<task {self.name}>'
+
+    def delay(self, *args, **kwargs):
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, countdown=0, using=None):
+        # Round-trip through JSON now, so a bad argument fails in the caller
+        # and eager runs see exactly what a worker would.
+        payload = json.loads(json.dumps([list(args), kwargs or {}]))
+
+        def enqueue():
+            if settings.TASKS_ALWAYS_EAGER:
+                self.func(*payload[0], **payload[1])
+                return
+            from .brokers import get_broker
+            get_broker().enqueue(
+                self.name, payload[0], payload[1],
+                run_after=timezone.now() + timedelta(seconds=countdown),
+                max_attempts=self.max_attempts, unique=self.unique,
+            )
+
+        transaction.on_commit(enqueue, using=using)
+
+
+def task(func=None, *, name=None, max_attempts=None, unique=False):
+    """
+    Register func as a task, under its dotted path unless name is given.
+    """
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        registry[task_name] = TaskFunction(
+            func, task_name, max_attempts or settings.TASKS_MAX_ATTEMPTS, unique
+        )
+        return registry[task_name]
+
+    return register(func) if func is not None else register
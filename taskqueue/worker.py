@@ -0,0 +1,96 @@
+"""
+Running queued tasks.
+
+A Worker claims one task at a time from the broker and runs it. A task that
+raises is retried with exponential backoff and jitter until it has used
+its max_attempts, then marked FAILED with the traceback kept on the row.
+"""
+from datetime import timedelta
+import logging
+import random
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .brokers import get_broker
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+
+def autodiscover():
+    """
+    Import every installed app's tasks module so its tasks are registered.
+    """
+    autodiscover_modules('tasks')
+
+
+def backoff(attempts, rng=random):
+    """
+    Seconds to wait before retrying a task that has failed attempts times:
+    doubling from TASKS_RETRY_BACKOFF up to TASKS_RETRY_BACKOFF_MAX, with
+    up to half of it taken off at random so failed batches spread out.
+    """
+    delay = min(settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1), settings.TASKS_RETRY_BACKOFF_MAX)
+    return delay * rng.uniform(0.5, 1)
+
+
+class Worker:
+
+    def __init__(self, worker_id, broker=None):
+        self.worker_id = worker_id
+        self.broker = broker or get_broker()
+
+    def run_once(self):
+        """
+        Run the next due task, if any. Returns whether one was run.
+        """
+        job = self.broker.claim(self.worker_id)
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def run_pending(self):
+        """
+        Run tasks until none are due, including retries that become due
+        meanwhile. Returns how many were run.
+        """
+        count = 0
+        while self.run_once():
+            count += 1
+        return count
+
+    def run(self, stop_event, poll_interval=1.0, burst=False):
+        while not stop_event.is_set():
+            # Mirror the request cycle: drop connections that went stale
+            # while idle or were broken by the last task.
+            close_old_connections()
+            if not self.run_once():
+                if burst:
+                    return
+                stop_event.wait(poll_interval)
+
+    def execute(self, job):
+        func = registry.get(job.name)
+        if func is None:
+            logger.error('Unknown task %s (id %s)', job.name, job.pk)
+            self.broker.fail(job, f'Unknown task {job.name}')
+            return
+        try:
+            func(*job.args, **job.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            if job.attempts >= job.max_attempts:
+                logger.exception('Task %s (id %s) failed for good after %s attempts',
+                                 job.name, job.pk, job.attempts)
+                self.broker.fail(job, error)
+            else:
+                delay = backoff(job.attempts)
+                logger.warning('Task %s (id %s) failed, retrying in %.1fs', job.name, job.pk, delay)
+                self.broker.retry(job, error, timezone.now() + timedelta(seconds=delay))
+        else:
+            self.broker.complete(job)